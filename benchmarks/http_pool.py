@@ -0,0 +1,83 @@
+"""Compare requests per second with pooled connections and a new one per request.
+
+python benchmarks/http_pool.py --requests 5000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lab.runtime.http import HttpClient
+
+RESPONSE = b'{"ok": true}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """A stand-in instrument API that answers immediately"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *_) -> None:
+        pass
+
+
+def serve(port: multiprocessing.Value) -> None:  # type: ignore[valid-type]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port.value = server.server_address[1]
+    server.serve_forever()
+
+
+async def measure(url: str, requests: int, concurrency: int, keep_alive: bool) -> float:
+    client = HttpClient(max_connections_per_host=concurrency, keep_alive=keep_alive)
+    remaining = iter(range(requests))
+
+    async def send() -> None:
+        for i in remaining:
+            response = await client.request("POST", url, {"reading": i})
+            assert response.ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return requests / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    port = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.01)
+    url = f"http://127.0.0.1:{port.value}/measure"
+
+    try:
+        fresh = asyncio.run(measure(url, args.requests, args.concurrency, False))
+        pooled = asyncio.run(measure(url, args.requests, args.concurrency, True))
+    finally:
+        server.terminate()
+
+    print(f"requests:        {args.requests} ({args.concurrency} at a time)")
+    print(f"new per request: {fresh:9.0f} req/s")
+    print(f"pooled:          {pooled:9.0f} req/s  ({pooled / fresh:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare cold and warm `LabfileService.parse` times.
+
+python benchmarks/parse_cache.py --experiments 10000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from lab.project.persistence.cache import ParseCache
+from lab.project.service.labfile import LabfileService
+
+
+def generate_labfile(experiments: int) -> str:
+    """Experiments form a binary tree, each one consuming its parent's output"""
+    blocks = []
+    for i in range(experiments):
+        parameters = [f"        seed    {i}", "        lr      0.0005"]
+        if i > 0:
+            parameters.append(f"        input   @e{(i - 1) // 2}.output")
+        blocks.append(
+            "\n".join(
+                [f"EXPERIMENT Step AS e{i}", "    VIA step.py", "    WITH", *parameters]
+            )
+        )
+
+    return "\n\n".join(blocks) + "\n"
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--experiments", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        labfile = Path(tmp) / "Labfile"
+        labfile.write_text(generate_labfile(args.experiments))
+        cache = ParseCache(Path(tmp) / "cache", max_bytes=1 << 30)
+        service = LabfileService(cache)
+
+        uncached = measure(lambda: service.parse(labfile, use_cache=False), 1)
+        cold = measure(lambda: service.parse(labfile), 1)
+        warm = measure(lambda: service.parse(labfile), args.repeat)
+
+    print(f"experiments: {args.experiments}")
+    print(f"uncached:    {uncached * 1000:9.1f} ms")
+    print(f"cold:        {cold * 1000:9.1f} ms  (parse and write cache)")
+    print(f"warm:        {warm * 1000:9.1f} ms  ({uncached / warm:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Time each stage between a Labfile and a finished run, on synthetic projects.
+
+python benchmarks/scheduling.py --output results.json
+python benchmarks/scheduling.py --shapes random --sizes 1000 10000 --baseline results.json
+
+The stages are measured on their own: parsing a Labfile (`labfile.parse`),
+lowering the parse tree to a `Project`, planning it, and running the plan with
+`Runtime.start` and experiments that do nothing but publish their output. Each
+result is the median of `--repeat` timings, written as JSON with the commit and
+machine it was measured on. With `--baseline`, results are compared to an
+earlier file and the exit status is 1 if any stage got slower than `--threshold`,
+failed, or wasn't measured.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from labfile import parse
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.ir import ExperimentDefinition
+from lab.project.persistence.cache import ParseCache
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.labfile import LabfileService
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import ExecutionContext, ExecutionMethod
+from lab.runtime.persistence.artifacts import ArtifactStore
+from lab.runtime.persistence.memory import (
+    InMemoryExperimentRunRepository,
+    InMemoryProjectRunRepository,
+)
+from lab.runtime.persistence.workspace import ContentStore, WorkspaceProvisioner
+from lab.runtime.runtime import Runtime
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.metrics import ResourceSampler
+from lab.runtime.service.report import ReportServer
+from lab.runtime.service.run import RunService
+from lab.runtime.service.streams import StreamChannels
+from lab.sdk.artifacts import ARTIFACTS_ENV, publish
+from lab.settings import Settings
+from synthetic import SHAPES, generate_labfile, generate_project
+
+STAGES = ("parse", "lower", "plan", "run")
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+class NoOpExecution(ExecutionMethod):
+    """Publishes the output its dependents need, and nothing else"""
+
+    node: int
+
+    async def run(self, context: ExecutionContext) -> None:
+        publish("output", self.node, Path(context.env_vars[ARTIFACTS_ENV]))
+
+
+def measure(
+    fn: Callable[[object], object],
+    setup: Callable[[], object],
+    repeat: int,
+) -> list[float]:
+    """Seconds each call of `fn` took, on a fresh `setup()` every time"""
+    timings = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        fn(argument)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def lower(tree) -> None:
+    definitions = [ExperimentDefinition.from_tree(node) for node in tree.processes]
+    # The service's lowering step on its own, without reading or caching files
+    LabfileService(ParseCache(Path(), max_bytes=0, enabled=False))._lower(
+        {Path(): definitions}
+    )
+
+
+def create_runtime(directory: Path) -> Runtime:
+    """A runtime storing runs in memory and artifacts under `directory`"""
+    bus = InMemoryMessageBus()
+    registry = InstrumentRegistry()
+    settings = Settings(home=directory)
+    return Runtime(
+        RunService(
+            InMemoryProjectRunRepository(), InMemoryExperimentRunRepository(), bus
+        ),
+        ResourceSampler(settings),
+        registry,
+        ReservationCalendar(registry),
+        ReportServer(bus),
+        ArtifactStore(directory / "artifacts", ContentStore(directory / "store")),
+        StreamChannels(),
+        Coordinator(registry, settings),
+        WorkspaceProvisioner(ContentStore(directory / "store"), directory / "work"),
+        settings,
+    )
+
+
+def benchmark(
+    stage: str, shape: str, nodes: int, repeat: int, jobs: Optional[int]
+) -> list[float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        labfile = directory / "Labfile"
+        labfile.write_text(generate_labfile(shape, nodes))
+        if stage == "parse":
+            return measure(parse, lambda: labfile, repeat)
+        if stage == "lower":
+            tree = parse(labfile)
+            return measure(lower, lambda: tree, repeat)
+
+        project = generate_project(shape, nodes, lambda i: NoOpExecution(node=i))
+        planner = PlanService()
+        if stage == "plan":
+            return measure(
+                lambda p: planner.create_execution_plan(p, DurationEstimator()),
+                lambda: project,
+                repeat,
+            )
+
+        plan = planner.create_execution_plan(project, DurationEstimator())
+        runs = iter(range(repeat))
+
+        def setup() -> Runtime:
+            return create_runtime(directory / str(next(runs)))
+
+        def start(runtime: Runtime) -> None:
+            asyncio.run(runtime.start(plan, jobs=jobs))
+
+        return measure(start, setup, repeat)
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> bool:
+    """Print how each result changed from the baseline; False if any regressed.
+
+    A result that failed, or a baseline result with nothing to compare it to in
+    `results`, counts as a regression.
+    """
+    after = {(r["stage"], r["shape"], r["nodes"]): r for r in results}
+    ok = True
+    for previous in baseline:
+        key = (previous["stage"], previous["shape"], previous["nodes"])
+        label = f"{key[0]:<6} {key[1]:<8} {key[2]:>7}"
+        result = after.pop(key, None)
+        if result is None or "seconds" not in result:
+            ok = False
+            reason = "missing" if result is None else result["error"]
+            print(f"{label}  REGRESSED ({reason})")
+            continue
+        if "seconds" not in previous:
+            print(f"{label}  failed before -> {result['seconds'] * 1000:10.1f} ms")
+            continue
+
+        ratio = result["seconds"] / previous["seconds"]
+        regressed = ratio > 1 + threshold
+        ok = ok and not regressed
+        print(
+            f"{label}  {previous['seconds'] * 1000:10.1f} ms -> "
+            f"{result['seconds'] * 1000:10.1f} ms"
+            f"  {ratio:5.2f}x{'  REGRESSED' if regressed else ''}"
+        )
+
+    for key, result in after.items():
+        if "seconds" not in result:
+            ok = False
+            print(f"{key[0]:<6} {key[1]:<8} {key[2]:>7}  REGRESSED ({result['error']})")
+    return ok
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument(
+        "--max-run-nodes",
+        type=int,
+        default=10_000,
+        help="Skip running projects larger than this, which takes a while",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(args.sizes)))
+
+    def measured(stage: str, shape: str, nodes: int) -> bool:
+        return (
+            stage in args.stages
+            and shape in args.shapes
+            and nodes in args.sizes
+            and not (stage == "run" and nodes > args.max_run_nodes)
+        )
+
+    results = []
+    for stage in args.stages:
+        for shape in args.shapes:
+            for nodes in args.sizes:
+                if not measured(stage, shape, nodes):
+                    continue
+                result: dict = {"stage": stage, "shape": shape, "nodes": nodes}
+                try:
+                    timings = benchmark(stage, shape, nodes, args.repeat, args.jobs)
+                    result.update(
+                        seconds=statistics.median(timings),
+                        min_seconds=min(timings),
+                        repeat=len(timings),
+                    )
+                    summary = f"{result['seconds'] * 1000:10.1f} ms"
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    summary = f"failed ({result['error']})"
+                results.append(result)
+                print(f"{stage:<6} {shape:<8} {nodes:>7}  {summary}", flush=True)
+
+    report = {
+        "commit": commit(),
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        print(f"\nCompared with {baseline.get('commit') or args.baseline}:")
+        # Only what this run set out to measure; other baseline results are skipped
+        comparable = [
+            r
+            for r in baseline["results"]
+            if measured(r["stage"], r["shape"], r["nodes"])
+        ]
+        if not compare(results, comparable, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
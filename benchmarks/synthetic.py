@@ -0,0 +1,83 @@
+"""Synthetic projects of a given shape and size, as Labfiles or as `Project`s.
+
+Node i is experiment `e{i}`, and only ever depends on nodes before it:
+
+- chain: each node on the one before
+- fan-out: every node on the first
+- fan-in: the last node on every other
+- random: mostly one to three nodes from the 50 before, some with none
+"""
+
+import random
+from typing import Callable
+from uuid import UUID
+
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.runtime.model.execution import ExecutionMethod
+
+SHAPES = ("chain", "fan-out", "fan-in", "random")
+RANDOM_WINDOW = 50  # how far back random parents are picked from
+RANDOM_ROOTS = 0.05  # share of random nodes with no parents
+
+
+def upstream(shape: str, nodes: int, seed: int = 0) -> list[list[int]]:
+    """The nodes each node depends on"""
+    if shape == "chain":
+        return [[i - 1] if i else [] for i in range(nodes)]
+    if shape == "fan-out":
+        return [[0] if i else [] for i in range(nodes)]
+    if shape == "fan-in":
+        return [[] for _ in range(nodes - 1)] + [list(range(nodes - 1))]
+    if shape == "random":
+        rng = random.Random(seed)
+        parents: list[list[int]] = [[]]
+        for i in range(1, nodes):
+            if rng.random() < RANDOM_ROOTS:
+                parents.append([])
+                continue
+            window = range(max(0, i - RANDOM_WINDOW), i)
+            count = min(len(window), rng.randint(1, 3))
+            parents.append(sorted(rng.sample(window, count)))
+        return parents
+
+    raise ValueError(f"Unknown shape '{shape}', expected one of {SHAPES}")
+
+
+def generate_labfile(shape: str, nodes: int, seed: int = 0) -> str:
+    blocks = []
+    for i, parents in enumerate(upstream(shape, nodes, seed)):
+        parameters = [f"        seed    {i}"]
+        parameters.extend(f"        in{p}    @e{p}.output" for p in parents)
+        blocks.append(
+            "\n".join(
+                [f"EXPERIMENT Step AS e{i}", "    VIA step.py", "    WITH", *parameters]
+            )
+        )
+
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_project(
+    shape: str,
+    nodes: int,
+    execution_method: Callable[[int], ExecutionMethod],
+    seed: int = 0,
+) -> Project:
+    """The project the Labfile describes, running `execution_method(i)` for node i"""
+    experiments: list[Experiment] = []
+    for i, parents in enumerate(upstream(shape, nodes, seed)):
+        parameters: dict = {"seed": i}
+        parameters.update(
+            (f"in{p}", ValueReference(owner=experiments[p], attribute="output"))
+            for p in parents
+        )
+        experiments.append(
+            Experiment(
+                id=UUID(int=i + 1),
+                name=f"e{i}",
+                execution_method=execution_method(i),
+                parameters=parameters,
+            )
+        )
+
+    return Project(experiments=set(experiments))
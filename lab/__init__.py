@@ -1,2 +1,10 @@
+from importlib.metadata import PackageNotFoundError, version
+
+try:
+    __version__ = version("lab")
+except PackageNotFoundError:  # running from a source checkout
+    __version__ = "0.0.0+unknown"
+
+
 def hello() -> str:
     return "Hello from lab!"
@@ -1,8 +1,12 @@
 import click
 from dishka.integrations.click import setup_dishka
+from lab.cli.commands.gc import gc
 from lab.cli.commands.plan import plan
 
 from lab.cli.commands.run import run
+from lab.cli.commands.stats import stats
+from lab.cli.commands.watch import watch
+from lab.cli.commands.worker import worker
 from lab.di import DI
 
 
@@ -13,7 +17,11 @@ def start():
         di = DI()
         setup_dishka(container=di.container, context=context, auto_inject=True)
 
+    main.command(name="gc")(gc)
     main.command(name="plan")(plan)
     main.command(name="run")(run)
+    main.command(name="stats")(stats)
+    main.command(name="watch")(watch)
+    main.command(name="worker")(worker)
 
     main()
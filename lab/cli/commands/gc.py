@@ -0,0 +1,75 @@
+from typing import Optional
+
+import click
+from dishka import FromDishka
+
+from lab.cli.utils import format_size, parse_size
+from lab.core.ui import UserInterface
+from lab.runtime.service.gc import ARTIFACTS, OBJECT, WORKSPACE, GarbageCollector
+
+KIND_NAMES = {ARTIFACTS: "run outputs", WORKSPACE: "workspaces", OBJECT: "stored files"}
+
+
+@click.option(
+    "--budget",
+    default=None,
+    metavar="SIZE",
+    help="Disk budget, e.g. 20G (defaults to LAB_GC_BUDGET_BYTES)",
+)
+@click.option(
+    "--pin",
+    "pins",
+    multiple=True,
+    metavar="PROJECT_RUN_ID",
+    help="Never collect what this project run produced. May be repeated.",
+)
+@click.option(
+    "--unpin",
+    "unpins",
+    multiple=True,
+    metavar="PROJECT_RUN_ID",
+    help="Let a pinned project run be collected again. May be repeated.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Report what would be collected without deleting anything",
+)
+def gc(
+    budget: Optional[str],
+    pins: tuple[str, ...],
+    unpins: tuple[str, ...],
+    dry_run: bool,
+    ui: FromDishka[UserInterface],
+    collector: FromDishka[GarbageCollector],
+):
+    """Delete the least recently used run outputs and workspaces over the disk budget"""
+    for project_run_id in pins:
+        collector.pin(project_run_id)
+    for project_run_id in unpins:
+        collector.unpin(project_run_id)
+
+    report = collector.collect(
+        budget_bytes=parse_size(budget) if budget is not None else None,
+        dry_run=dry_run,
+    )
+    if report.budget_bytes is None:
+        ui.print(
+            f"Using {format_size(report.total_bytes)}; no budget set, so nothing "
+            "was collected (see --budget)"
+        )
+        return
+
+    verb = "Would free" if dry_run else "Freed"
+    ui.print(
+        f"{verb} {format_size(report.freed)} ({sum(report.evicted.values())} entries)"
+    )
+    for kind, freed in report.freed_bytes.items():
+        ui.print(f"  {KIND_NAMES[kind]}: {format_size(freed)} ({report.evicted[kind]})")
+    ui.print(
+        f"Using {format_size(report.remaining_bytes)} of "
+        f"{format_size(report.budget_bytes)}"
+    )
+    if report.remaining_bytes > report.budget_bytes:
+        ui.print("[yellow]Still over budget: the rest is recent, pinned or in use[/]")
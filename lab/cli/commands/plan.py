@@ -1,20 +1,146 @@
+import os
 from pathlib import Path
+from typing import Optional
 from dishka import FromDishka
-import rich
 import click
 
+from lab.cli.utils import select_experiments
 from lab.core.ui import UserInterface
+from lab.project.model.plan import ExecutionPlan, format_duration
+from lab.project.service.artifact import PlanArtifactService
+from lab.project.service.estimate import DurationEstimator
 from lab.project.service.labfile import LabfileService
 from lab.project.service.plan import PlanService
+from lab.runtime.service.simulation import PlanSimulator, SimulationResult
+from lab.runtime.service.stats import StatsService
+
+SPARKS = " ▁▂▃▄▅▆▇█"
+SHOWN_PATH_LENGTH = 12  # longer critical paths are shown by their ends
 
 
 @click.argument("path", type=click.Path(exists=True, path_type=Path))
-def plan(path: Path, ui: FromDishka[UserInterface]):
+@click.option(
+    "-s",
+    "--select",
+    "selectors",
+    multiple=True,
+    help="Only include matching experiments: NAME, NAME+ (and downstream), "
+    "+NAME (and upstream) or a glob. May be repeated.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="Compile the plan to a file that `lab run --plan` can execute",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the Labfile from scratch instead of using the parse cache",
+)
+@click.option(
+    "--simulate",
+    is_flag=True,
+    default=False,
+    help="Predict how long the plan takes to run, instead of listing it",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Experiments to run at once in the simulation (defaults to CPU count)",
+)
+@click.option(
+    "--trials",
+    type=click.IntRange(min=1),
+    default=20,
+    help="Simulations with durations drawn from previous runs, with --simulate",
+)
+def plan(
+    path: Path,
+    selectors: tuple[str, ...],
+    no_cache: bool,
+    output: Optional[Path],
+    simulate: bool,
+    jobs: Optional[int],
+    trials: int,
+    ui: FromDishka[UserInterface],
+    labfile_service: FromDishka[LabfileService],
+    plan_service: FromDishka[PlanService],
+    stats_service: FromDishka[StatsService],
+    artifact_service: FromDishka[PlanArtifactService],
+    simulator: FromDishka[PlanSimulator],
+):
     """Generate execution plan from Labfile"""
     ui.print(f"Generating plan for [b]{path.resolve()}[/b]\n")
-    labfile_service = LabfileService()
-    plan_service = PlanService()
-    project = labfile_service.parse(path)
+    project = select_experiments(
+        labfile_service.parse(path, use_cache=not no_cache), selectors
+    )
+
+    estimator = stats_service.estimator(project.experiments)
+    plan = plan_service.create_execution_plan(project, estimator)
+    if simulate:
+        _simulate(ui, simulator, plan, estimator, jobs or os.cpu_count() or 1, trials)
+    else:
+        ui.print(str(plan))
+
+    if output:
+        artifact_service.save(plan, source=path, destination=output)
+        ui.print(f"\nWrote plan to [b]{output}[/b]")
+
+
+### PRIVATE #######################
+
+
+def _simulate(
+    ui: UserInterface,
+    simulator: PlanSimulator,
+    plan: ExecutionPlan,
+    estimator: DurationEstimator,
+    jobs: int,
+    trials: int,
+) -> None:
+    result = simulator.simulate(plan, jobs, estimator, trials=trials)
+    ui.print(
+        f"[b]Simulated {len(plan.ordered_experiments)} experiments on {jobs} jobs[/b]"
+    )
+    makespan = f"Makespan: {format_duration(result.makespan)}"
+    if len(result.makespans) > 1:
+        makespan += (
+            f" (90th percentile {format_duration(result.makespan_p90)} "
+            f"over {len(result.makespans)} trials)"
+        )
+    ui.print(makespan)
+    ui.print(f"Utilisation: {result.utilisation:.0%} (peak {result.peak_cpus} CPUs)")
+    ui.print(f"Over time: [cyan]{_sparkline(result.timeline)}[/]")
+    ui.print(f"Critical path: {_format_path(result)}")
+    if result.refused:
+        ui.print(
+            f"[yellow]Can never run with these resources: {', '.join(result.refused)}[/]"
+        )
+
+    sweep = simulator.sweep(plan, [jobs])
+    ui.print("\n[b]Jobs    Makespan    Utilisation[/b]")
+    for run in sweep.results:
+        marker = "  ← recommended" if run.jobs == sweep.recommended else ""
+        ui.print(
+            f"{run.jobs:>4}    {format_duration(run.makespan):>8}    "
+            f"{run.utilisation:>11.0%}{marker}"
+        )
+
+
+def _sparkline(shares: list[float]) -> str:
+    top = len(SPARKS) - 1
+    return "".join(SPARKS[min(top, round(share * top))] for share in shares)
+
 
-    plan = plan_service.create_execution_plan(project)
-    ui.print(str(plan))
+def _format_path(result: SimulationResult) -> str:
+    path = result.critical_path
+    if len(path) <= SHOWN_PATH_LENGTH:
+        return " → ".join(path)
+    half = SHOWN_PATH_LENGTH // 2
+    hidden = len(path) - 2 * half
+    return " → ".join([*path[:half], f"({hidden} more)", *path[-half:]])
@@ -1,43 +1,158 @@
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+import asyncio
 import logging
+import signal
 import click
 from dishka import FromDishka
 
-from lab.cli.utils import coro
+from lab.cli.utils import coro, parse_address, select_experiments
 from lab.core.logging import setup_logging
+from lab.core.tracing import tracer
 from lab.core.ui import UserInterface
+from lab.project.service.artifact import PlanArtifactService
 from lab.project.service.labfile import LabfileService
 from lab.project.service.plan import PlanService
+from lab.project.model.plan import ExecutionPlan
+from lab.runtime.model.run import ProjectRun, RunStatus
 from lab.runtime.runtime import Runtime
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.gc import GarbageCollector
+from lab.runtime.service.stats import StatsService
+from lab.settings import Settings
 
 logger = logging.getLogger("lab")
 
 
-@click.argument("path", type=click.Path(exists=True, path_type=Path))
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "-s",
+    "--select",
+    "selectors",
+    multiple=True,
+    help="Only include matching experiments: NAME, NAME+ (and downstream), "
+    "+NAME (and upstream) or a glob. May be repeated.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Maximum number of experiments to run at once, across all projects "
+    "(defaults to CPU count)",
+)
+@click.option(
+    "--plan",
+    "plan_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Run a plan compiled with `lab plan -o` instead of parsing the Labfile",
+)
+@click.option(
+    "--listen",
+    default=None,
+    metavar="HOST:PORT",
+    help="Run experiments on workers started with `lab worker HOST:PORT`",
+)
+@click.option(
+    "--workers",
+    "worker_count",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Workers to wait for before starting, with --listen",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the Labfile from scratch instead of using the parse cache",
+)
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write a timeline of the run to this file, for Perfetto or chrome://tracing",
+)
 @coro
 async def run(
-    path: Path,
+    paths: tuple[Path, ...],
+    selectors: tuple[str, ...],
+    no_cache: bool,
+    trace_path: Optional[Path],
+    plan_path: Optional[Path],
+    jobs: Optional[int],
+    listen: Optional[str],
+    worker_count: int,
     ui: FromDishka[UserInterface],
     runtime: FromDishka[Runtime],
     labfile_service: FromDishka[LabfileService],
     plan_service: FromDishka[PlanService],
+    artifact_service: FromDishka[PlanArtifactService],
+    stats_service: FromDishka[StatsService],
+    coordinator: FromDishka[Coordinator],
+    collector: FromDishka[GarbageCollector],
+    settings: FromDishka[Settings],
 ):
-    """Run experiments defined in Labfile"""
+    """Run experiments defined in Labfile.
+
+    Several projects given together run at once under one scheduler, sharing
+    the jobs between them fairly. Each has its own project run.
+    """
+    if plan_path is None and not paths:
+        raise click.UsageError("Either PATH or --plan is required")
+    if plan_path is not None and selectors:
+        raise click.UsageError("--select can't be used with --plan")
+    if plan_path is not None and len(paths) > 1:
+        raise click.UsageError("Only one PATH can be given with --plan")
+
     setup_logging(Path("~/.local/lab/logs/lab.log"))
+    if trace_path is not None:
+        tracer.enable()
 
     try:
-        ui.display_start(str(path.resolve()))
+        projects: list[tuple[ExecutionPlan, Optional[Path]]] = []
+        if plan_path is not None:
+            ui.display_start(str(plan_path.resolve()))
+
+            # Load the compiled plan, checking it against the Labfile
+            logger.debug("Loading plan", extra={"context": {"path": str(plan_path)}})
+            path = paths[0] if paths else None
+            with tracer.span("load plan", "phase"):
+                plan = artifact_service.load(plan_path, source=path)
+            projects.append((plan, _source(path)))
+        else:
+            for path in paths:
+                ui.display_start(str(path.resolve()))
 
-        # Load and parse project
-        logger.debug("Loading project", extra={"context": {"path": str(path)}})
-        labfile_service = LabfileService()
-        project = labfile_service.parse(path)
+                # Load and parse project
+                logger.debug("Loading project", extra={"context": {"path": str(path)}})
+                with tracer.span("parse", "phase", path=str(path)):
+                    project = select_experiments(
+                        labfile_service.parse(path, use_cache=not no_cache), selectors
+                    )
 
-        # Create execution plan
-        plan_service = PlanService()
-        plan = plan_service.create_execution_plan(project)
+                # Create execution plan
+                with tracer.span("history", "phase", path=str(path)):
+                    estimator = stats_service.estimator(project.experiments)
+                with tracer.span("plan", "phase", path=str(path)):
+                    plan = plan_service.create_execution_plan(project, estimator)
+                projects.append((plan, _source(path)))
 
-        await runtime.start(plan)
+        async with _collect_garbage(collector, runtime, settings.gc_interval_seconds):
+            with _cancel_on_interrupt(runtime, ui), tracer.span("run", "phase"):
+                project_runs = await _start(
+                    runtime, coordinator, ui, projects, jobs, listen, worker_count
+                )
+
+        if any(run.status == RunStatus.CANCELLED for run in project_runs):
+            ui.display_cancelled()
+            raise SystemExit(130)
+
+        failed = [run.error for run in project_runs if run.status == RunStatus.FAILED]
+        if failed:
+            raise RuntimeError("\n".join(error or "Failed" for error in failed))
 
         # # Execute experiments with progress display
         # with ui.create_progress() as progress:
@@ -47,7 +162,80 @@ async def run(
 
         ui.display_success()
 
+    except click.ClickException:
+        raise  # reported by click as a usage error
     except Exception as e:
         logger.exception("Execution failed")
         ui.display_error(message="Execution failed", details=str(e))
         raise
+    finally:
+        if trace_path is not None:
+            tracer.write(trace_path)
+            ui.print(f"[dim]Trace written to {trace_path}[/]")
+
+
+### PRIVATE #######################
+
+
+def _source(path: Optional[Path]) -> Optional[Path]:
+    """The project directory, which experiments' workspaces are staged from"""
+    if path is None:
+        return None
+    return path if path.is_dir() else path.parent
+
+
+async def _start(
+    runtime: Runtime,
+    coordinator: Coordinator,
+    ui: UserInterface,
+    projects: list[tuple[ExecutionPlan, Optional[Path]]],
+    jobs: Optional[int],
+    listen: Optional[str],
+    worker_count: int,
+) -> list[ProjectRun]:
+    """Run the plans here, or on workers when listening for them"""
+    if listen is None:
+        return await runtime.start_all(projects, jobs=jobs)
+
+    async with coordinator.serve(*parse_address(listen)) as (host, port):
+        ui.print(f"[dim]Waiting for {worker_count} workers on {host}:{port}[/]")
+        await coordinator.wait_for_workers(worker_count)
+        return await runtime.start_all(projects, jobs=jobs)
+
+
+@contextmanager
+def _cancel_on_interrupt(runtime: Runtime, ui: UserInterface) -> Iterator[None]:
+    """Ctrl-C stops running experiments cleanly; a second one stops waiting for them"""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+
+    def interrupt() -> None:
+        if not runtime.cancelling:
+            ui.print("[yellow]Cancelling, press Ctrl-C again to stop waiting[/]")
+            runtime.cancel()
+        elif task is not None:
+            task.cancel()
+
+    loop.add_signal_handler(signal.SIGINT, interrupt)
+    try:
+        yield
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+
+
+@asynccontextmanager
+async def _collect_garbage(
+    collector: GarbageCollector, runtime: Runtime, interval_seconds: Optional[float]
+) -> AsyncIterator[None]:
+    """Keep the data directory within its budget while the run goes on"""
+    if interval_seconds is None:
+        yield
+        return
+
+    task = asyncio.create_task(
+        collector.run_periodically(interval_seconds, lambda: runtime.active)
+    )
+    try:
+        yield
+    finally:
+        task.cancel()
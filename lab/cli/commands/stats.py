@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Optional
+
+import click
+from dishka import FromDishka
+from rich.table import Table
+
+from lab.core.ui import UserInterface
+from lab.runtime.service.stats import RUN_METRICS, StatsService
+
+
+@click.argument("experiments", nargs=-1)
+@click.option(
+    "-m",
+    "--metric",
+    type=click.Choice(RUN_METRICS),
+    default="duration_seconds",
+    help="Run metric to summarise",
+)
+@click.option(
+    "-n",
+    "--last",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only consider each experiment's N most recent successful runs",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="Only consider runs started after this date",
+)
+@click.option(
+    "-q",
+    "--quantile",
+    type=click.FloatRange(min=0, max=1),
+    default=0.95,
+    help="Quantile to report alongside the median",
+)
+def stats(
+    experiments: tuple[str, ...],
+    metric: str,
+    last: Optional[int],
+    since: Optional[datetime],
+    quantile: float,
+    ui: FromDishka[UserInterface],
+    stats_service: FromDishka[StatsService],
+):
+    """Summarise metrics of previous runs, per experiment"""
+    summary = stats_service.summarise(
+        metric=metric,
+        experiments=experiments,
+        last=last,
+        since=since,
+        quantile=quantile,
+    )
+    if summary.is_empty():
+        ui.print("No matching runs recorded")
+        return
+
+    table = Table(title=metric)
+    for column in summary.columns:
+        table.add_column(column, justify="left" if column == "experiment" else "right")
+    for row in summary.iter_rows():
+        table.add_row(*(_format(value) for value in row))
+
+    ui.console.print(table)
+
+
+def _format(value: object) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    return str(value)
@@ -0,0 +1,149 @@
+from itertools import chain
+from pathlib import Path
+from typing import Optional
+import asyncio
+import logging
+import click
+from dishka import FromDishka
+
+from lab.cli.utils import coro
+from lab.core.logging import setup_logging
+from lab.core.ui import UserInterface
+from lab.core.watcher import FileWatcher
+from lab.project.model.project import Experiment
+from lab.project.service.labfile import LabfileService
+from lab.project.service.plan import PlanService
+from lab.project.service.watch import ProjectWatch
+from lab.runtime.model.run import ProjectRun, RunStatus
+from lab.runtime.runtime import Runtime
+from lab.runtime.service.stats import StatsService
+from lab.settings import Settings
+
+logger = logging.getLogger("lab")
+
+
+@click.argument("path", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "-s",
+    "--select",
+    "selectors",
+    multiple=True,
+    help="Only include matching experiments: NAME, NAME+ (and downstream), "
+    "+NAME (and upstream) or a glob. May be repeated.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Maximum number of experiments to run at once (defaults to CPU count)",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the Labfile from scratch instead of using the parse cache",
+)
+@coro
+async def watch(
+    path: Path,
+    selectors: tuple[str, ...],
+    jobs: Optional[int],
+    no_cache: bool,
+    ui: FromDishka[UserInterface],
+    runtime: FromDishka[Runtime],
+    labfile_service: FromDishka[LabfileService],
+    plan_service: FromDishka[PlanService],
+    stats_service: FromDishka[StatsService],
+    settings: FromDishka[Settings],
+):
+    """Run experiments again whenever the Labfile or their scripts change.
+
+    Only the experiments a change affects run again, with everything downstream
+    of them; the rest keep their latest outputs. A change made while experiments
+    are running cancels them and starts again with the change included.
+    """
+    setup_logging(Path("~/.local/lab/logs/lab.log"))
+    project = ProjectWatch(labfile_service, path, selectors, use_cache=not no_cache)
+    affected = set(project.load().experiments)
+
+    with FileWatcher(
+        settings.watch_debounce_seconds, settings.watch_poll_interval_seconds
+    ) as watcher:
+        while True:
+            watcher.watch(project.files())
+            changes = asyncio.ensure_future(watcher.changes())
+            if affected:
+                await _run_until_changed(
+                    project,
+                    affected,
+                    changes,
+                    ui,
+                    runtime,
+                    plan_service,
+                    stats_service,
+                    jobs,
+                )
+            ui.print(f"[dim]Watching {len(project.files())} files for changes[/]")
+            changed = await changes
+            ui.print(f"\nChanged: {', '.join(sorted(p.name for p in changed))}")
+
+            try:
+                affected = project.affected(changed)
+            except Exception as e:
+                # e.g. a Labfile saved half-edited; the next save will try again
+                ui.display_error(message="Couldn't load the project", details=str(e))
+                affected = set()
+                continue
+            if not affected:
+                ui.print("[dim]No experiments are affected[/]")
+
+
+### PRIVATE #######################
+
+
+async def _run_until_changed(
+    project: ProjectWatch,
+    affected: set[Experiment],
+    changes: asyncio.Future,
+    ui: UserInterface,
+    runtime: Runtime,
+    plan_service: PlanService,
+    stats_service: StatsService,
+    jobs: Optional[int],
+) -> None:
+    """Run the affected experiments, cancelling them if files change meanwhile"""
+    subproject = project.project.subproject(affected)
+    plan = plan_service.create_execution_plan(
+        subproject, stats_service.estimator(subproject.experiments)
+    )
+    ui.print(f"[bold]Running {len(affected)} affected experiments[/]")
+
+    execution = asyncio.ensure_future(
+        runtime.start(plan, jobs=jobs, source=project.source)
+    )
+    await asyncio.wait([execution, changes], return_when=asyncio.FIRST_COMPLETED)
+    if not execution.done():
+        ui.print("[yellow]Files changed, cancelling this run[/]")
+        runtime.cancel()
+        await asyncio.wait([execution])
+
+    project_run: Optional[ProjectRun] = None
+    try:
+        project_run = execution.result()
+    except Exception as e:
+        logger.exception("Execution failed")
+        ui.display_error(message="Execution failed", details=str(e))
+
+    planned = [*plan.ordered_experiments, *chain.from_iterable(plan.aliases.values())]
+    project.finished(planned, project_run)
+    if project_run is not None and project_run.status == RunStatus.COMPLETED:
+        failed = [
+            run.experiment.name
+            for run in project_run.experiment_runs
+            if run.status != RunStatus.COMPLETED
+        ]
+        if failed:
+            ui.display_error(message=f"Failed: {', '.join(sorted(failed))}")
+        else:
+            ui.display_success()
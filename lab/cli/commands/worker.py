@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from lab.cli.utils import coro, parse_address
+from lab.instrument.model.instrument import Instrument
+from lab.runtime.service.worker import Worker
+
+
+@click.argument("coordinator")
+@click.option("--name", default=None, help="Name to register as (defaults to host-pid)")
+@click.option(
+    "--cpus",
+    type=click.IntRange(min=1),
+    default=None,
+    help="CPUs to offer (defaults to CPU count)",
+)
+@click.option(
+    "--memory",
+    "memory_bytes",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Bytes of memory to offer (defaults to physical memory)",
+)
+@click.option(
+    "--instruments",
+    "instruments_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="JSON file listing the instruments attached to this machine",
+)
+@click.option(
+    "--wait",
+    type=click.FloatRange(min=0),
+    default=30.0,
+    help="Seconds to keep trying to reach the coordinator",
+)
+@coro
+async def worker(
+    coordinator: str,
+    name: Optional[str],
+    cpus: Optional[int],
+    memory_bytes: Optional[int],
+    instruments_path: Optional[Path],
+    wait: float,
+):
+    """Run experiments for a coordinator started with `lab run --listen`"""
+    host, port = parse_address(coordinator)
+    instruments = (
+        [Instrument.model_validate(i) for i in json.loads(instruments_path.read_text())]
+        if instruments_path
+        else []
+    )
+    await Worker(host, port, name, cpus, memory_bytes, instruments, wait).run()
@@ -1,6 +1,11 @@
 import asyncio
 from functools import wraps
-from typing import Callable
+from typing import Callable, Iterable
+
+import click
+
+from lab.project.model.project import Project
+from lab.project.model.selector import select
 
 
 def coro(f: Callable):
@@ -9,3 +14,46 @@ def coro(f: Callable):
         return asyncio.run(f(*args, **kwargs))
 
     return wrapper
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """HOST:PORT, where HOST defaults to localhost"""
+    host, _, port = address.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise click.BadParameter(f"Expected HOST:PORT, got '{address}'") from None
+
+
+def select_experiments(project: Project, selectors: Iterable[str]) -> Project:
+    """`select`, reporting a bad selector as a usage error on --select"""
+    try:
+        return select(project, selectors)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--select") from e
+
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: str) -> int:
+    """Bytes, or a number with a K, M, G or T suffix (powers of 1024)"""
+    number = size.strip().upper().removesuffix("B").removesuffix("I")
+    unit = number[-1:] if number[-1:] in SIZE_UNITS else ""
+    try:
+        return int(float(number.removesuffix(unit)) * SIZE_UNITS[unit])
+    except ValueError:
+        raise click.BadParameter(
+            f"Expected a size like 500M or 20G, got '{size}'"
+        ) from None
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size}B"
+    value = float(size)
+    for unit in ("K", "M", "G", "T"):
+        value /= 1024
+        if value < 1024 or unit == "T":
+            break
+    return f"{value:.1f}{unit}"
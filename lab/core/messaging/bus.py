@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
+import inspect
 import logging
-from typing import Callable, Type
+from typing import Awaitable, Callable, Optional, Type
 
 from lab.core.messaging.message import Message, TMessage
+from lab.core.tracing import tracer
+
+# Plain functions and coroutine functions both work; the bus awaits the latter
+Subscriber = Callable[[TMessage], Optional[Awaitable[None]]]
 
 
 class MessageBus(ABC):
@@ -15,14 +20,14 @@ class MessageBus(ABC):
 
     @abstractmethod
     def register_handler(
-        self, message_type: Type[TMessage], handler: Callable[[TMessage], None]
+        self, message_type: Type[TMessage], handler: Subscriber[TMessage]
     ) -> None:
         """Register a handler for a specific message type"""
         pass
 
     @abstractmethod
     def subscribe(
-        self, message_type: Type[TMessage], subscriber: Callable[[TMessage], None]
+        self, message_type: Type[TMessage], subscriber: Subscriber[TMessage]
     ) -> None:
         """Subscribe to notifications for a specific message type"""
         pass
@@ -33,12 +38,12 @@ class InMemoryMessageBus(MessageBus):
     """Simple in-memory implementation of the message bus"""
 
     def __init__(self):
-        self._handlers: dict[Type[Message], list[Callable]] = {}
-        self._subscribers: dict[Type[Message], list[Callable]] = {}
+        self._handlers: dict[Type[Message], list[Subscriber]] = {}
+        self._subscribers: dict[Type[Message], list[Subscriber]] = {}
         self._logger = logging.getLogger(__name__)
 
     def register_handler(
-        self, message_type: Type[TMessage], handler: Callable[[TMessage], None]
+        self, message_type: Type[TMessage], handler: Subscriber[TMessage]
     ) -> None:
         if message_type not in self._handlers:
             self._handlers[message_type] = []
@@ -48,7 +53,7 @@ class InMemoryMessageBus(MessageBus):
         )
 
     def subscribe(
-        self, message_type: Type[TMessage], subscriber: Callable[[TMessage], None]
+        self, message_type: Type[TMessage], subscriber: Subscriber[TMessage]
     ) -> None:
         if message_type not in self._subscribers:
             self._subscribers[message_type] = []
@@ -59,26 +64,35 @@ class InMemoryMessageBus(MessageBus):
 
     async def publish(self, message: Message) -> None:
         message_type = type(message)
+        with tracer.span(message_type.__name__, "bus"):
+            # Call handlers
+            handlers = self._handlers.get(message_type, [])
+            for handler in handlers:
+                try:
+                    await _call(handler, message)
+                except Exception as e:
+                    self._logger.error(f"Error in handler {handler.__name__}: {str(e)}")
 
-        # Call handlers
-        handlers = self._handlers.get(message_type, [])
-        for handler in handlers:
-            try:
-                await handler(message)
-            except Exception as e:
-                self._logger.error(f"Error in handler {handler.__name__}: {str(e)}")
-
-        # Notify subscribers
-        subscribers = self._subscribers.get(message_type, [])
-        for subscriber in subscribers:
-            try:
-                await subscriber(message)
-            except Exception as e:
-                self._logger.error(
-                    f"Error in subscriber {subscriber.__name__}: {str(e)}"
-                )
+            # Notify subscribers
+            subscribers = self._subscribers.get(message_type, [])
+            for subscriber in subscribers:
+                try:
+                    await _call(subscriber, message)
+                except Exception as e:
+                    self._logger.error(
+                        f"Error in subscriber {subscriber.__name__}: {str(e)}"
+                    )
 
         self._logger.debug(
             f"Published {message_type.__name__} to "
             f"{len(handlers)} handlers and {len(subscribers)} subscribers"
         )
+
+
+### PRIVATE #######################
+
+
+async def _call(subscriber: Subscriber, message: Message) -> None:
+    result = subscriber(message)
+    if inspect.isawaitable(result):
+        await result
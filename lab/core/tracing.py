@@ -0,0 +1,181 @@
+"""Timelines of what lab spent its time on, in Chrome's trace event format.
+
+Open a written trace in https://ui.perfetto.dev or chrome://tracing. Spans on
+their own are drawn per thread, or per asyncio task when one is running; spans
+inside an experiment's task are drawn on that experiment's track instead, under
+the state it was in (waiting, queued, running or persisting).
+
+Tracing is off unless `tracer.enable()` is called. Until then `span` hands back
+one shared no-op context manager and the other methods return straight away, so
+instrumented code costs a method call.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, ContextManager, Optional
+
+EXPERIMENT = "experiment"  # the category of experiment tracks
+TASK_LANES = 1 << 30  # tids for asyncio tasks start here, clear of real ones
+
+_NOTHING = nullcontext()
+_track: ContextVar[Optional[str]] = ContextVar("lab_trace_track", default=None)
+
+
+class Tracer:
+    """Records spans while enabled, to write as a trace"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._events: list[dict[str, Any]] = []
+        self._pid = os.getpid()
+        self._states: dict[str, str] = {}  # track -> the state it's in
+        self._lanes: dict[int, int] = {}  # id of an asyncio task -> its tid
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._events.append(_metadata("process_name", self._pid, 0, "lab"))
+
+    def disable(self) -> None:
+        """Stop recording, dropping what was recorded"""
+        self.enabled = False
+        self._events, self._states, self._lanes = [], {}, {}
+
+    def span(self, name: str, category: str = "lab", **args: Any) -> ContextManager:
+        """Record the time spent in a `with` block"""
+        if not self.enabled:
+            return _NOTHING
+        return _Span(self, name, category, args)
+
+    def open_track(self, track: str, name: str) -> None:
+        """Start a track for one experiment, drawn as a span named `name`"""
+        if not self.enabled:
+            return
+        self._async("b", name, track)
+
+    def transition(self, track: str, state: str) -> None:
+        """Move a track into a new state, ending the one it was in"""
+        if not self.enabled:
+            return
+        previous = self._states.get(track)
+        if previous is not None:
+            self._async("e", previous, track)
+        self._states[track] = state
+        self._async("b", state, track)
+
+    def close_track(self, track: str, name: str) -> None:
+        if not self.enabled:
+            return
+        state = self._states.pop(track, None)
+        if state is not None:
+            self._async("e", state, track)
+        self._async("e", name, track)
+
+    def enter_track(self, track: str) -> None:
+        """Draw spans from the current task (and what it starts) on `track`"""
+        if self.enabled:
+            _track.set(track)
+
+    def write(self, path: Path) -> None:
+        with self._lock:
+            events = list(self._events)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    ### PRIVATE #######################
+
+    def _record(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    def _async(
+        self,
+        phase: str,
+        name: str,
+        track: str,
+        timestamp: Optional[float] = None,
+        args: Optional[dict[str, Any]] = None,
+    ) -> None:
+        event = {
+            "ph": phase,
+            "name": name,
+            "cat": EXPERIMENT,
+            "id": track,
+            "ts": _now() if timestamp is None else timestamp,
+            "pid": self._pid,
+            "tid": 0,
+        }
+        if args:
+            event["args"] = args
+        self._record(event)
+
+    def _lane(self) -> int:
+        """The tid to draw the current task's spans with, or the thread's"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None  # no event loop in this thread
+        if task is None:
+            return threading.get_native_id()
+
+        with self._lock:
+            lane = self._lanes.get(id(task))
+            if lane is None:
+                lane = self._lanes[id(task)] = TASK_LANES + len(self._lanes)
+                self._events.append(
+                    _metadata("thread_name", self._pid, lane, task.get_name())
+                )
+        return lane
+
+
+tracer = Tracer()
+
+
+### PRIVATE #######################
+
+
+class _Span:
+    def __init__(self, tracer: Tracer, name: str, category: str, args: dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = _now()
+
+    def __exit__(self, *_: object) -> None:
+        end = _now()
+        track = _track.get()
+        if track is not None:
+            self._tracer._async("b", self._name, track, self._start, self._args)
+            self._tracer._async("e", self._name, track, end)
+            return
+
+        event = {
+            "ph": "X",
+            "name": self._name,
+            "cat": self._category,
+            "ts": self._start,
+            "dur": end - self._start,
+            "pid": self._tracer._pid,
+            "tid": self._tracer._lane(),
+        }
+        if self._args:
+            event["args"] = self._args
+        self._tracer._record(event)
+
+
+def _now() -> float:
+    """Microseconds, as trace timestamps are"""
+    return time.perf_counter_ns() / 1000
+
+
+def _metadata(kind: str, pid: int, tid: int, name: str) -> dict[str, Any]:
+    return {"ph": "M", "name": kind, "pid": pid, "tid": tid, "args": {"name": name}}
@@ -5,6 +5,7 @@ from typing import Optional, Sequence
 
 from lab.core.messaging.bus import MessageBus
 from lab.runtime.messages import (
+    ExperimentRunCancelled,
     ExperimentRunComplete,
     ExperimentRunFailed,
     ExperimentRunStarted,
@@ -27,6 +28,9 @@ class UserInterface:
             ExperimentRunComplete, self.render_experiment_complete
         )
         self._message_bus.subscribe(ExperimentRunFailed, self.render_experiment_failed)
+        self._message_bus.subscribe(
+            ExperimentRunCancelled, self.render_experiment_cancelled
+        )
 
     def create_progress(self) -> Progress:
         """Create a progress display for long-running operations"""
@@ -72,6 +76,17 @@ class UserInterface:
         )
         self.console.print(f"  Error: {message.reason}", style="red")
 
+    def render_experiment_cancelled(self, message: ExperimentRunCancelled) -> None:
+        """Display when an experiment is stopped"""
+        self.console.print(
+            f"[bold yellow]■[/] Cancelled experiment: {message.run.experiment.name}"
+        )
+        self.console.print(f"  Reason: {message.reason}", style="yellow")
+
+    def display_cancelled(self) -> None:
+        """Display when a run was stopped before all experiments ran"""
+        self.console.print("[yellow]■[/] Run cancelled")
+
     def display_experiment_summary(self, results: Sequence[dict]) -> None:
         """Display summary table of experiment results"""
         table = Table(title="Experiment Results")
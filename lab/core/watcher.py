@@ -0,0 +1,216 @@
+"""Waiting for files to change: with inotify on Linux, and by polling elsewhere.
+
+The directories holding the files are watched rather than the files themselves,
+since editors often save by writing a new file and renaming it over the old one,
+which would leave a watch on the old file behind.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# From sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000  # the watch was removed, e.g. with its directory
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+READ_BYTES = 64 * 1024
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name that follows
+
+
+class FileWatcher:
+    """Reports changes to a set of files, in debounced batches.
+
+    A batch is returned once no watched file has changed for `debounce_seconds`,
+    so a save that touches several files (or one file several times) is one
+    batch. Without inotify, files are checked every `poll_interval_seconds`.
+    """
+
+    def __init__(
+        self,
+        debounce_seconds: float = 0.2,
+        poll_interval_seconds: float = 0.5,
+        use_inotify: bool = True,
+    ):
+        self._debounce_seconds = debounce_seconds
+        self._poll_interval_seconds = poll_interval_seconds
+        self._paths: dict[str, Path] = {}  # absolute path -> as given
+        self._inotify = _Inotify.open() if use_inotify else None
+        self._readable: Optional[asyncio.Event] = None
+        self._stats: dict[str, Optional[tuple[int, int, int]]] = {}
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    @property
+    def polling(self) -> bool:
+        return self._inotify is None
+
+    def watch(self, paths: Iterable[Path]) -> None:
+        """Watch these files (which needn't exist yet) instead of the previous ones"""
+        self._paths = {os.path.abspath(path): path for path in paths}
+        if self._inotify is not None:
+            try:
+                for directory in {os.path.dirname(p) for p in self._paths}:
+                    self._inotify.add(directory)
+            except OSError as e:
+                logger.info(f"Watching files by polling ({e.strerror})")
+                self._stop_inotify()
+        self._stats = {path: _stat(path) for path in self._paths}
+
+    async def changes(self) -> set[Path]:
+        """Wait for watched files to change, returning the ones that did"""
+        changed: set[str] = set()
+        while not changed:
+            changed = await self._next()
+
+        # Polling only notices changes every interval, so it waits that much longer
+        quiet = self._debounce_seconds + (
+            self._poll_interval_seconds if self.polling else 0.0
+        )
+        loop = asyncio.get_running_loop()
+        quiet_until = loop.time() + quiet
+        while (remaining := quiet_until - loop.time()) > 0:
+            try:
+                more = await asyncio.wait_for(self._next(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if more:
+                changed |= more
+                quiet_until = loop.time() + quiet
+
+        return {self._paths[path] for path in changed if path in self._paths}
+
+    def close(self) -> None:
+        self._stop_inotify()
+
+    ### PRIVATE #######################
+
+    async def _next(self) -> set[str]:
+        """Watched files that changed since the last call, once there is any change"""
+        if self._inotify is None:
+            await asyncio.sleep(self._poll_interval_seconds)
+            return self._poll()
+
+        if self._readable is None:
+            self._readable = asyncio.Event()
+            asyncio.get_running_loop().add_reader(self._inotify.fd, self._readable.set)
+        await self._readable.wait()
+        self._readable.clear()
+        paths = self._inotify.read()
+        if paths is None:
+            return set(self._paths)  # events were dropped, so anything may have changed
+        return {path for path in paths if path in self._paths}
+
+    def _poll(self) -> set[str]:
+        changed = set()
+        for path, previous in self._stats.items():
+            current = _stat(path)
+            if current != previous:
+                self._stats[path] = current
+                changed.add(path)
+        return changed
+
+    def _stop_inotify(self) -> None:
+        if self._inotify is None:
+            return
+        if self._readable is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            except RuntimeError:
+                pass  # the loop has already gone
+            self._readable = None
+        self._inotify.close()
+        self._inotify = None
+
+
+### PRIVATE #######################
+
+
+class _Inotify:
+    """An inotify instance, through libc since the standard library has no binding"""
+
+    def __init__(self, libc: ctypes.CDLL, fd: int):
+        self._libc = libc
+        self.fd = fd
+        self._directories: dict[int, str] = {}  # watch descriptor -> directory
+
+    @classmethod
+    def open(cls) -> Optional["_Inotify"]:
+        """A new instance, or None where inotify isn't available"""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None  # not Linux
+        if fd < 0:
+            logger.info(
+                f"Watching files by polling ({os.strerror(ctypes.get_errno())})"
+            )
+            return None
+        return cls(libc, fd)
+
+    def add(self, directory: str) -> None:
+        if directory in self._directories.values():
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                return  # the directory doesn't exist yet; its files can't either
+            raise OSError(error, os.strerror(error), directory)
+        self._directories[wd] = directory
+
+    def read(self) -> Optional[set[str]]:
+        """Paths with pending events, or None if the kernel's queue overflowed"""
+        try:
+            data = os.read(self.fd, READ_BYTES)
+        except BlockingIOError:
+            return set()
+
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            directory = self._directories.get(wd)
+            if directory is not None and name:
+                paths.add(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _stat(path: str) -> Optional[tuple[int, int, int]]:
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
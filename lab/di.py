@@ -4,15 +4,31 @@ from sqlalchemy import Engine, StaticPool, create_engine
 
 from lab.core.messaging.bus import InMemoryMessageBus, MessageBus
 from lab.core.ui import UserInterface
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.instrument.service.telemetry import TelemetryService
+from lab.project.persistence.cache import ParseCache
+from lab.project.service.artifact import PlanArtifactService
 from lab.project.service.labfile import LabfileService
 from lab.project.service.plan import PlanService
+from lab.runtime.persistence.artifacts import ArtifactStore
+from lab.runtime.persistence.metrics import MetricsStore
 from lab.runtime.persistence.memory import (
     InMemoryExperimentRunRepository,
     InMemoryProjectRunRepository,
 )
 from lab.runtime.persistence.run import ExperimentRunRepository, ProjectRunRepository
+from lab.runtime.persistence.workspace import ContentStore, WorkspaceProvisioner
 from lab.runtime.runtime import Runtime
+from lab.runtime.service.metrics import ResourceSampler
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.gc import GarbageCollector
+from lab.runtime.service.simulation import PlanSimulator
+from lab.runtime.service.report import ReportServer
+from lab.runtime.service.streams import StreamChannels
 from lab.runtime.service.run import RunService
+from lab.runtime.service.stats import StatsService
+from lab.settings import Settings
 
 
 class EngineProvider(Provider):
@@ -36,10 +52,67 @@ class EngineProvider(Provider):
         yield engine
 
 
+class SettingsProvider(Provider):
+    @provide(scope=Scope.APP)
+    def settings(self) -> Settings:
+        return Settings()
+
+    @provide(scope=Scope.APP)
+    def parse_cache(self, settings: Settings) -> ParseCache:
+        return ParseCache(
+            settings.cache_dir / "parse",
+            max_bytes=settings.parse_cache_max_bytes,
+            enabled=settings.parse_cache,
+        )
+
+    @provide(scope=Scope.APP)
+    def artifact_store(self, settings: Settings, store: ContentStore) -> ArtifactStore:
+        return ArtifactStore(settings.artifacts_dir, store)
+
+    @provide(scope=Scope.APP)
+    def content_store(self, settings: Settings) -> ContentStore:
+        return ContentStore(settings.store_dir)
+
+    @provide(scope=Scope.APP)
+    def workspaces(
+        self, settings: Settings, store: ContentStore
+    ) -> WorkspaceProvisioner:
+        return WorkspaceProvisioner(
+            store,
+            settings.workspaces_dir,
+            links=settings.workspace_links,
+            retention=settings.workspace_retention,
+            ignore=settings.workspace_ignore,
+        )
+
+    @provide(scope=Scope.APP)
+    def metrics_store(self, settings: Settings) -> MetricsStore:
+        return MetricsStore(
+            settings.data_dir / "metrics",
+            flush_rows=settings.metrics_flush_rows,
+            compact_files=settings.metrics_compact_files,
+        )
+
+
+class InstrumentProvider(Provider):
+    @provide(scope=Scope.APP)
+    def registry(self) -> InstrumentRegistry:
+        return InstrumentRegistry()
+
+    @provide(scope=Scope.APP)
+    def reservation_calendar(self, registry: InstrumentRegistry) -> ReservationCalendar:
+        return ReservationCalendar(registry)
+
+
 class DI:
     def __init__(self) -> None:
         self._container = make_container(
-            self.core(), self.repositories(), self.services(), EngineProvider()
+            self.core(),
+            self.repositories(),
+            self.services(),
+            EngineProvider(),
+            SettingsProvider(),
+            InstrumentProvider(),
         )
 
     @property
@@ -65,8 +138,17 @@ class DI:
     def services(self) -> Provider:
         provider = Provider(scope=Scope.APP)
         provider.provide(RunService)
+        provider.provide(StatsService)
         provider.provide(PlanService)
         provider.provide(LabfileService)
+        provider.provide(PlanArtifactService)
+        provider.provide(ResourceSampler)
+        provider.provide(TelemetryService)
+        provider.provide(ReportServer)
+        provider.provide(StreamChannels)
+        provider.provide(Coordinator)
+        provider.provide(GarbageCollector)
+        provider.provide(PlanSimulator)
         provider.provide(Runtime)
 
         return provider
@@ -3,7 +3,7 @@ from enum import Enum
 from typing import Optional
 from uuid import UUID
 
-from pydantic import Field
+from pydantic import ConfigDict, Field
 
 from lab.core.model import Model
 
@@ -24,11 +24,23 @@ class InstrumentStatus(str, Enum):
 class InstrumentCapability(Model):
     """A specific capability of an instrument"""
 
+    model_config = ConfigDict(frozen=True)  # hashable, so capabilities can be sets
+
     name: str  # e.g. "temperature_measurement", "pressure_control"
     unit: str  # e.g. "celsius", "pascal"
     range: tuple[float, float]  # e.g. (-50, 100)
     precision: float  # e.g. 0.1
 
+    def satisfies(self, required: "InstrumentCapability") -> bool:
+        """Whether this capability covers the required range at least as precisely"""
+        return (
+            self.name == required.name
+            and self.unit == required.unit
+            and self.range[0] <= required.range[0]
+            and self.range[1] >= required.range[1]
+            and self.precision <= required.precision
+        )
+
 
 class Instrument(Model):
     id: UUID
@@ -40,7 +52,9 @@ class Instrument(Model):
 class InstrumentRequirements(Model):
     """Requirements for instruments needed by an experiment"""
 
-    capabilities: set[InstrumentCapability]
+    capabilities: set[InstrumentCapability] = Field(default_factory=set)
+    cpus: int = Field(default=1, ge=1)
+    memory_bytes: int = Field(default=0, ge=0)
 
 
 class InstrumentClaim(Model):
@@ -0,0 +1,263 @@
+import heapq
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from uuid import UUID
+
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentClaim,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.plan import ExecutionPlan
+
+EXCLUSIVE_KINDS = frozenset({InstrumentKind.PHYSICAL, InstrumentKind.SENSOR})
+
+
+class Reservation(InstrumentClaim):
+    """A claim booked for a future slot: `acquired_at` to `released_at`"""
+
+    experiment_id: UUID
+
+    @property
+    def ends_at(self) -> datetime:
+        """End of the slot, or of the run once released early"""
+        assert self.released_at is not None  # always booked with an end
+        return self.released_at
+
+    @property
+    def duration(self) -> timedelta:
+        return self.ends_at - self.acquired_at
+
+
+class ReservationCalendar:
+    """Books time slots on exclusive instruments for queued experiments.
+
+    Reservations never move once made, and a new one is placed in the earliest gap
+    long enough to hold it on any matching instrument. Short experiments therefore
+    backfill idle time without delaying anything booked before them (conservative
+    backfilling). The clock can be replaced to drive the calendar in tests, or in
+    simulated time.
+
+    An experiment holds its instrument from `begin` until `release`; until then its
+    reservation is only a booking, which `rebook` moves to the earliest gap from
+    now once the experiment is ready to start.
+    """
+
+    def __init__(
+        self,
+        registry: InstrumentRegistry,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self._registry = registry
+        self._clock = clock
+        self._bookings: dict[UUID, list[tuple[datetime, int, Reservation]]] = {}
+        self._booked = 0
+        self._pending: dict[UUID, Reservation] = {}  # by experiment, not begun
+        self._starts: list[tuple[datetime, int, Reservation]] = []  # heap, of pending
+        self._holders: dict[UUID, Reservation] = {}  # by instrument, begun
+
+    def now(self) -> datetime:
+        return self._clock()
+
+    def reserve(
+        self,
+        experiment_id: UUID,
+        requirements: InstrumentRequirements,
+        duration: timedelta,
+        earliest: Optional[datetime] = None,
+    ) -> Reservation:
+        """Book the earliest slot of the given length on a matching instrument"""
+        instruments = self.instruments(requirements)
+        if not instruments:
+            raise ValueError("No exclusive instrument satisfies the requirements")
+
+        now = self._clock()
+        not_before = max(earliest, now) if earliest else now
+        instrument, start = min(
+            (
+                (instrument, self._first_gap(instrument, not_before, duration))
+                for instrument in instruments
+            ),
+            key=lambda candidate: candidate[1],
+        )
+        reservation = Reservation(
+            instrument=instrument,
+            kind=instrument.kind,
+            experiment_id=experiment_id,
+            acquired_at=start,
+            released_at=start + duration,
+        )
+        booking = (start, self._booked, reservation)
+        insort(self._bookings.setdefault(instrument.id, []), booking)
+        heapq.heappush(self._starts, booking)
+        self._booked += 1
+        self._pending[experiment_id] = reservation
+        return reservation
+
+    def rebook(
+        self,
+        experiment_id: UUID,
+        requirements: InstrumentRequirements,
+        duration: timedelta,
+    ) -> Reservation:
+        """Move an experiment's booking to the earliest slot from now.
+
+        Its old slot is free while looking, so the new one is never later than it
+        unless it has already passed.
+        """
+        booking = self._pending.get(experiment_id)
+        if booking is not None:
+            self.cancel(booking)
+        return self.reserve(experiment_id, requirements, duration)
+
+    def booking(self, experiment_id: UUID) -> Optional[Reservation]:
+        """The experiment's reservation, if it hasn't begun yet"""
+        return self._pending.get(experiment_id)
+
+    def upcoming(self) -> list[Reservation]:
+        """Reservations not begun yet whose slots are still to come, earliest first"""
+        now = self._clock()
+        starts = self._starts
+        while starts and not self._is_upcoming(starts[0][2], now):
+            heapq.heappop(starts)
+        if starts:
+            # A sorted list is still a heap
+            starts[:] = sorted(b for b in starts if self._is_upcoming(b[2], now))
+        return [booking[2] for booking in starts]
+
+    def due(self, reservation: Reservation) -> bool:
+        """Whether its slot has come and its instrument isn't still held"""
+        return (
+            reservation.acquired_at <= self._clock()
+            and reservation.instrument.id not in self._holders
+        )
+
+    def begin(self, reservation: Reservation) -> None:
+        """Hand the instrument to the experiment the reservation was made for"""
+        self._pending.pop(reservation.experiment_id, None)
+        self._holders[reservation.instrument.id] = reservation
+        self._registry.set_status(reservation.instrument, InstrumentStatus.IN_USE)
+
+    def reserve_plan(self, plan: ExecutionPlan) -> dict[UUID, Reservation]:
+        """Book every experiment in a plan that needs an exclusive instrument.
+
+        Experiments are booked in execution order, no earlier than the projected
+        end of their dependencies, using the plan's duration estimates.
+        """
+        now = self._clock()
+        ends: dict[UUID, datetime] = {}
+        reservations: dict[UUID, Reservation] = {}
+        for experiment in plan.ordered_experiments:
+            start = max(
+                (ends[d.id] for d in plan.project.dependencies_of(experiment)),
+                default=now,
+            )
+            duration = timedelta(seconds=plan.estimates.get(experiment.id, 0.0))
+            requirements = experiment.requirements
+            if requirements is not None and self.instruments(requirements):
+                reservation = self.reserve(
+                    experiment.id, requirements, duration, earliest=start
+                )
+                reservations[experiment.id] = reservation
+                start = reservation.acquired_at
+            ends[experiment.id] = start + duration
+
+        return reservations
+
+    def release(self, reservation: Reservation, at: Optional[datetime] = None) -> None:
+        """End a reservation, freeing the rest of its slot if it finished early.
+
+        Its booking is dropped once the slot is over, so the calendar only holds
+        what is still to come.
+        """
+        bookings = self._bookings.get(reservation.instrument.id, [])
+        now = self._clock()
+        at = at or now
+        if at > reservation.acquired_at:
+            reservation.released_at = min(reservation.ends_at, at)
+        if at <= reservation.acquired_at or reservation.ends_at <= now:
+            self._remove(bookings, reservation)
+        if self._holders.get(reservation.instrument.id) is reservation:
+            del self._holders[reservation.instrument.id]
+            self._registry.set_status(
+                reservation.instrument, InstrumentStatus.AVAILABLE
+            )
+
+    def cancel(self, reservation: Reservation) -> None:
+        """Drop a booking that won't be used"""
+        if self._pending.get(reservation.experiment_id) is reservation:
+            del self._pending[reservation.experiment_id]
+        self._remove(self._bookings.get(reservation.instrument.id, []), reservation)
+
+    def reservations(self, instrument: Instrument) -> list[Reservation]:
+        return [booking[2] for booking in self._bookings.get(instrument.id, [])]
+
+    def instruments(self, requirements: InstrumentRequirements) -> list[Instrument]:
+        """Exclusive instruments that satisfy the requirements, whatever their status"""
+        if not requirements.capabilities:
+            return []
+        return [
+            instrument
+            for instrument in self._registry.match(requirements, available=False)
+            if instrument.kind in EXCLUSIVE_KINDS
+        ]
+
+    def utilisation(
+        self, horizon: timedelta, start: Optional[datetime] = None
+    ) -> dict[UUID, float]:
+        """Fraction of the window each exclusive instrument is booked for"""
+        start = start or self._clock()
+        end = start + horizon
+        window = horizon.total_seconds()
+        utilisation = {}
+        for instrument in self._registry.instruments:
+            if instrument.kind not in EXCLUSIVE_KINDS:
+                continue
+            booked = sum(
+                max(
+                    0.0,
+                    (min(r.ends_at, end) - max(r.acquired_at, start)).total_seconds(),
+                )
+                for r in self.reservations(instrument)
+            )
+            utilisation[instrument.id] = booked / window if window > 0 else 0.0
+
+        return utilisation
+
+    ### PRIVATE #######################
+
+    def _first_gap(
+        self, instrument: Instrument, not_before: datetime, duration: timedelta
+    ) -> datetime:
+        """Start of the earliest idle period of at least `duration`"""
+        bookings = self._bookings.get(instrument.id, [])
+        # Bookings don't overlap, so ends are sorted too and everything before the
+        # last one starting at or before `not_before` is already over
+        position = max(bisect_right(bookings, (not_before, self._booked)) - 1, 0)
+        candidate = not_before
+        for start, _, reservation in bookings[position:]:
+            if start - candidate >= duration:
+                break
+            candidate = max(candidate, reservation.ends_at)
+
+        return candidate
+
+    def _is_upcoming(self, reservation: Reservation, now: datetime) -> bool:
+        return (
+            reservation.acquired_at > now
+            and self._pending.get(reservation.experiment_id) is reservation
+        )
+
+    def _remove(
+        self,
+        bookings: list[tuple[datetime, int, Reservation]],
+        reservation: Reservation,
+    ) -> None:
+        for i, booking in enumerate(bookings):
+            if booking[2] is reservation:
+                del bookings[i]
+                return
@@ -0,0 +1,141 @@
+import os
+from datetime import datetime
+from typing import Optional
+
+from pydantic import Field
+
+from lab.core.model import Model
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentClaim,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.calendar import EXCLUSIVE_KINDS
+from lab.instrument.service.registry import InstrumentRegistry
+
+DEFAULT_REQUIREMENTS = InstrumentRequirements()
+
+
+class Allocation(Model):
+    """Resources held by one running experiment"""
+
+    cpus: int
+    memory_bytes: int
+    claims: list[InstrumentClaim] = Field(default_factory=list)
+
+
+class ResourcePool:
+    """CPU slots, memory and registered compute instruments on the local machine.
+
+    Requirements are acquired all at once or not at all, so a partially admitted
+    experiment never holds resources another one is waiting for. Physical
+    instruments and sensors are left to the reservation calendar.
+
+    A pool spanning several machines is given the most CPUs and memory any one
+    of them has, since an experiment can't be split between them.
+    """
+
+    def __init__(
+        self,
+        cpus: int,
+        memory_bytes: Optional[int] = None,
+        registry: Optional[InstrumentRegistry] = None,
+        max_cpus: Optional[int] = None,
+        max_memory_bytes: Optional[int] = None,
+    ):
+        self.total_cpus = cpus
+        self.total_memory_bytes = (
+            memory_bytes if memory_bytes is not None else physical_memory_bytes()
+        )
+        self.free_cpus = self.total_cpus
+        self.free_memory_bytes = self.total_memory_bytes
+        self.max_cpus = max_cpus
+        self.max_memory_bytes = max_memory_bytes
+        self._registry = registry or InstrumentRegistry()
+
+    def check(self, requirements: Optional[InstrumentRequirements]) -> Optional[str]:
+        """Why the requirements can never be met by this pool, if they can't"""
+        requirements = requirements or DEFAULT_REQUIREMENTS
+        if requirements.cpus > self.total_cpus:
+            return f"needs {requirements.cpus} CPUs but only {self.total_cpus} are available"
+        if requirements.memory_bytes > self.total_memory_bytes:
+            return (
+                f"needs {requirements.memory_bytes} bytes of memory but only "
+                f"{self.total_memory_bytes} are available"
+            )
+        if self.max_cpus is not None and requirements.cpus > self.max_cpus:
+            return (
+                f"needs {requirements.cpus} CPUs but no machine has more than "
+                f"{self.max_cpus}"
+            )
+        if (
+            self.max_memory_bytes is not None
+            and requirements.memory_bytes > self.max_memory_bytes
+        ):
+            return (
+                f"needs {requirements.memory_bytes} bytes of memory but no machine "
+                f"has more than {self.max_memory_bytes}"
+            )
+        if requirements.capabilities and not self._match(requirements, available=False):
+            return "needs capabilities no instrument provides"
+        return None
+
+    def fits(self, requirements: Optional[InstrumentRequirements]) -> bool:
+        """Whether the requirements could be acquired right now"""
+        requirements = requirements or DEFAULT_REQUIREMENTS
+        return (
+            requirements.cpus <= self.free_cpus
+            and requirements.memory_bytes <= self.free_memory_bytes
+            and (not requirements.capabilities or bool(self._match(requirements)))
+        )
+
+    def try_acquire(
+        self, requirements: Optional[InstrumentRequirements]
+    ) -> Optional[Allocation]:
+        """Claim everything the requirements ask for, or nothing"""
+        requirements = requirements or DEFAULT_REQUIREMENTS
+        if not self.fits(requirements):
+            return None
+
+        claims = []
+        if requirements.capabilities:
+            instrument = self._match(requirements)[0]
+            self._registry.set_status(instrument, InstrumentStatus.IN_USE)
+            claims.append(InstrumentClaim(instrument=instrument, kind=instrument.kind))
+
+        self.free_cpus -= requirements.cpus
+        self.free_memory_bytes -= requirements.memory_bytes
+        return Allocation(
+            cpus=requirements.cpus,
+            memory_bytes=requirements.memory_bytes,
+            claims=claims,
+        )
+
+    def release(self, allocation: Allocation) -> None:
+        self.free_cpus += allocation.cpus
+        self.free_memory_bytes += allocation.memory_bytes
+        for claim in allocation.claims:
+            if claim.kind in EXCLUSIVE_KINDS:
+                continue  # booked in the calendar, which releases it
+            claim.released_at = datetime.now()
+            self._registry.set_status(claim.instrument, InstrumentStatus.AVAILABLE)
+
+    ### PRIVATE #######################
+
+    def _match(
+        self, requirements: InstrumentRequirements, available: bool = True
+    ) -> list[Instrument]:
+        """Compute and GPU instruments that satisfy the requirements"""
+        return [
+            instrument
+            for instrument in self._registry.match(requirements, available)
+            if instrument.kind not in EXCLUSIVE_KINDS
+        ]
+
+
+def physical_memory_bytes() -> int:
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return 2**63 - 1  # unknown, so don't limit
@@ -0,0 +1,190 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Optional
+from uuid import UUID
+
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+
+
+class InstrumentRegistry:
+    """Known instruments, indexed by what they can do.
+
+    Capabilities are grouped by name and unit, and each group keeps its range
+    bounds and precision in sorted columns. A required capability is matched by
+    bisecting all three columns and only checking the narrowest slice, so a query
+    costs a few binary searches plus the candidates that could actually match.
+    Available instruments are tracked as a set that is updated as statuses change.
+    Internally instruments are keyed by registration number, which is cheaper to
+    hash than a UUID and sorts into registration order.
+    """
+
+    def __init__(self, instruments: Iterable[Instrument] = ()):
+        self._instruments: dict[int, Instrument] = {}
+        self._keys: dict[UUID, int] = {}
+        self._groups: dict[tuple[str, str], _CapabilityGroup] = {}
+        self._available: set[int] = set()
+        self._candidates: dict[InstrumentCapability, frozenset[int]] = {}
+        self._registered = 0
+        for instrument in instruments:
+            self.register(instrument)
+
+    @property
+    def instruments(self) -> list[Instrument]:
+        return list(self._instruments.values())
+
+    def get(self, id: UUID) -> Optional[Instrument]:
+        key = self._keys.get(id)
+        return self._instruments[key] if key is not None else None
+
+    def register(self, instrument: Instrument) -> None:
+        self.unregister(instrument.id)
+
+        key = self._registered
+        self._registered += 1
+        self._instruments[key] = instrument
+        self._keys[instrument.id] = key
+        for capability in instrument.capabilities:
+            group = (capability.name, capability.unit)
+            self._groups.setdefault(group, _CapabilityGroup()).add(capability, key)
+        if instrument.status == InstrumentStatus.AVAILABLE:
+            self._available.add(key)
+        self._candidates.clear()
+
+    def unregister(self, id: UUID) -> None:
+        key = self._keys.pop(id, None)
+        if key is None:
+            return
+
+        instrument = self._instruments.pop(key)
+        for capability in instrument.capabilities:
+            group = self._groups[(capability.name, capability.unit)]
+            group.remove(capability, key)
+            if not group:
+                del self._groups[(capability.name, capability.unit)]
+        self._available.discard(key)
+        self._candidates.clear()
+
+    def set_status(self, instrument: Instrument, status: InstrumentStatus) -> None:
+        instrument.status = status
+        key = self._keys.get(instrument.id)
+        if key is None:
+            return
+
+        if status == InstrumentStatus.AVAILABLE:
+            self._available.add(key)
+        else:
+            self._available.discard(key)
+
+    def available(self) -> list[Instrument]:
+        return self._sorted(self._available)
+
+    def match(
+        self, requirements: InstrumentRequirements, available: bool = True
+    ) -> list[Instrument]:
+        """Instruments that satisfy every required capability, in registration order"""
+        if not requirements.capabilities:
+            return self._sorted(self._available if available else self._instruments)
+
+        # Narrowest candidate sets first, so the intersection shrinks quickly
+        candidates = sorted(
+            (self._satisfying(need) for need in requirements.capabilities), key=len
+        )
+        matched = candidates[0] & self._available if available else candidates[0]
+        for ids in candidates[1:]:
+            matched &= ids
+            if not matched:
+                return []
+
+        return self._sorted(matched)
+
+    ### PRIVATE #######################
+
+    def _satisfying(self, need: InstrumentCapability) -> frozenset[int]:
+        """Instruments with a capability covering the requirement, whatever their status"""
+        ids = self._candidates.get(need)
+        if ids is None:
+            group = self._groups.get((need.name, need.unit))
+            ids = group.satisfying(need) if group else frozenset()
+            self._candidates[need] = ids
+        return ids
+
+    def _sorted(self, keys: Iterable[int]) -> list[Instrument]:
+        return [self._instruments[key] for key in sorted(keys)]
+
+
+class _SortedColumn:
+    """One attribute of a capability group, sorted for bisection"""
+
+    def __init__(self) -> None:
+        self._values: list[float] = []
+        self._entries: list[int] = []
+
+    def add(self, value: float, entry: int) -> None:
+        position = bisect_right(self._values, value)
+        self._values.insert(position, value)
+        self._entries.insert(position, entry)
+
+    def remove(self, value: float, entry: int) -> None:
+        position = bisect_left(self._values, value)
+        while self._entries[position] != entry:
+            position += 1
+        del self._values[position]
+        del self._entries[position]
+
+    def at_most(self, value: float) -> tuple[list[int], int, int]:
+        """Entries with a value no greater than the given one, as a slice"""
+        return self._entries, 0, bisect_right(self._values, value)
+
+    def at_least(self, value: float) -> tuple[list[int], int, int]:
+        """Entries with a value no less than the given one, as a slice"""
+        return self._entries, bisect_left(self._values, value), len(self._values)
+
+
+class _CapabilityGroup:
+    """Capabilities sharing a name and unit"""
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[InstrumentCapability, int]] = {}
+        self._keys: dict[tuple[InstrumentCapability, int], int] = {}
+        self._next = 0
+        self._low = _SortedColumn()
+        self._high = _SortedColumn()
+        self._precision = _SortedColumn()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, capability: InstrumentCapability, instrument: int) -> None:
+        entry = self._next
+        self._next += 1
+        self._entries[entry] = (capability, instrument)
+        self._keys[(capability, instrument)] = entry
+        self._low.add(capability.range[0], entry)
+        self._high.add(capability.range[1], entry)
+        self._precision.add(capability.precision, entry)
+
+    def remove(self, capability: InstrumentCapability, instrument: int) -> None:
+        entry = self._keys.pop((capability, instrument))
+        del self._entries[entry]
+        self._low.remove(capability.range[0], entry)
+        self._high.remove(capability.range[1], entry)
+        self._precision.remove(capability.precision, entry)
+
+    def satisfying(self, need: InstrumentCapability) -> frozenset[int]:
+        slices = (
+            self._low.at_most(need.range[0]),
+            self._high.at_least(need.range[1]),
+            self._precision.at_most(need.precision),
+        )
+        entries, start, end = min(slices, key=lambda s: s[2] - s[1])
+        return frozenset(
+            instrument
+            for capability, instrument in (
+                self._entries[entry] for entry in entries[start:end]
+            )
+            if capability.satisfies(need)
+        )
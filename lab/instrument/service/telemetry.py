@@ -0,0 +1,251 @@
+from datetime import datetime
+from typing import Literal, Optional, Sequence, Union
+from uuid import UUID
+
+import numpy as np
+
+from lab.instrument.model.instrument import Instrument, InstrumentMetric
+from lab.settings import Settings
+
+Aggregate = Literal["min", "max", "mean"]
+Timestamps = Union[np.ndarray, Sequence[float]]
+
+
+class RingBuffer:
+    """Fixed-capacity columns of float64, overwriting the oldest rows when full"""
+
+    def __init__(self, capacity: int, columns: int):
+        self._data = np.empty((columns, capacity), dtype=np.float64)
+        self._capacity = capacity
+        self._head = 0  # next row to write
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, *columns: np.ndarray) -> None:
+        count = len(columns[0])
+        if count >= self._capacity:
+            # Only the newest rows survive, so write them in one go
+            for i, column in enumerate(columns):
+                self._data[i] = column[count - self._capacity :]
+            self._head, self._size = 0, self._capacity
+            return
+
+        first = min(count, self._capacity - self._head)
+        for i, column in enumerate(columns):
+            self._data[i, self._head : self._head + first] = column[:first]
+            self._data[i, : count - first] = column[first:]
+        self._head = (self._head + count) % self._capacity
+        self._size = min(self._size + count, self._capacity)
+
+    def columns(self) -> np.ndarray:
+        """Copy of the rows, oldest first, with one array per column"""
+        start = (self._head - self._size) % self._capacity
+        if start + self._size <= self._capacity:
+            return self._data[:, start : start + self._size].copy()
+        return np.concatenate(
+            (self._data[:, start:], self._data[:, : self._head]), axis=1
+        )
+
+
+class _Tier:
+    """Fixed-width buckets of min, max and mean, fed from raw samples"""
+
+    def __init__(self, width: float, capacity: int):
+        self.width = width
+        self._buckets = RingBuffer(capacity, columns=4)  # start, min, max, mean
+        # The newest bucket stays open until a sample lands in a later one
+        self._open: Optional[tuple[float, float, float, float, int]] = None
+
+    def add(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        buckets = np.floor(timestamps / self.width)
+        starts = np.flatnonzero(np.diff(buckets, prepend=np.nan))
+        counts = np.diff(starts, append=len(values))
+        ids = buckets[starts]
+        lows = np.minimum.reduceat(values, starts)
+        highs = np.maximum.reduceat(values, starts)
+        sums = np.add.reduceat(values, starts)
+
+        if self._open is not None:
+            open_id, low, high, total, count = self._open
+            if ids[0] == open_id:
+                lows[0] = min(lows[0], low)
+                highs[0] = max(highs[0], high)
+                sums[0] += total
+                counts[0] += count
+            else:
+                ids = np.insert(ids, 0, open_id)
+                lows = np.insert(lows, 0, low)
+                highs = np.insert(highs, 0, high)
+                sums = np.insert(sums, 0, total)
+                counts = np.insert(counts, 0, count)
+
+        self._open = (ids[-1], lows[-1], highs[-1], sums[-1], int(counts[-1]))
+        closed = slice(0, len(ids) - 1)
+        if len(ids) > 1:
+            self._buckets.extend(
+                ids[closed] * self.width,
+                lows[closed],
+                highs[closed],
+                sums[closed] / counts[closed],
+            )
+
+    def columns(self) -> np.ndarray:
+        columns = self._buckets.columns()
+        if self._open is None:
+            return columns
+        open_id, low, high, total, count = self._open
+        current = np.array([[open_id * self.width], [low], [high], [total / count]])
+        return np.concatenate((columns, current), axis=1)
+
+
+class _Series:
+    """Samples of one metric from one instrument"""
+
+    def __init__(
+        self,
+        instrument: Instrument,
+        unit: Optional[str],
+        capacity: int,
+        tiers: Sequence[tuple[float, int]],
+    ):
+        self.instrument = instrument
+        self.unit = unit
+        self.raw = RingBuffer(capacity, columns=2)  # timestamp, value
+        self.tiers = [_Tier(width, size) for width, size in sorted(tiers)]
+        self.last_timestamp = -np.inf
+
+    def add(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        if timestamps[0] < self.last_timestamp or np.any(np.diff(timestamps) < 0):
+            raise ValueError("Samples must arrive in timestamp order")
+
+        self.last_timestamp = timestamps[-1]
+        self.raw.extend(timestamps, values)
+        for tier in self.tiers:
+            tier.add(timestamps, values)
+
+
+class TelemetryService:
+    """Ingests instrument readings into preallocated NumPy ring buffers.
+
+    Each instrument and metric name gets a raw buffer of (timestamp, value) pairs
+    plus coarser tiers of min/max/mean buckets that keep history after the raw
+    samples have been overwritten. Batches are downsampled with vectorised
+    reductions. `InstrumentMetric` objects are only built when queried.
+    """
+
+    def __init__(self, settings: Settings):
+        self._capacity = settings.telemetry_buffer_samples
+        self._tiers = settings.telemetry_tiers
+        self._series: dict[tuple[UUID, str], _Series] = {}
+
+    def record(
+        self,
+        instrument: Instrument,
+        metric_name: str,
+        timestamps: Timestamps,
+        values: Sequence[float],
+        unit: Optional[str] = None,
+    ) -> None:
+        """Add a batch of readings, with timestamps in seconds since the epoch"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        readings = np.asarray(values, dtype=np.float64)
+        if timestamps.shape != readings.shape or timestamps.ndim != 1:
+            raise ValueError("Expected one timestamp per value")
+        if not len(readings):
+            return
+
+        key = (instrument.id, metric_name)
+        series = self._series.get(key)
+        if series is None:
+            series = _Series(instrument, unit, self._capacity, self._tiers)
+            self._series[key] = series
+        series.add(timestamps, readings)
+
+    def samples(
+        self,
+        instrument: Instrument,
+        metric_name: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: Optional[float] = None,
+        aggregate: Aggregate = "mean",
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Timestamps and values, from the coarsest tier no wider than `resolution`.
+
+        Without a resolution, raw samples are returned if they reach back to
+        `start` (or no start is given), otherwise the finest tier that does.
+        """
+        series = self._series.get((instrument.id, metric_name))
+        if series is None:
+            return np.empty(0), np.empty(0)
+
+        timestamps, values = self._select(series, start, resolution, aggregate)
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start.timestamp()
+        if end is not None:
+            mask &= timestamps < end.timestamp()
+        return timestamps[mask], values[mask]
+
+    def query(
+        self,
+        instrument: Instrument,
+        metric_name: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: Optional[float] = None,
+        aggregate: Aggregate = "mean",
+    ) -> list[InstrumentMetric]:
+        series = self._series.get((instrument.id, metric_name))
+        if series is None:
+            return []
+
+        timestamps, values = self.samples(
+            instrument, metric_name, start, end, resolution, aggregate
+        )
+        return [
+            InstrumentMetric.model_construct(
+                timestamp=datetime.fromtimestamp(timestamp),
+                instrument=series.instrument,
+                metric_name=metric_name,
+                value=value,
+                unit=series.unit,
+            )
+            for timestamp, value in zip(timestamps.tolist(), values.tolist())
+        ]
+
+    ### PRIVATE #######################
+
+    def _select(
+        self,
+        series: _Series,
+        start: Optional[datetime],
+        resolution: Optional[float],
+        aggregate: Aggregate,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        column = {"min": 1, "max": 2, "mean": 3}[aggregate]
+        if resolution is not None:
+            tiers = [tier for tier in series.tiers if tier.width <= resolution]
+            if tiers:
+                buckets = tiers[-1].columns()
+                return buckets[0], buckets[column]
+            timestamps, values = series.raw.columns()
+            return timestamps, values
+
+        timestamps, values = series.raw.columns()
+        covered = len(timestamps) and (
+            start is None or timestamps[0] <= start.timestamp()
+        )
+        if covered or not series.tiers:
+            return timestamps, values
+        for tier in series.tiers:
+            buckets = tier.columns()
+            if len(buckets[0]) and (
+                start is None or buckets[0][0] <= start.timestamp()
+            ):
+                return buckets[0], buckets[column]
+        # None reaches back to `start`, so the one reaching furthest
+        buckets = series.tiers[-1].columns()
+        return buckets[0], buckets[column]
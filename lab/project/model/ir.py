@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional, TypeVar, Union, Any
 from labfile.parse.transform import ProcessNode
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from uuid import uuid4
 
 from labfile.model.tree import (
@@ -14,6 +14,10 @@ from lab.runtime.model.execution import ScriptExecution
 
 LiteralValue = Union[int, float, str]
 
+# Parameters that configure how the runtime runs an experiment, rather than being
+# passed to it: `with _timeout 3600` becomes Experiment.timeout_seconds
+RUNTIME_PARAMETERS = ("_timeout", "_heartbeat")
+
 
 class Definition(BaseModel, ABC):
     """Base class for intermediate definitions"""
@@ -32,6 +36,8 @@ class SymbolTable(BaseModel):
 
     table: dict[str, Definition]
 
+    _resolved: dict[str, Any] = PrivateAttr(default_factory=dict)
+
     def lookup(self, key: str, expecting: type[D] = Definition) -> Optional[D]:
         val = self.table.get(key)
         if not val:
@@ -44,6 +50,16 @@ class SymbolTable(BaseModel):
 
         return val
 
+    def resolve(self, key: str, expecting: type[D] = Definition) -> Any:
+        """Lower a symbol to its domain object, reusing it for every reference"""
+        if key not in self._resolved:
+            definition = self.lookup(key, expecting=expecting)
+            if not definition:
+                return None
+            self._resolved[key] = definition.to_domain(self)
+
+        return self._resolved[key]
+
 
 class Reference(BaseModel):
     """A reference to a resource"""
@@ -108,8 +124,8 @@ class ExperimentDefinition(Definition):
             if isinstance(value, Reference)
             else value
             for name, value in self.parameters.values.items()
+            if name not in RUNTIME_PARAMETERS
         }
-
         # @todo: make this general
         execution_method = ScriptExecution(command="python", args=[self.via])
 
@@ -118,14 +134,26 @@ class ExperimentDefinition(Definition):
             name=self.name,
             execution_method=execution_method,
             parameters=parameters,
+            timeout_seconds=self._runtime_parameter("_timeout"),
+            heartbeat_seconds=self._runtime_parameter("_heartbeat"),
         )
 
+    def _runtime_parameter(self, name: str) -> Optional[float]:
+        if name not in self.parameters.values:
+            return None
+        value = self.parameters.values[name]
+        if isinstance(value, str) or isinstance(value, Reference) or value <= 0:
+            raise ValueError(
+                f"Experiment {self.name}: {name} must be a positive number of seconds"
+            )
+        return float(value)
+
     def _build_parameter(self, value: Reference, symbols: SymbolTable):
         ref_name = value.path.split(".")[0]
 
         # the thing being pointed to
-        ref_symbol = symbols.lookup(ref_name, expecting=ExperimentDefinition)
-        if not ref_symbol:
+        owner = symbols.resolve(ref_name, expecting=ExperimentDefinition)
+        if not owner:
             raise ValueError(f"Referenced process {ref_name} not found")
 
-        return ValueReference(owner=ref_symbol.to_domain(symbols), attribute=value.path)
+        return ValueReference(owner=owner, attribute=value.path)
@@ -10,6 +10,20 @@ class ExecutionPlan(Model):
     id: UUID = Field(default_factory=uuid4)
     project: Project
     ordered_experiments: list[Experiment]
+    estimates: dict[UUID, float] = Field(default_factory=dict)
+    ranks: dict[UUID, float] = Field(default_factory=dict)
+    critical_path: list[Experiment] = Field(default_factory=list)
+    # Experiments merged into an identical one, by the id of the one that runs
+    aliases: dict[UUID, list[Experiment]] = Field(default_factory=dict)
+
+    @property
+    def makespan(self) -> float:
+        """Estimated wall-clock seconds to run the plan with unlimited workers"""
+        return max(self.ranks.values(), default=0.0)
+
+    def priority(self, experiment: Experiment) -> float:
+        """Scheduling priority: the estimated critical-path length from this experiment"""
+        return self.ranks.get(experiment.id, 0.0)
 
     def __str__(self) -> str:
         """Format the execution plan in a clear, visually appealing way."""
@@ -31,6 +45,16 @@ class ExecutionPlan(Model):
                 exp_header += f" (depends on: {deps})"
             lines.append(exp_header)
 
+            if exp.id in self.aliases:
+                names = ", ".join(a.name for a in self.aliases[exp.id])
+                lines.append(f"│      Also runs as: {names}")
+
+            if exp.id in self.estimates:
+                lines.append(
+                    f"│      Estimate: {format_duration(self.estimates[exp.id])}"
+                    f" (critical path {format_duration(self.priority(exp))})"
+                )
+
             # Execution method
             if isinstance(exp.execution_method, ScriptExecution):
                 cmd = f"{exp.execution_method.command} {' '.join(exp.execution_method.args)}"
@@ -41,7 +65,7 @@ class ExecutionPlan(Model):
                 lines.append("│      Parameters:")
                 for name, value in exp.parameters.items():
                     if isinstance(value, ValueReference):
-                        val_str = f"@{value.owner.name}.{value.attribute}"
+                        val_str = f"@{value.owner.name}.{value.output}"
                     else:
                         val_str = str(value)
                     lines.append(f"│        • {name}: {val_str}")
@@ -63,7 +87,29 @@ class ExecutionPlan(Model):
 
             lines.extend(build_graph_lines())
 
+        # Critical path
+        if self.critical_path:
+            lines.extend(
+                [
+                    "│",
+                    f"│ Critical Path (est. makespan {format_duration(self.makespan)}):",
+                ]
+            )
+            for exp in self.critical_path:
+                estimate = format_duration(self.estimates.get(exp.id, 0.0))
+                lines.append(f"│   → {exp.name} ({estimate})")
+
         # Footer
         lines.append("└" + "─" * 60)
 
         return "\n".join(lines)
+
+
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{secs:02d}s"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{seconds:.1f}s"
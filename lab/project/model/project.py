@@ -1,5 +1,9 @@
+import hashlib
+import json
 from uuid import UUID
-from typing import Optional, TypeAlias, Union
+from typing import Any, Iterable, Optional, TypeAlias, Union
+
+from pydantic import PrivateAttr
 
 from lab.core.model import Model
 from lab.instrument.model.instrument import InstrumentRequirements
@@ -13,6 +17,15 @@ Parameters: TypeAlias = dict[str, ParameterValue]
 class ValueReference(Model):
     owner: "Experiment"
     attribute: str
+    stream: bool = False  # consume the output in chunks while the owner runs
+
+    @property
+    def output(self) -> str:
+        """The name of the referenced output, without the owner's name"""
+        prefix = f"{self.owner.name}."
+        if self.attribute.startswith(prefix):
+            return self.attribute[len(prefix) :]
+        return self.attribute
 
 
 class Experiment(Model):
@@ -24,6 +37,13 @@ class Experiment(Model):
     parameters: dict[str, ParameterValue | ValueReference]
     requirements: Optional[InstrumentRequirements] = None  # @todo: implement
 
+    # Runs still going after this long are killed (None: the runtime's default)
+    timeout_seconds: Optional[float] = None
+    # Runs that report nothing through lab.sdk for this long are considered hung
+    heartbeat_seconds: Optional[float] = None
+
+    _fingerprint: Optional[str] = PrivateAttr(default=None)
+
     def __hash__(self) -> int:
         return hash(self.id)
 
@@ -41,6 +61,177 @@ class Experiment(Model):
             if isinstance(param, ValueReference) and isinstance(param.owner, Experiment)
         }
 
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the experiment's definition and its upstream definitions.
+
+        The name and id are excluded, so the same experiment defined in two Labfiles
+        (or twice in one) shares a fingerprint.
+        """
+        if self._fingerprint is None:
+            # Hash upstream experiments first, iteratively, so long chains don't
+            # exhaust the recursion limit.
+            stack: list[Experiment] = [self]
+            while stack:
+                experiment = stack[-1]
+                pending = [
+                    dep for dep in experiment.dependencies if dep._fingerprint is None
+                ]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                if experiment._fingerprint is None:
+                    experiment._fingerprint = experiment._hash_definition()
+
+        assert self._fingerprint is not None
+        return self._fingerprint
+
+    ### PRIVATE #######################
+
+    def _hash_definition(self) -> str:
+        parameters = {
+            name: {"ref": value.owner.fingerprint, "output": value.output}
+            if isinstance(value, ValueReference)
+            else value
+            for name, value in self.parameters.items()
+        }
+        definition = {
+            "method": type(self.execution_method).__name__,
+            "execution": self.execution_method.model_dump(),
+            "parameters": parameters,
+            "requirements": self.requirements.model_dump(mode="json")
+            if self.requirements
+            else None,
+        }
+        canonical = json.dumps(definition, sort_keys=True, default=_encode)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
 
 class Project(Model):
     experiments: set[Experiment]
+
+    _index: Optional["DependencyIndex"] = PrivateAttr(default=None)
+
+    @property
+    def index(self) -> "DependencyIndex":
+        """Dependency and dependents adjacency, built on first use"""
+        if self._index is None:
+            self._index = DependencyIndex.build(self.experiments)
+        return self._index
+
+    def get(self, name: str) -> Optional[Experiment]:
+        return self.index.by_name.get(name)
+
+    def dependencies_of(self, experiment: Experiment) -> tuple[Experiment, ...]:
+        """Experiments in this project that the given experiment depends on"""
+        return self.index.dependencies.get(experiment, ())
+
+    def dependents_of(self, experiment: Experiment) -> tuple[Experiment, ...]:
+        """Experiments in this project that depend on the given experiment"""
+        return self.index.dependents.get(experiment, ())
+
+    def is_streamed(self, producer: Experiment, consumer: Experiment) -> bool:
+        """Whether the consumer only reads the producer's outputs as streams"""
+        return (producer, consumer) in self.index.streamed
+
+    def stream_groups(self) -> list[tuple[Experiment, ...]]:
+        """Experiments that must run at the same time, joined by streamed references.
+
+        Every experiment belongs to exactly one group; most are on their own.
+        """
+        parent = {exp: exp for exp in self.experiments}
+
+        def find(exp: Experiment) -> Experiment:
+            while parent[exp] is not exp:
+                parent[exp] = parent[parent[exp]]
+                exp = parent[exp]
+            return exp
+
+        for producer, consumer in self.index.streamed:
+            parent[find(producer)] = find(consumer)
+
+        groups: dict[Experiment, list[Experiment]] = {}
+        for exp in self.experiments:
+            groups.setdefault(find(exp), []).append(exp)
+        return [tuple(group) for group in groups.values()]
+
+    def ancestors(self, experiments: Iterable[Experiment]) -> set[Experiment]:
+        """The given experiments and everything upstream of them"""
+        return _closure(experiments, self.index.dependencies)
+
+    def descendants(self, experiments: Iterable[Experiment]) -> set[Experiment]:
+        """The given experiments and everything downstream of them"""
+        return _closure(experiments, self.index.dependents)
+
+    def subproject(self, experiments: Iterable[Experiment]) -> "Project":
+        """A project made of only the given experiments.
+
+        References to experiments outside the subproject are kept, but they are no
+        longer dependencies within it.
+        """
+        return Project(experiments=set(experiments))
+
+
+class DependencyIndex(Model):
+    """Adjacency lists for a project's dependency graph, restricted to the project"""
+
+    by_name: dict[str, Experiment]
+    dependencies: dict[Experiment, tuple[Experiment, ...]]
+    dependents: dict[Experiment, tuple[Experiment, ...]]
+    streamed: set[tuple[Experiment, Experiment]]  # (producer, consumer)
+
+    @classmethod
+    def build(cls, experiments: Iterable[Experiment]) -> "DependencyIndex":
+        experiments = list(experiments)
+        members = set(experiments)
+        dependencies = {
+            exp: tuple(dep for dep in exp.dependencies if dep in members)
+            for exp in experiments
+        }
+        dependents: dict[Experiment, list[Experiment]] = {
+            exp: [] for exp in experiments
+        }
+        for exp, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(exp)
+
+        # An edge is streamed only if every reference along it is a stream
+        streamed: dict[tuple[Experiment, Experiment], bool] = {}
+        for exp in experiments:
+            for value in exp.parameters.values():
+                if isinstance(value, ValueReference) and value.owner in members:
+                    edge = (value.owner, exp)
+                    streamed[edge] = streamed.get(edge, True) and value.stream
+
+        return cls.model_construct(
+            by_name={exp.name: exp for exp in experiments},
+            dependencies=dependencies,
+            dependents={exp: tuple(deps) for exp, deps in dependents.items()},
+            streamed={edge for edge, stream in streamed.items() if stream},
+        )
+
+
+def _closure(
+    roots: Iterable[Experiment],
+    edges: dict[Experiment, tuple[Experiment, ...]],
+) -> set[Experiment]:
+    """Everything reachable from the roots, visiting each edge once"""
+    seen = set(roots)
+    frontier = list(seen)
+    while frontier:
+        for neighbour in edges.get(frontier.pop(), ()):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                frontier.append(neighbour)
+
+    return seen
+
+
+def _encode(value: Any) -> Any:
+    """Encode values json doesn't know about for the purpose of hashing"""
+    if callable(value):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return str(value)
@@ -0,0 +1,72 @@
+from fnmatch import fnmatchcase
+from typing import Iterable
+
+from lab.core.model import Model
+from lab.project.model.project import Experiment, Project
+
+GLOB_CHARACTERS = set("*?[")
+
+
+class Selector(Model):
+    """Selects experiments by name, optionally with their ancestors or descendants.
+
+    `train` selects one experiment, `train+` adds everything downstream of it,
+    `+single_reach` adds everything it needs, and names may be globs (`sim_*`).
+    """
+
+    pattern: str
+    ancestors: bool = False
+    descendants: bool = False
+
+    @classmethod
+    def parse(cls, expression: str) -> "Selector":
+        expression = expression.strip()
+        ancestors = expression.startswith("+")
+        descendants = expression.endswith("+")
+        pattern = expression.strip("+")
+        if not pattern:
+            raise ValueError(f"Invalid selector '{expression}'")
+
+        return cls(pattern=pattern, ancestors=ancestors, descendants=descendants)
+
+    def select(self, project: Project) -> set[Experiment]:
+        matched = self._match(project)
+        if not matched:
+            raise ValueError(f"No experiments match selector '{self}'")
+
+        selected = set(matched)
+        if self.ancestors:
+            selected |= project.ancestors(matched)
+        if self.descendants:
+            selected |= project.descendants(matched)
+
+        return selected
+
+    def __str__(self) -> str:
+        return f"{'+' if self.ancestors else ''}{self.pattern}{'+' if self.descendants else ''}"
+
+    ### PRIVATE #######################
+
+    def _match(self, project: Project) -> set[Experiment]:
+        if GLOB_CHARACTERS.isdisjoint(self.pattern):
+            experiment = project.get(self.pattern)
+            return {experiment} if experiment else set()
+
+        return {
+            experiment
+            for name, experiment in project.index.by_name.items()
+            if fnmatchcase(name, self.pattern)
+        }
+
+
+def select(project: Project, expressions: Iterable[str]) -> Project:
+    """Restrict a project to the union of the given selectors, if there are any"""
+    selectors = [Selector.parse(expression) for expression in expressions]
+    if not selectors:
+        return project
+
+    selected: set[Experiment] = set()
+    for selector in selectors:
+        selected |= selector.select(project)
+
+    return project.subproject(selected)
@@ -0,0 +1,73 @@
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Size-bounded on-disk cache of parsed Labfiles.
+
+    Entries are files named by their key. Reading an entry bumps its modification
+    time, and writing one evicts the least recently used entries until the cache
+    fits in `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, enabled: bool = True):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self.enabled = enabled
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+
+        path = self._directory / key
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self._max_bytes:
+            return
+
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent readers never see a partial entry
+            tmp = self._directory / f".{key}.{uuid4().hex}.tmp"
+            tmp.write_bytes(data)
+            tmp.replace(self._directory / key)
+            self._evict()
+        except OSError as e:
+            logger.warning(f"Could not write parse cache entry {key}: {e}")
+
+    def discard(self, key: str) -> None:
+        (self._directory / key).unlink(missing_ok=True)
+
+    ### PRIVATE #######################
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self._max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            if total <= self._max_bytes:
+                break
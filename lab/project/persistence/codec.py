@@ -0,0 +1,287 @@
+"""Compact binary encoding of Labfile definitions, projects and execution plans.
+
+Files start with a fixed header (magic, kind, format version) followed by a small
+metadata record and a zlib-compressed body. Both are encoded with `marshal`, which
+only handles builtin types, so decoding never executes code. Decoded models are
+built with `model_construct`, skipping validation: the data was validated when it
+was first parsed.
+"""
+
+import marshal
+import struct
+import zlib
+from typing import Any, Iterable, Optional
+from uuid import UUID
+
+from lab.instrument.model.instrument import InstrumentRequirements
+from lab.project.model.ir import ExperimentDefinition, ParameterSet, Reference
+from lab.project.model.plan import ExecutionPlan
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.runtime.model.execution import ExecutionMethod
+
+MAGIC = b"LAB\x00"
+FORMAT_VERSION = 4
+
+PLAN = b"PLAN"
+PROJECT = b"PROJ"
+DEFINITIONS = b"DEFS"
+
+_HEADER = struct.Struct("<4s4sHI")
+
+
+class CodecError(ValueError):
+    """Raised when data can't be decoded"""
+
+
+def pack(kind: bytes, metadata: dict[str, Any], body: Any) -> bytes:
+    meta = marshal.dumps(metadata)
+    header = _HEADER.pack(MAGIC, kind, FORMAT_VERSION, len(meta))
+    return header + meta + zlib.compress(marshal.dumps(body), 1)
+
+
+def unpack_metadata(data: bytes, kind: bytes) -> tuple[dict[str, Any], int]:
+    """Read the metadata record, returning it with the offset of the body"""
+    if len(data) < _HEADER.size:
+        raise CodecError("Truncated file")
+
+    magic, found_kind, version, meta_length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CodecError("Not a lab file")
+    if found_kind != kind:
+        raise CodecError(
+            f"Expected a {kind.decode()} file, found {found_kind.decode()}"
+        )
+    if version != FORMAT_VERSION:
+        raise CodecError(
+            f"Unsupported format version {version} (expected {FORMAT_VERSION})"
+        )
+
+    offset = _HEADER.size + meta_length
+    try:
+        metadata = marshal.loads(data[_HEADER.size : offset])
+    except (EOFError, ValueError, TypeError) as e:
+        raise CodecError("Corrupt metadata") from e
+
+    return metadata, offset
+
+
+def unpack(data: bytes, kind: bytes) -> tuple[dict[str, Any], Any]:
+    metadata, offset = unpack_metadata(data, kind)
+    try:
+        body = marshal.loads(zlib.decompress(data[offset:]))
+    except (EOFError, ValueError, TypeError, zlib.error) as e:
+        raise CodecError("Corrupt body") from e
+
+    return metadata, body
+
+
+### PROJECTS AND PLANS ################
+
+
+def encode_project(project: Project) -> tuple:
+    table = _ExperimentTable(project.experiments)
+    return (table.rows(), table.indices(project.experiments))
+
+
+def decode_project(body: tuple) -> Project:
+    rows, members = body
+    experiments = _decode_experiments(rows)
+    return Project.model_construct(experiments={experiments[i] for i in members})
+
+
+def encode_plan(plan: ExecutionPlan) -> tuple:
+    table = _ExperimentTable(plan.project.experiments)
+    ordered = table.indices(plan.ordered_experiments)
+    return (
+        plan.id.bytes,
+        table.rows(),
+        table.indices(plan.project.experiments),
+        ordered,
+        [plan.estimates.get(exp.id, 0.0) for exp in plan.ordered_experiments],
+        [plan.ranks.get(exp.id, 0.0) for exp in plan.ordered_experiments],
+        table.indices(plan.critical_path),
+        [
+            (table.indices([exp])[0], alias.id.bytes, alias.name)
+            for exp in plan.ordered_experiments
+            for alias in plan.aliases.get(exp.id, ())
+        ],
+    )
+
+
+def decode_plan(body: tuple) -> ExecutionPlan:
+    plan_id, rows, members, ordered, estimates, ranks, critical, merged = body
+    experiments = _decode_experiments(rows)
+    ordered_experiments = [experiments[i] for i in ordered]
+    aliases: dict[UUID, list[Experiment]] = {}
+    for index, alias_id, name in merged:
+        runs_as = experiments[index]
+        aliases.setdefault(runs_as.id, []).append(
+            runs_as.model_copy(update={"id": UUID(bytes=alias_id), "name": name})
+        )
+    return ExecutionPlan.model_construct(
+        id=UUID(bytes=plan_id),
+        project=Project.model_construct(experiments={experiments[i] for i in members}),
+        ordered_experiments=ordered_experiments,
+        estimates={exp.id: e for exp, e in zip(ordered_experiments, estimates)},
+        ranks={exp.id: r for exp, r in zip(ordered_experiments, ranks)},
+        critical_path=[experiments[i] for i in critical],
+        aliases=aliases,
+    )
+
+
+def encode_definitions(definitions: Iterable[ExperimentDefinition]) -> list[tuple]:
+    return [
+        (
+            definition.name,
+            definition.via,
+            {
+                name: (value.resource, value.attribute)
+                if isinstance(value, Reference)
+                else value
+                for name, value in definition.parameters.values.items()
+            },
+        )
+        for definition in definitions
+    ]
+
+
+def decode_definitions(body: list[tuple]) -> list[ExperimentDefinition]:
+    return [
+        ExperimentDefinition.model_construct(
+            name=name,
+            via=via,
+            parameters=ParameterSet.model_construct(
+                values={
+                    key: Reference.model_construct(
+                        resource=value[0], attribute=value[1]
+                    )
+                    if isinstance(value, tuple)
+                    else value
+                    for key, value in parameters.items()
+                }
+            ),
+        )
+        for name, via, parameters in body
+    ]
+
+
+def encode_execution_method(experiment: Experiment) -> tuple[str, dict[str, Any]]:
+    """An experiment's execution method as its class name and builtin fields"""
+    method = experiment.execution_method
+    try:
+        fields = method.model_dump()
+        marshal.dumps(fields)
+    except ValueError as e:
+        raise CodecError(
+            f"Experiment '{experiment.name}' uses {type(method).__name__}, "
+            "which can't be serialized"
+        ) from e
+
+    return type(method).__name__, fields
+
+
+def decode_execution_method(
+    name: str,
+    fields: dict[str, Any],
+    methods: Optional[dict[str, type[ExecutionMethod]]] = None,
+) -> ExecutionMethod:
+    method_type = (methods or _execution_methods()).get(name)
+    if method_type is None:
+        raise CodecError(f"Unknown execution method {name}")
+
+    return method_type.model_construct(**fields)
+
+
+### PRIVATE #######################
+
+
+class _ExperimentTable:
+    """Numbers experiments, including upstream ones outside the project"""
+
+    def __init__(self, experiments: Iterable[Experiment]):
+        self._index: dict[Experiment, int] = {}
+        self._experiments: list[Experiment] = []
+        pending = list(experiments)
+        while pending:
+            experiment = pending.pop()
+            if experiment in self._index:
+                continue
+            self._index[experiment] = len(self._experiments)
+            self._experiments.append(experiment)
+            pending.extend(experiment.dependencies)
+
+    def indices(self, experiments: Iterable[Experiment]) -> list[int]:
+        return [self._index[exp] for exp in experiments]
+
+    def rows(self) -> list[tuple]:
+        return [self._encode(exp) for exp in self._experiments]
+
+    def _encode(self, experiment: Experiment) -> tuple:
+        method_name, fields = encode_execution_method(experiment)
+
+        # References are the only tuples among parameter values
+        parameters = {
+            name: (self._index[value.owner], value.attribute, value.stream)
+            if isinstance(value, ValueReference)
+            else value
+            for name, value in experiment.parameters.items()
+        }
+        requirements = (
+            experiment.requirements.model_dump(mode="json")
+            if experiment.requirements
+            else None
+        )
+        return (
+            experiment.id.bytes,
+            experiment.name,
+            method_name,
+            fields,
+            parameters,
+            requirements,
+            (experiment.timeout_seconds, experiment.heartbeat_seconds),
+        )
+
+
+def _decode_experiments(rows: list[tuple]) -> list[Experiment]:
+    methods = _execution_methods()
+    experiments = []
+    for id_bytes, name, method_name, fields, _, requirements, limits in rows:
+        experiments.append(
+            Experiment.model_construct(
+                id=UUID(bytes=id_bytes),
+                name=name,
+                execution_method=decode_execution_method(method_name, fields, methods),
+                parameters={},
+                requirements=InstrumentRequirements.model_validate(requirements)
+                if requirements is not None
+                else None,
+                timeout_seconds=limits[0],
+                heartbeat_seconds=limits[1],
+            )
+        )
+
+    # Second pass, once every owner exists
+    for experiment, row in zip(experiments, rows):
+        experiment.parameters.update(
+            {
+                name: ValueReference.model_construct(
+                    owner=experiments[value[0]], attribute=value[1], stream=value[2]
+                )
+                if isinstance(value, tuple)
+                else value
+                for name, value in row[4].items()
+            }
+        )
+
+    return experiments
+
+
+def _execution_methods() -> dict[str, type[ExecutionMethod]]:
+    methods: dict[str, type[ExecutionMethod]] = {}
+    pending: list[type[ExecutionMethod]] = [ExecutionMethod]
+    while pending:
+        cls = pending.pop()
+        methods[cls.__name__] = cls
+        pending.extend(cls.__subclasses__())
+
+    return methods
@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Optional
+
+import lab
+from lab.project.model.plan import ExecutionPlan
+from lab.project.persistence.codec import (
+    PLAN,
+    decode_plan,
+    encode_plan,
+    pack,
+    unpack,
+)
+from lab.project.service.labfile import LabfileService
+
+
+class StalePlanError(ValueError):
+    """Raised when a compiled plan no longer matches its Labfile"""
+
+
+class PlanArtifactService:
+    """Writes execution plans to disk and loads them back without re-parsing"""
+
+    def __init__(self, labfile_service: LabfileService):
+        self._labfile_service = labfile_service
+
+    def save(self, plan: ExecutionPlan, source: Path, destination: Path) -> None:
+        """Compile a plan made from the Labfile at `source` into `destination`"""
+        metadata = {
+            "lab_version": lab.__version__,
+            "source": str(source.resolve()),
+            "digest": self._labfile_service.digest(source),
+        }
+        destination.write_bytes(pack(PLAN, metadata, encode_plan(plan)))
+
+    def load(self, path: Path, source: Optional[Path] = None) -> ExecutionPlan:
+        """Load a compiled plan, checking that its Labfile hasn't changed since.
+
+        `source` overrides the Labfile path recorded in the plan.
+        """
+        metadata, body = unpack(path.read_bytes(), PLAN)
+        if metadata["lab_version"] != lab.__version__:
+            raise StalePlanError(
+                f"Plan was compiled by lab {metadata['lab_version']}, "
+                f"this is lab {lab.__version__}"
+            )
+
+        source = source or Path(metadata["source"])
+        if not source.exists():
+            raise StalePlanError(f"Plan source {source} no longer exists")
+        if self._labfile_service.digest(source) != metadata["digest"]:
+            raise StalePlanError(f"{source} has changed since the plan was compiled")
+
+        return decode_plan(body)
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from statistics import median
+from typing import Iterable
+
+from lab.project.model.project import Experiment
+from lab.runtime.model.run import ExperimentRun, RunStatus
+
+DEFAULT_DURATION_SECONDS = 60.0
+
+
+class DurationEstimator:
+    """Estimates how long experiments take from previous runs of the same definition"""
+
+    def __init__(
+        self,
+        history: Iterable[ExperimentRun] = (),
+        default: float = DEFAULT_DURATION_SECONDS,
+    ):
+        self._default = default
+        self._samples: dict[str, list[float]] = defaultdict(list)
+        for run in history:
+            self.record(run)
+
+    def record(self, run: ExperimentRun) -> None:
+        """Add a finished run to the history"""
+        if run.status != RunStatus.COMPLETED or run.completed_at is None:
+            return
+
+        duration = (run.completed_at - run.started_at).total_seconds()
+        self.add(run.experiment.fingerprint, duration)
+
+    def add(self, fingerprint: str, seconds: float) -> None:
+        """Add a successful run's duration, for experiments with this fingerprint"""
+        self._samples[fingerprint].append(max(seconds, 0.0))
+
+    def samples(self, experiment: Experiment) -> list[float]:
+        """Observed durations, in seconds, of runs with the same fingerprint"""
+        return self._samples.get(experiment.fingerprint, [])
+
+    def estimate(self, experiment: Experiment) -> float:
+        """Median observed duration in seconds, or the default if never run"""
+        samples = self.samples(experiment)
+        if not samples:
+            return self._default
+        return median(samples)
@@ -1,27 +1,205 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
 from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
 
 from labfile import parse
-from labfile.model.tree import LabfileNode
 
-from lab.project.model.ir import ExperimentDefinition, SymbolTable
+import lab
+from lab.core.tracing import tracer
+from lab.project.model.ir import Definition, ExperimentDefinition, SymbolTable
 from lab.project.model.project import Project
+from lab.project.persistence.cache import ParseCache
+from lab.project.persistence.codec import (
+    DEFINITIONS,
+    FORMAT_VERSION,
+    PROJECT,
+    decode_definitions,
+    decode_project,
+    encode_definitions,
+    encode_project,
+    pack,
+    unpack,
+)
+
+logger = logging.getLogger(__name__)
+
+LABFILE_NAME = "Labfile"
+LABFILE_SUFFIX = ".labfile"
+
+T = TypeVar("T")
 
 
 class LabfileService:
-    def parse(self, path: Path) -> Project:
-        ast = parse(path)
-        project = self._labfile_from_tree(ast)
+    def __init__(self, cache: ParseCache):
+        self._cache = cache
+
+    def parse(self, path: Path, use_cache: bool = True) -> Project:
+        """Parse a Labfile, or every Labfile in a directory, into one project"""
+        use_cache = use_cache and self._cache.enabled
+        sources = self.sources(path)
+        digests = {source: self._digest_file(source) for source in sources}
+
+        key = self._cache_key("project", self._combine(path, digests))
+        cached = self._load(key, PROJECT, decode_project) if use_cache else None
+        if cached is not None:
+            return cached
+
+        with tracer.span("parse Labfiles", sources=len(sources)):
+            definitions = self._parse_definitions(digests, use_cache)
+        with tracer.span("lower"):
+            project = self._lower(definitions)
+        if use_cache:
+            metadata = {"lab_version": lab.__version__, "source": str(path.resolve())}
+            self._cache.put(key, pack(PROJECT, metadata, encode_project(project)))
 
         return project
 
-    def _labfile_from_tree(self, tree: LabfileNode) -> Project:
-        # Create intermediate definitions
-        processes = [ExperimentDefinition.from_tree(node) for node in tree.processes]
+    def sources(self, path: Path) -> list[Path]:
+        """The Labfiles making up the project at `path`.
+
+        A directory contains every file named `Labfile` or ending in `.labfile`
+        below it, skipping hidden directories.
+        """
+        if not path.is_dir():
+            return [path]
+
+        sources = []
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            sources.extend(
+                Path(root) / name
+                for name in sorted(files)
+                if name == LABFILE_NAME or name.endswith(LABFILE_SUFFIX)
+            )
+
+        if not sources:
+            raise FileNotFoundError(f"No Labfiles found in {path}")
+
+        return sources
+
+    def digest(self, path: Path) -> str:
+        """Content hash of the project's Labfiles, used to tell whether derived data is stale"""
+        return self._combine(
+            path, {source: self._digest_file(source) for source in self.sources(path)}
+        )
+
+    ### PRIVATE #######################
+
+    def _digest_file(self, path: Path) -> str:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def _combine(self, path: Path, digests: dict[Path, str]) -> str:
+        if not path.is_dir():
+            return digests[path]
+
+        combined = hashlib.sha256()
+        for source, digest in digests.items():
+            combined.update(f"{source.relative_to(path)}\0{digest}\n".encode())
 
-        # Build symbol table
-        symbols = SymbolTable(table={d.name: d for d in processes})
+        return combined.hexdigest()
+
+    def _cache_key(self, kind: str, digest: str) -> str:
+        """Entries are only valid for the same contents, lab version and format"""
+        key = f"{kind}:{digest}:{lab.__version__}:{FORMAT_VERSION}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _load(self, key: str, kind: bytes, decode: Callable[[Any], T]) -> Optional[T]:
+        """A cache entry, decoded, or None if missing or corrupt.
+
+        A corrupt entry is discarded, so the Labfiles are parsed again and the
+        entry replaced.
+        """
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+
+        try:
+            _, body = unpack(cached, kind)
+            return decode(body)
+        # CodecError, or whatever a body of the wrong shape makes decoding raise
+        except (ValueError, TypeError, IndexError, KeyError) as e:
+            logger.warning(f"Discarding corrupt parse cache entry {key}: {e}")
+            self._cache.discard(key)
+            return None
+
+    def _parse_definitions(
+        self, digests: dict[Path, str], use_cache: bool
+    ) -> dict[Path, list[ExperimentDefinition]]:
+        """Definitions in each Labfile, only parsing the ones not in the cache.
+
+        Parsing is CPU-bound, so several uncached files are parsed in parallel
+        worker processes.
+        """
+        decoded: dict[Path, list[ExperimentDefinition]] = {}
+        keys = {
+            source: self._cache_key("definitions", d) for source, d in digests.items()
+        }
+        if use_cache:
+            for source, key in keys.items():
+                body = self._load(key, DEFINITIONS, decode_definitions)
+                if body is not None:
+                    decoded[source] = body
+
+        encoded: dict[Path, list[tuple]] = {}
+        stale = [source for source in digests if source not in decoded]
+        if len(stale) > 1:
+            workers = min(len(stale), os.cpu_count() or 1)
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=_mp_context()
+            ) as pool:
+                encoded.update(zip(stale, pool.map(_parse_file, stale)))
+        else:
+            encoded.update((source, _parse_file(source)) for source in stale)
+
+        if use_cache:
+            for source in stale:
+                metadata = {"lab_version": lab.__version__, "source": str(source)}
+                self._cache.put(
+                    keys[source], pack(DEFINITIONS, metadata, encoded[source])
+                )
+
+        decoded.update(
+            (source, decode_definitions(encoded[source])) for source in stale
+        )
+        return {source: decoded[source] for source in digests}
+
+    def _lower(self, definitions: dict[Path, list[ExperimentDefinition]]) -> Project:
+        # Build symbol table across every Labfile
+        table: dict[str, Definition] = {}
+        defined_in: dict[str, Path] = {}
+        for source, processes in definitions.items():
+            for definition in processes:
+                if definition.name in table:
+                    raise ValueError(
+                        f"Experiment '{definition.name}' is defined in both "
+                        f"{defined_in[definition.name]} and {source}"
+                    )
+                table[definition.name] = definition
+                defined_in[definition.name] = source
+
+        symbols = SymbolTable(table=table)
 
         # Convert to domain objects
-        processes = {d.to_domain(symbols) for d in processes}
+        processes = {symbols.resolve(name) for name in table}
 
         return Project(experiments=processes)
+
+
+def _parse_file(path: Path) -> list[tuple]:
+    """Parse one Labfile into encoded definitions; runs in worker processes"""
+    tree = parse(path)
+    return encode_definitions(
+        ExperimentDefinition.from_tree(node) for node in tree.processes
+    )
+
+
+def _mp_context() -> Optional[BaseContext]:
+    # Forking a multi-threaded process (polars starts a thread pool) can deadlock
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
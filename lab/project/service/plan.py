@@ -1,13 +1,23 @@
+from typing import Optional
+from uuid import UUID
+
 import networkx as nx
 
 from lab.project.model.plan import ExecutionPlan
-from lab.project.model.project import Experiment, Project
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.service.estimate import DurationEstimator
 
 
 class PlanService:
-    def create_execution_plan(self, project: Project) -> ExecutionPlan:
+    def create_execution_plan(
+        self, project: Project, estimator: Optional[DurationEstimator] = None
+    ) -> ExecutionPlan:
         """Creates a plan for executing experiments, including parallel execution groups"""
         ordered = self._resolve_execution_order(project)
+        self._check_stream_groups(project)
+        project, aliases = self._merge_duplicates(project, ordered)
+        if aliases:
+            ordered = self._resolve_execution_order(project)
 
         # Group independent experiments that can run in parallel
         # This is a simple implementation - could be more sophisticated
@@ -15,7 +25,7 @@ class PlanService:
         current_group = set()
 
         for exp in ordered:
-            if not any(dep in current_group for dep in exp.dependencies):
+            if not any(dep in current_group for dep in project.dependencies_of(exp)):
                 current_group.add(exp)
             else:
                 if current_group:
@@ -25,7 +35,18 @@ class PlanService:
         if current_group:
             parallel_groups.append(current_group)
 
-        return ExecutionPlan(ordered_experiments=ordered, project=project)
+        estimator = estimator or DurationEstimator()
+        estimates = {exp.id: estimator.estimate(exp) for exp in ordered}
+        ranks = self._compute_upward_ranks(project, ordered, estimates)
+
+        return ExecutionPlan(
+            ordered_experiments=ordered,
+            project=project,
+            estimates=estimates,
+            ranks=ranks,
+            critical_path=self._critical_path(project, ordered, ranks),
+            aliases=aliases,
+        )
 
     ### PRIVATE #######################
 
@@ -36,7 +57,7 @@ class PlanService:
 
         for experiment in project.experiments:
             graph.add_node(experiment)
-            for dep in experiment.dependencies:
+            for dep in project.dependencies_of(experiment):
                 graph.add_edge(dep, experiment)
 
         # Check for cycles
@@ -45,3 +66,146 @@ class PlanService:
 
         # Return topologically sorted order
         return list(nx.topological_sort(graph))
+
+    def _check_stream_groups(self, project: Project) -> None:
+        """Experiments joined by streams start together, so none may wait on another"""
+        for group in project.stream_groups():
+            if len(group) == 1:
+                continue
+
+            members = set(group)
+            downstream = project.descendants(group)
+            for exp in group:
+                for dep in project.dependencies_of(exp):
+                    internal = dep in members and not project.is_streamed(dep, exp)
+                    if internal or (dep not in members and dep in downstream):
+                        raise ValueError(
+                            f"'{exp.name}' streams with "
+                            f"{', '.join(sorted(m.name for m in group if m != exp))} "
+                            f"but also waits for '{dep.name}' to finish"
+                        )
+
+    def _merge_duplicates(
+        self, project: Project, ordered: list[Experiment]
+    ) -> tuple[Project, dict[UUID, list[Experiment]]]:
+        """Runs experiments with the same definition and upstream definitions once.
+
+        Experiments that share a fingerprint are merged into the one with the first
+        name, and their dependents are rewired to it. Each merged-away experiment
+        becomes an alias: a copy of the one that runs under its own id and name, so
+        its run can still be recorded. Experiments that stream together are left
+        alone, since their groups have to start together.
+        """
+        streaming = {
+            exp for group in project.stream_groups() if len(group) > 1 for exp in group
+        }
+        first: dict[str, Experiment] = {}
+        for exp in sorted(project.experiments, key=lambda e: e.name):
+            if exp not in streaming:
+                first.setdefault(exp.fingerprint, exp)
+        canonical = {
+            exp: exp if exp in streaming else first[exp.fingerprint]
+            for exp in project.experiments
+        }
+        if all(exp is kept for exp, kept in canonical.items()):
+            return project, {}
+
+        # Rewire each kept experiment after the ones it depends on, iteratively so
+        # long chains don't exhaust the recursion limit
+        rewired: dict[Experiment, Experiment] = {}
+        for exp in ordered:
+            stack = [canonical[exp]]
+            while stack:
+                top = stack[-1]
+                if top in rewired:
+                    stack.pop()
+                    continue
+                pending = [
+                    canonical[dep]
+                    for dep in project.dependencies_of(top)
+                    if canonical[dep] not in rewired
+                ]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                rewired[top] = _rewire(top, canonical, rewired)
+
+        aliases: dict[UUID, list[Experiment]] = {}
+        for exp in ordered:
+            kept = canonical[exp]
+            if exp is not kept:
+                runs_as = rewired[kept]
+                aliases.setdefault(runs_as.id, []).append(
+                    runs_as.model_copy(update={"id": exp.id, "name": exp.name})
+                )
+
+        return Project(experiments=set(rewired.values())), aliases
+
+    def _compute_upward_ranks(
+        self,
+        project: Project,
+        ordered: list[Experiment],
+        estimates: dict[UUID, float],
+    ) -> dict[UUID, float]:
+        """Length of the longest path from each experiment to the end of the plan.
+
+        An experiment's rank is its own estimated duration plus the largest rank
+        among the experiments that depend on it, so ranks are computed in reverse
+        topological order. Experiments streaming from it start at the same time, so
+        their ranks count from its start instead.
+        """
+        ranks: dict[UUID, float] = {}
+        for exp in reversed(ordered):
+            tail = streamed_tail = 0.0
+            for dependent in project.dependents_of(exp):
+                if project.is_streamed(exp, dependent):
+                    # Starts alongside this experiment rather than after it
+                    streamed_tail = max(streamed_tail, ranks[dependent.id])
+                else:
+                    tail = max(tail, ranks[dependent.id])
+            ranks[exp.id] = max(estimates[exp.id] + tail, streamed_tail)
+
+        return ranks
+
+    def _critical_path(
+        self, project: Project, ordered: list[Experiment], ranks: dict[UUID, float]
+    ) -> list[Experiment]:
+        """Follows the highest-ranked dependent from the highest-ranked entry point"""
+        entries = [exp for exp in ordered if not project.dependencies_of(exp)]
+        current: Optional[Experiment] = max(
+            entries, key=lambda e: ranks[e.id], default=None
+        )
+        path = []
+        while current is not None:
+            path.append(current)
+            current = max(
+                project.dependents_of(current), key=lambda e: ranks[e.id], default=None
+            )
+
+        return path
+
+
+def _rewire(
+    experiment: Experiment,
+    canonical: dict[Experiment, Experiment],
+    rewired: dict[Experiment, Experiment],
+) -> Experiment:
+    """The experiment, with references pointing at what their owners were merged into"""
+    parameters = dict(experiment.parameters)
+    changed = False
+    for name, value in experiment.parameters.items():
+        if not isinstance(value, ValueReference) or value.owner not in canonical:
+            continue  # a plain value, or an experiment outside the project
+        owner = rewired[canonical[value.owner]]
+        if owner is not value.owner:
+            parameters[name] = ValueReference.model_construct(
+                owner=owner,
+                attribute=f"{owner.name}.{value.output}",
+                stream=value.stream,
+            )
+            changed = True
+
+    if not changed:
+        return experiment
+    return experiment.model_copy(update={"parameters": parameters})
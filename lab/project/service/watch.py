@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lab.project.model.project import Experiment, Project
+from lab.project.model.selector import select
+from lab.project.service.labfile import LabfileService
+from lab.runtime.model.execution import ScriptExecution
+from lab.runtime.model.run import ProjectRun, RunStatus
+
+
+class ProjectWatch:
+    """A project kept parsed between edits, and what each edit affects.
+
+    Only a change to a Labfile means parsing again, and then only the Labfiles
+    that changed are (the rest come from the parse cache). A change to a script
+    is looked up in the project and dependency index already in memory.
+
+    An experiment is affected when a script it runs changed, when its definition
+    or an upstream one changed (its fingerprint differs), or when it didn't
+    complete last time. Everything downstream of an affected experiment is too.
+    """
+
+    def __init__(
+        self,
+        labfile_service: LabfileService,
+        path: Path,
+        selectors: Iterable[str] = (),
+        use_cache: bool = True,
+    ):
+        self._labfile_service = labfile_service
+        self.path = path
+        self.source = path if path.is_dir() else path.parent
+        self._selectors = list(selectors)
+        self._use_cache = use_cache
+        self._project: Optional[Project] = None
+        self._labfiles: set[Path] = set()
+        self._scripts: dict[Path, set[str]] = {}  # script -> experiments running it
+        self._unfinished: set[str] = set()
+
+    @property
+    def project(self) -> Project:
+        if self._project is None:
+            raise RuntimeError("The project hasn't been loaded")
+        return self._project
+
+    def load(self) -> Project:
+        """Parse the project, replacing the one in memory"""
+        labfiles = set(self._labfile_service.sources(self.path))
+        project = select(
+            self._labfile_service.parse(self.path, use_cache=self._use_cache),
+            self._selectors,
+        )
+        scripts: dict[Path, set[str]] = {}
+        for experiment in project.experiments:
+            for script in self._scripts_of(experiment):
+                scripts.setdefault(script, set()).add(experiment.name)
+
+        self._project, self._labfiles, self._scripts = project, labfiles, scripts
+        return project
+
+    def files(self) -> set[Path]:
+        """The Labfiles and every script an experiment runs"""
+        return self._labfiles | set(self._scripts)
+
+    def affected(self, changed: Iterable[Path]) -> set[Experiment]:
+        """Experiments to run again after the given files changed"""
+        changed = set(changed)
+        names = set(self._unfinished)
+        if changed & self._labfiles:
+            previous = self.project
+            project = self.load()
+            for experiment in project.experiments:
+                before = previous.get(experiment.name)
+                if before is None or before.fingerprint != experiment.fingerprint:
+                    names.add(experiment.name)
+
+        for script in changed & set(self._scripts):
+            names |= self._scripts[script]
+
+        project = self.project
+        roots = {exp for name in names if (exp := project.get(name)) is not None}
+        return project.descendants(roots)
+
+    def finished(
+        self, planned: Iterable[Experiment], project_run: Optional[ProjectRun]
+    ) -> None:
+        """Remember which planned experiments didn't complete, to run them next time.
+
+        Without a project run (starting it failed), none of them did.
+        """
+        completed = {
+            run.experiment.name
+            for run in (project_run.experiment_runs if project_run else [])
+            if run.status == RunStatus.COMPLETED
+        }
+        self._unfinished = {exp.name for exp in planned} - completed
+
+    ### PRIVATE #######################
+
+    def _scripts_of(self, experiment: Experiment) -> list[Path]:
+        """Files in the project directory that the experiment's command names"""
+        method = experiment.execution_method
+        if not isinstance(method, ScriptExecution):
+            return []
+        candidates = (self.source / arg for arg in [method.command, *method.args])
+        return [path for path in candidates if path.is_file()]
@@ -0,0 +1,353 @@
+"""Which ready experiments start next, shared by the runtime and the simulator.
+
+Experiments joined by streams are admitted as one group. Groups wait in a heap
+of (-priority, position in the plan, group), so the group with the longest
+estimated critical path comes off first.
+
+Experiments that need an exclusive instrument (physical equipment or a sensor)
+also wait for their slot in the reservation calendar; the pool only gives them
+CPUs and memory.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from lab.instrument.model.instrument import InstrumentRequirements
+from lab.instrument.service.calendar import Reservation as Booking
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.pool import DEFAULT_REQUIREMENTS, Allocation, ResourcePool
+from lab.project.model.plan import ExecutionPlan
+from lab.project.model.project import Experiment
+
+ReadyQueue = list[tuple[float, int, tuple[Experiment, ...]]]
+
+
+class Running:
+    """An experiment that has been admitted, with what it holds"""
+
+    def __init__(
+        self,
+        experiment: Experiment,
+        allocation: Optional[Allocation],
+        expected_end: float,
+        refusal: Optional[str] = None,
+    ):
+        self.experiment = experiment
+        self.allocation = allocation
+        self.expected_end = expected_end
+        self.refusal = refusal  # why it can't run, when there is no allocation
+
+
+class Reservation:
+    """
+    Resources held back for the first group that didn't fit: it is expected to
+    be able to start at `shadow`, leaving the spare CPUs and memory for others.
+    """
+
+    def __init__(self) -> None:
+        self.shadow: Optional[float] = None
+        self.spare_cpus = 0
+        self.spare_memory = 0
+
+
+class ReadyGroups:
+    """A plan's stream groups, queued as ready once their dependencies complete.
+
+    The groups and the edges between them are worked out once; `restart()` goes
+    back to nothing having run, for running the same plan again.
+    """
+
+    def __init__(self, plan: ExecutionPlan):
+        project = plan.project
+        position = {exp: i for i, exp in enumerate(plan.ordered_experiments)}
+        self.groups = [
+            tuple(sorted(group, key=position.__getitem__))
+            for group in project.stream_groups()
+        ]
+        self.group_of = {exp: i for i, group in enumerate(self.groups) for exp in group}
+        # Groups wait on the other groups they depend on, each counted once
+        dependents: list[set[int]] = [set() for _ in self.groups]
+        self._upstream_counts = []
+        for i, group in enumerate(self.groups):
+            upstream = {
+                self.group_of[dep]
+                for exp in group
+                for dep in project.dependencies_of(exp)
+            } - {i}
+            self._upstream_counts.append(len(upstream))
+            for j in upstream:
+                dependents[j].add(i)
+        self._dependents = [tuple(d) for d in dependents]
+        self._order = [
+            (-max(plan.priority(exp) for exp in group), position[group[0]])
+            for group in self.groups
+        ]
+        self.restart()
+
+    def restart(self) -> None:
+        self._waiting_on = list(self._upstream_counts)
+        self._remaining = [len(group) for group in self.groups]
+        self.queue: ReadyQueue = []
+        for i, count in enumerate(self._waiting_on):
+            if count == 0:
+                self._make_ready(i)
+
+    def finished(
+        self, experiment: Experiment, failed: bool
+    ) -> list[tuple[Experiment, ...]]:
+        """Queue the groups that were only waiting on this experiment's group.
+
+        Nothing that depends on a failed experiment is ever queued. Returns the
+        groups that were.
+        """
+        i = self.group_of[experiment]
+        self._remaining[i] -= 1
+        if failed or self._remaining[i] > 0:
+            return []
+        ready = []
+        for dependent in self._dependents[i]:
+            self._waiting_on[dependent] -= 1
+            if self._waiting_on[dependent] == 0:
+                self._make_ready(dependent)
+                ready.append(self.groups[dependent])
+        return ready
+
+    ### PRIVATE #######################
+
+    def _make_ready(self, i: int) -> None:
+        priority, position = self._order[i]
+        heapq.heappush(self.queue, (priority, position, self.groups[i]))
+
+
+def admit(
+    plan: ExecutionPlan,
+    pool: ResourcePool,
+    ready: ReadyQueue,
+    running: Iterable[Running],
+    now: float,
+    reservation: Optional[Reservation] = None,
+    limit: Optional[int] = None,
+    calendar: Optional[ReservationCalendar] = None,
+) -> list[list[Running]]:
+    """
+    Takes the ready groups that can start now off the queue (at most `limit` of
+    them), with the resources acquired for each of their experiments. Groups
+    whose requirements can never be met are returned without allocations, so
+    they fail.
+
+    Groups start in priority order while they fit. Once the first one doesn't
+    fit, it is given a reservation at the earliest time enough resources are
+    expected to be free (the shadow time). Lower-priority groups can still
+    backfill if they are expected to finish before then, or only use
+    resources the reservation leaves spare. A `reservation` passed in carries
+    over between calls, so queues admitted from in turn respect each other's.
+
+    With a `calendar`, a group needing exclusive instruments is first rebooked
+    into the earliest slot from now, and waits on the queue until every one of
+    its slots has come.
+    """
+    admitted: list[list[Running]] = []
+    skipped = []
+    if reservation is None:
+        reservation = Reservation()
+
+    while ready and pool.free_cpus > 0 and (limit is None or len(admitted) < limit):
+        item = heapq.heappop(ready)
+        group = item[2]
+        requirements = [exp.requirements or DEFAULT_REQUIREMENTS for exp in group]
+        exclusive = [
+            calendar is not None and bool(calendar.instruments(r)) for r in requirements
+        ]
+        if any(exclusive):
+            # The pool only sees what the calendar doesn't hand out
+            requirements = [
+                r.model_copy(update={"capabilities": set()}) if e else r
+                for r, e in zip(requirements, exclusive)
+            ]
+        combined = (
+            requirements[0]
+            if len(requirements) == 1
+            else InstrumentRequirements(
+                cpus=sum(r.cpus for r in requirements),
+                memory_bytes=sum(r.memory_bytes for r in requirements),
+            )
+        )
+        expected_end = now + max(plan.estimates.get(exp.id, 0.0) for exp in group)
+        refusal = _refusal(pool, group, requirements, combined)
+        if refusal is not None:
+            admitted.append(
+                [Running(exp, None, expected_end, refusal) for exp in group]
+            )
+            continue
+
+        bookings: list[Optional[Booking]] = [None] * len(group)
+        if calendar is not None and any(exclusive):
+            bookings = _book(calendar, plan, group, exclusive)
+            if not all(calendar.due(b) for b in bookings if b is not None):
+                skipped.append(item)
+                continue
+
+        if reservation.shadow is None:
+            allocations = _try_acquire(pool, requirements, bookings, calendar)
+            if allocations is not None:
+                admitted.append(_started(group, allocations, expected_end))
+            else:
+                skipped.append(item)
+                _reserve(
+                    reservation,
+                    pool,
+                    combined,
+                    [*running, *(run for runs in admitted for run in runs)],
+                    now,
+                )
+            continue
+
+        finishes_in_time = expected_end <= reservation.shadow
+        within_spare = (
+            combined.cpus <= reservation.spare_cpus
+            and combined.memory_bytes <= reservation.spare_memory
+            and not any(r.capabilities for r in requirements)
+        )
+        allocations = (
+            _try_acquire(pool, requirements, bookings, calendar)
+            if finishes_in_time or within_spare
+            else None
+        )
+        if allocations is None:
+            skipped.append(item)
+            continue
+
+        admitted.append(_started(group, allocations, expected_end))
+        if not finishes_in_time:
+            reservation.spare_cpus -= combined.cpus
+            reservation.spare_memory -= combined.memory_bytes
+
+    for item in skipped:
+        heapq.heappush(ready, item)
+
+    return admitted
+
+
+def next_slot(ready: ReadyQueue, calendar: ReservationCalendar) -> Optional[datetime]:
+    """The earliest booked start still to come of an experiment on the queue"""
+    upcoming = calendar.upcoming()
+    if not upcoming:
+        return None  # without looking through what may be a long queue
+    queued = {exp.id for item in ready for exp in item[2]}
+    return next((b.acquired_at for b in upcoming if b.experiment_id in queued), None)
+
+
+def release(
+    pool: ResourcePool,
+    allocation: Allocation,
+    calendar: Optional[ReservationCalendar] = None,
+) -> None:
+    """Give back everything an admitted experiment holds"""
+    pool.release(allocation)
+    if calendar is not None:
+        for claim in allocation.claims:
+            if isinstance(claim, Booking):
+                calendar.release(claim)
+
+
+### PRIVATE #######################
+
+
+def _started(
+    group: tuple[Experiment, ...], allocations: list[Allocation], expected_end: float
+) -> list[Running]:
+    return [
+        Running(exp, allocation, expected_end)
+        for exp, allocation in zip(group, allocations)
+    ]
+
+
+def _refusal(
+    pool: ResourcePool,
+    group: tuple[Experiment, ...],
+    requirements: list[InstrumentRequirements],
+    combined: InstrumentRequirements,
+) -> Optional[str]:
+    """Why a group can never start, if it can't"""
+    for exp, r in zip(group, requirements):
+        reason = pool.check(r)
+        if reason is not None:
+            return f"Experiment '{exp.name}' {reason}"
+    if len(group) > 1:
+        reason = pool.check(combined)
+        if reason is not None:
+            names = ", ".join(f"'{exp.name}'" for exp in group)
+            return (
+                f"Experiments {names} stream to each other, so together they {reason}"
+            )
+    return None
+
+
+def _book(
+    calendar: ReservationCalendar,
+    plan: ExecutionPlan,
+    group: tuple[Experiment, ...],
+    exclusive: list[bool],
+) -> list[Optional[Booking]]:
+    """Rebook the group's experiments that need exclusive instruments"""
+    return [
+        calendar.rebook(
+            exp.id,
+            exp.requirements or DEFAULT_REQUIREMENTS,
+            timedelta(seconds=plan.estimates.get(exp.id, 0.0)),
+        )
+        if e
+        else None
+        for exp, e in zip(group, exclusive)
+    ]
+
+
+def _try_acquire(
+    pool: ResourcePool,
+    requirements: list[InstrumentRequirements],
+    bookings: list[Optional[Booking]],
+    calendar: Optional[ReservationCalendar],
+) -> Optional[list[Allocation]]:
+    """Acquire resources for a whole group, or for none of it"""
+    allocations = []
+    for r in requirements:
+        allocation = pool.try_acquire(r)
+        if allocation is None:
+            for acquired in allocations:
+                pool.release(acquired)
+            return None
+        allocations.append(allocation)
+
+    for allocation, booking in zip(allocations, bookings):
+        if calendar is not None and booking is not None:
+            calendar.begin(booking)
+            allocation.claims.append(booking)
+    return allocations
+
+
+def _reserve(
+    reservation: Reservation,
+    pool: ResourcePool,
+    requirements: InstrumentRequirements,
+    running: list[Running],
+    now: float,
+) -> None:
+    """
+    Reserve for when a blocked experiment is expected to be able to start, and
+    the CPUs and memory that will be left over once it has.
+    """
+    cpus, memory_bytes = requirements.cpus, requirements.memory_bytes
+    free_cpus, free_memory = pool.free_cpus, pool.free_memory_bytes
+    shadow = now
+    for run in sorted(running, key=lambda r: r.expected_end):
+        if free_cpus >= cpus and free_memory >= memory_bytes:
+            break
+        if run.allocation is not None:
+            free_cpus += run.allocation.cpus
+            free_memory += run.allocation.memory_bytes
+            shadow = max(shadow, run.expected_end)
+
+    reservation.shadow = shadow
+    reservation.spare_cpus = free_cpus - cpus
+    reservation.spare_memory = free_memory - memory_bytes
@@ -0,0 +1,390 @@
+"""A small HTTP/1.1 client for driving instruments and services, on asyncio streams.
+
+Connections are kept alive and pooled per host, so a burst of requests to the same
+endpoint pays for the TCP (and TLS) handshake once. Requests to an endpoint can be
+limited to a number in flight, idempotent ones are retried with jittered
+exponential backoff, and payloads for endpoints that accept arrays can be batched
+into one request.
+"""
+
+import asyncio
+import json
+import random
+import ssl
+import weakref
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Optional
+from urllib.parse import urlencode, urlsplit
+
+from lab.core.model import Model
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+QUERY_METHODS = frozenset({"GET", "HEAD", "DELETE"})  # payload in the query string
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+MAX_CONNECTIONS_PER_HOST = 32
+IDLE_TIMEOUT_SECONDS = 30.0
+BACKOFF_BASE_SECONDS = 0.1
+BACKOFF_CAP_SECONDS = 10.0
+
+
+class HttpResponse(Model):
+    status: int
+    headers: dict[str, str]  # lower-case names
+    body: bytes
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json_body(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+class HttpClient:
+    """Pooled keep-alive connections, shared by everything on one event loop"""
+
+    def __init__(
+        self,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        keep_alive: bool = True,
+    ):
+        self._max_connections = max_connections_per_host
+        self._keep_alive = keep_alive
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._limits: dict[str, asyncio.Semaphore] = {}
+        self._batches: dict[tuple[str, str], _Batch] = {}
+        self._sending: set[asyncio.Task] = set()
+
+    @property
+    def connections_opened(self) -> int:
+        return sum(pool.opened for pool in self._pools.values())
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        payload: Any = None,
+        headers: Optional[dict[str, str]] = None,
+        timeout: float = 30.0,
+        retries: int = 3,
+        concurrency: Optional[int] = None,
+    ) -> HttpResponse:
+        """Send a request, with `payload` as the query (GET-like methods) or JSON body.
+
+        Only idempotent methods are retried: after connection errors, timeouts and
+        responses that ask the client to come back later.
+        """
+        method = method.upper()
+        retryable = method in IDEMPOTENT_METHODS
+        limit = self._limit(url, concurrency)
+        attempt = 0
+        while True:
+            try:
+                async with limit:
+                    response = await asyncio.wait_for(
+                        self._send(method, url, payload, headers or {}), timeout
+                    )
+                if not (
+                    response.status in RETRY_STATUSES
+                    and retryable
+                    and attempt < retries
+                ):
+                    return response
+                delay = max(_backoff(attempt), _retry_after(response))
+            except (
+                OSError,
+                EOFError,
+                asyncio.TimeoutError,
+                asyncio.IncompleteReadError,
+            ):
+                if not retryable or attempt >= retries:
+                    raise
+                delay = _backoff(attempt)
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def request_batched(
+        self,
+        method: str,
+        url: str,
+        payload: Any,
+        max_size: int,
+        linger_seconds: float = 0.01,
+        **options: Any,
+    ) -> Any:
+        """Send `payload` as one element of an array, with others for the same endpoint.
+
+        Payloads are collected until `max_size` are waiting or `linger_seconds` have
+        passed since the first. The endpoint must answer with an array holding one
+        result per payload, in order; this returns the element for `payload`. An
+        array can't be sent in a query string, so GET, HEAD and DELETE can't be
+        batched.
+        """
+        key = (method.upper(), url)
+        if key[0] in QUERY_METHODS:
+            raise ValueError(f"{key[0]} requests can't be batched")
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(
+                linger_seconds, self._flush, key, batch, options
+            )
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        batch.items.append((payload, future))
+        if len(batch.items) >= max_size:
+            self._flush(key, batch, options)
+        return await future
+
+    async def close(self) -> None:
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+    ### PRIVATE #######################
+
+    def _limit(self, url: str, concurrency: Optional[int]) -> AsyncContextManager:
+        if concurrency is None:
+            return nullcontext()
+        if url not in self._limits:
+            self._limits[url] = asyncio.Semaphore(concurrency)
+        return self._limits[url]
+
+    def _pool(self, scheme: str, host: str, port: int) -> "_HostPool":
+        key = (scheme, host, port)
+        if key not in self._pools:
+            self._pools[key] = _HostPool(scheme, host, port, self._max_connections)
+        return self._pools[key]
+
+    async def _send(
+        self, method: str, url: str, payload: Any, headers: dict[str, str]
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        query = parts.query
+        body = b""
+        if payload is not None and method in QUERY_METHODS:
+            query = "&".join(filter(None, [query, urlencode(payload, doseq=True)]))
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers = {"Content-Type": "application/json", **headers}
+        if query:
+            target = f"{target}?{query}"
+
+        head = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "User-Agent: lab",
+            "Accept: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if self._keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in headers.items()),
+        ]
+        request = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        pool = self._pool(scheme, host, port)
+        while True:
+            connection, reused = await pool.acquire()
+            try:
+                connection.writer.write(request)
+                await connection.writer.drain()
+                response, keep_alive = await _read_response(connection.reader, method)
+            except (_StaleConnection, ConnectionResetError, BrokenPipeError):
+                pool.release(connection, reusable=False)
+                if reused:
+                    continue  # the server closed it while idle, so it wasn't handled
+                raise
+            except BaseException:
+                pool.release(connection, reusable=False)
+                raise
+
+            pool.release(connection, reusable=keep_alive and self._keep_alive)
+            return response
+
+    def _flush(self, key: tuple[str, str], batch: "_Batch", options: dict) -> None:
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        if batch.items:
+            task = asyncio.ensure_future(self._send_batch(key, batch.items, options))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+            batch.items = []
+
+    async def _send_batch(
+        self,
+        key: tuple[str, str],
+        items: list[tuple[Any, asyncio.Future]],
+        options: dict,
+    ) -> None:
+        method, url = key
+        try:
+            response = await self.request(
+                method, url, [payload for payload, _ in items], **options
+            )
+            if not response.ok:
+                raise RuntimeError(f"{method} {url} returned {response.status}")
+            results = response.json_body()
+            if not isinstance(results, list) or len(results) != len(items):
+                raise RuntimeError(
+                    f"{method} {url} answered a batch of {len(items)} with "
+                    f"{type(results).__name__}, not an array of {len(items)} results"
+                )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HttpClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_client() -> HttpClient:
+    """The client for the running event loop, so its connections are reused"""
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = HttpClient()
+    return _clients[loop]
+
+
+### PRIVATE #######################
+
+
+class _StaleConnection(ConnectionError):
+    """The connection was closed before any of the response arrived"""
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = 0.0
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _HostPool:
+    """Idle keep-alive connections to one host, and a cap on open ones"""
+
+    def __init__(self, scheme: str, host: str, port: int, max_connections: int):
+        self._host = host
+        self._port = port
+        self._ssl = ssl.create_default_context() if scheme == "https" else None
+        self._idle: list[_Connection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def acquire(self) -> tuple[_Connection, bool]:
+        """A connection, and whether it was reused from the pool"""
+        await self._slots.acquire()
+        now = asyncio.get_running_loop().time()
+        while self._idle:
+            connection = self._idle.pop()
+            if (
+                now - connection.idle_since < IDLE_TIMEOUT_SECONDS
+                and not connection.reader.at_eof()
+            ):
+                return connection, True
+            connection.close()
+
+        try:
+            reader, writer = await asyncio.open_connection(
+                self._host, self._port, ssl=self._ssl
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return _Connection(reader, writer), False
+
+    def release(self, connection: _Connection, reusable: bool) -> None:
+        if reusable:
+            connection.idle_since = asyncio.get_running_loop().time()
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.items: list[tuple[Any, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+async def _read_response(
+    reader: asyncio.StreamReader, method: str
+) -> tuple[HttpResponse, bool]:
+    """The response, and whether the connection can be reused afterwards"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise _StaleConnection("Connection closed before the response")
+
+    version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    code = int(status)
+    connection = headers.get("connection", "").lower()
+    keep_alive = (
+        connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    )
+    if method == "HEAD" or code in (204, 304) or 100 <= code < 200:
+        body = b""
+    elif headers.get("transfer-encoding", "").lower().endswith("chunked"):
+        body = await _read_chunked(reader)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()  # delimited by the server closing
+        keep_alive = False
+
+    return HttpResponse(status=code, headers=headers, body=body), keep_alive
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            # Skip trailers up to the blank line
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)  # CRLF
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: a random wait up to the exponential backoff for this attempt"""
+    return random.uniform(
+        0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    )
+
+
+def _retry_after(response: HttpResponse) -> float:
+    try:
+        return min(float(response.headers.get("retry-after", 0)), BACKOFF_CAP_SECONDS)
+    except ValueError:
+        return 0.0  # an HTTP date, which isn't worth parsing
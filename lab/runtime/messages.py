@@ -1,3 +1,5 @@
+from typing import Any
+
 from lab.core.messaging.message import Message
 from lab.runtime.model.run import ExperimentRun, ProjectRun
 
@@ -15,6 +17,19 @@ class ExperimentRunFailed(Message):
     reason: str
 
 
+class ExperimentRunCancelled(Message):
+    run: ExperimentRun
+    reason: str
+
+
+class ExperimentRunReported(Message):
+    """A batch of scalars and outputs logged by a running experiment"""
+
+    run: ExperimentRun
+    scalars: list[tuple[str, int, float, float]]  # name, step, value, epoch seconds
+    outputs: dict[str, Any]
+
+
 class ProjectRunStarted(Message):
     run: ProjectRun
 
@@ -26,3 +41,7 @@ class ProjectRunComplete(Message):
 class ProjectRunFailed(Message):
     run: ProjectRun
     reason: str
+
+
+class ProjectRunCancelled(Message):
+    run: ProjectRun
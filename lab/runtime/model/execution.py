@@ -1,11 +1,16 @@
+import os
 from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
-from pydantic import Field
+from pydantic import Field, model_validator
 
 from lab.core.model import Model
+from lab.instrument.model.instrument import InstrumentClaim
+from lab.runtime.http import QUERY_METHODS, shared_client
+from lab.runtime.process import run_process
+from lab.sdk.artifacts import ARTIFACTS_ENV, publish
 
 
 class ExecutionMetrics(Model):
@@ -26,7 +31,8 @@ class ExecutionContext(Model):
     working_dir: Path
     env_vars: dict[str, str] = Field(default_factory=dict)
     metrics: list[ExecutionMetrics] = Field(default_factory=list)
-    # resource_claims: list[ResourceClaim] = Field(default_factory=list)
+    pid: Optional[int] = None  # session leader, for executions that start a process
+    resource_claims: list[InstrumentClaim] = Field(default_factory=list)
 
 
 class ExecutionMethod(Model, ABC):
@@ -47,7 +53,32 @@ class ScriptExecution(ExecutionMethod):
     env: dict[str, str] = Field(default_factory=dict)
 
     async def run(self, context: ExecutionContext) -> None:
-        print("TODO: implement ScriptExecution.run")
+        start_time = datetime.now()
+        result = await run_process(
+            [self.command, *self.args],
+            cwd=context.working_dir,
+            env={**os.environ, **context.env_vars, **self.env},
+            on_spawn=lambda pid: setattr(context, "pid", pid),
+        )
+        end_time = datetime.now()
+
+        context.metrics.append(
+            ExecutionMetrics(
+                start_time=start_time,
+                end_time=end_time,
+                duration_seconds=(end_time - start_time).total_seconds(),
+                memory_peak_bytes=result.memory_peak_bytes,
+                cpu_time_seconds=result.cpu_time_seconds,
+                io_read_bytes=result.io_read_bytes,
+                io_write_bytes=result.io_write_bytes,
+            )
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"'{' '.join([self.command, *self.args])}' exited with status "
+                f"{result.returncode}"
+            )
 
 
 class LocalFunctionExecution(ExecutionMethod):
@@ -62,11 +93,72 @@ class LocalFunctionExecution(ExecutionMethod):
 
 
 class APIExecution(ExecutionMethod):
-    """Execute via external API (e.g. lab equipment)"""
+    """Execute via external API (e.g. lab equipment)
+
+    The JSON response is published as the output `response`. Requests go through
+    the event loop's shared HTTP client, so connections to an endpoint are reused.
+    """
 
     endpoint: str
     method: str
     payload: dict[str, Any] = Field(default_factory=dict)
+    headers: dict[str, str] = Field(default_factory=dict)
+    timeout_seconds: float = 30.0
+    retries: int = 3  # only for idempotent methods
+    max_concurrency: Optional[int] = None  # requests in flight to this endpoint
+    batch_size: int = 1  # above 1, payloads are sent together in an array
+    batch_linger_seconds: float = 0.01
+
+    @model_validator(mode="after")
+    def _check_batching(self) -> "APIExecution":
+        if self.batch_size > 1 and self.method.upper() in QUERY_METHODS:
+            raise ValueError(
+                f"{self.method.upper()} requests can't be batched: their payload "
+                "goes in the query string, which can't hold an array"
+            )
+        return self
 
     async def run(self, context: ExecutionContext) -> None:
-        print("TODO: implement APIExecution.run")
+        start_time = datetime.now()
+        client = shared_client()
+        options: dict[str, Any] = dict(
+            headers=self.headers,
+            timeout=self.timeout_seconds,
+            retries=self.retries,
+            concurrency=self.max_concurrency,
+        )
+        if self.batch_size > 1:
+            result = await client.request_batched(
+                self.method,
+                self.endpoint,
+                self.payload,
+                max_size=self.batch_size,
+                linger_seconds=self.batch_linger_seconds,
+                **options,
+            )
+        else:
+            response = await client.request(
+                self.method, self.endpoint, self.payload or None, **options
+            )
+            if not response.ok:
+                raise RuntimeError(
+                    f"{self.method.upper()} {self.endpoint} returned "
+                    f"{response.status}: {response.body[:200].decode(errors='replace')}"
+                )
+            result = response.json_body()
+
+        if ARTIFACTS_ENV in context.env_vars:
+            publish("response", result, Path(context.env_vars[ARTIFACTS_ENV]))
+
+        end_time = datetime.now()
+        context.metrics.append(
+            ExecutionMetrics(
+                start_time=start_time,
+                end_time=end_time,
+                duration_seconds=(end_time - start_time).total_seconds(),
+                memory_peak_bytes=0,
+                cpu_time_seconds=0.0,
+                io_read_bytes=0,
+                io_write_bytes=0,
+            )
+        )
@@ -1,13 +1,13 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 from uuid import UUID, uuid4
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from lab.core.model import Model
 from lab.project.model.project import Experiment, Project
-from lab.runtime.model.execution import ExecutionContext
+from lab.runtime.model.execution import ExecutionContext, ExecutionMetrics
 
 
 class RunStatus(str, Enum):
@@ -29,7 +29,9 @@ class ExperimentRun(Model):
     started_at: datetime = Field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
     error: Optional[str] = None  # Changed from Exception for serialization
-    # metrics: list[ExecutionMetrics] = Field(default_factory=list)
+    metrics: list[ExecutionMetrics] = Field(default_factory=list)
+    scalars: dict[str, float] = Field(default_factory=dict)  # latest value logged
+    outputs: dict[str, Any] = Field(default_factory=dict)
     # instrument_metrics: list[InstrumentMetric] = Field(default_factory=list)
 
 
@@ -43,3 +45,12 @@ class ProjectRun(Model):
     started_at: datetime = Field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
     error: Optional[str] = None  # Changed from Exception for serialization
+    # experiment → its latest completed run, kept by `completed`
+    _completed: dict[UUID, ExperimentRun] = PrivateAttr(default_factory=dict)
+
+    def completed(self, run: ExperimentRun) -> None:
+        """Note that one of its experiment runs has completed"""
+        self._completed[run.experiment.id] = run
+
+    def latest_completed(self, experiment: Experiment) -> Optional[ExperimentRun]:
+        return self._completed.get(experiment.id)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+from lab.project.model.project import Experiment, ValueReference
+from lab.runtime.model.execution import ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun
+from lab.runtime.persistence.workspace import ContentStore
+from lab.sdk.artifacts import (
+    ARTIFACTS_ENV,
+    INPUTS_ENV,
+    PARAMETERS_ENV,
+    read_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINTS = "by-fingerprint"  # links to the latest outputs of each reuse key
+
+
+class ArtifactStore:
+    """Outputs published by experiment runs, one directory per run.
+
+    Each completed run is also linked under its experiment's reuse key, so an
+    experiment whose upstream isn't part of the current project run can still use
+    the outputs of an identical earlier run. The key is the experiment's
+    fingerprint together with the contents of the scripts it and its upstream
+    experiments run, so outputs made before a script was edited aren't reused.
+    """
+
+    def __init__(self, directory: Path, store: ContentStore):
+        self._directory = directory
+        self._store = store
+        self._keys: dict[UUID, dict[UUID, str]] = {}  # project run → experiment → key
+
+    def track(self, project_run: ProjectRun, scripts: Path) -> None:
+        """Work out the reuse keys for a project run, from the scripts in `scripts`"""
+        keys: dict[UUID, str] = {}
+        pending = list(project_run.project.experiments)
+        while pending:
+            experiment = pending[-1]
+            upstream = [d for d in experiment.dependencies if d.id not in keys]
+            if upstream:
+                pending.extend(upstream)
+                continue
+            pending.pop()
+            if experiment.id in keys:
+                continue
+            digest = hashlib.sha256(experiment.fingerprint.encode())
+            for key in sorted(keys[d.id] for d in experiment.dependencies):
+                digest.update(key.encode())
+            for script in _scripts(experiment, scripts):
+                # Stored objects are named by the hash of their content
+                digest.update(os.path.basename(self._store.put(script)).encode())
+            keys[experiment.id] = digest.hexdigest()
+
+        self._keys[project_run.id] = keys
+
+    def untrack(self, project_run: ProjectRun) -> None:
+        self._keys.pop(project_run.id, None)
+
+    def directory_for(self, run: ExperimentRun) -> Path:
+        return self._directory / str(run.id)
+
+    def outputs(self, directory: Path) -> dict[str, dict[str, str]]:
+        """The manifest of a run directory, with absolute paths"""
+        return {
+            name: {"kind": entry["kind"], "path": str(directory / entry["path"])}
+            for name, entry in read_manifest(directory).items()
+        }
+
+    def resolve(
+        self, experiment: Experiment, project_run: ProjectRun
+    ) -> dict[str, dict[str, str]]:
+        """Find the upstream output bound to each referencing parameter.
+
+        Streamed references within the project are skipped; the runtime connects
+        those while both experiments run. Outputs the upstream didn't publish are
+        left unbound, with a warning: not every upstream uses `lab.sdk.publish`,
+        and the experiment may not need them.
+        """
+        project = project_run.project
+        inputs = {}
+        for parameter, value in experiment.parameters.items():
+            if not isinstance(value, ValueReference):
+                continue
+            if value.stream and project.is_streamed(value.owner, experiment):
+                continue
+
+            directory = self._upstream_directory(value.owner, project_run)
+            outputs = self.outputs(directory) if directory else {}
+            if value.output not in outputs:
+                logger.warning(
+                    f"Experiment '{experiment.name}' refers to output "
+                    f"'{value.output}' of '{value.owner.name}', which it didn't "
+                    "publish"
+                )
+                continue
+            inputs[parameter] = outputs[value.output]
+
+        return inputs
+
+    def environment(
+        self, run: ExperimentRun, inputs: dict[str, dict[str, str]]
+    ) -> dict[str, str]:
+        parameters: dict[str, Any] = {
+            name: value
+            for name, value in run.experiment.parameters.items()
+            if not isinstance(value, ValueReference)
+        }
+        return {
+            ARTIFACTS_ENV: str(self.directory_for(run)),
+            INPUTS_ENV: json.dumps(inputs),
+            PARAMETERS_ENV: json.dumps(parameters),
+        }
+
+    def completed(self, run: ExperimentRun) -> None:
+        """Make a successful run's outputs the latest for its reuse key"""
+        directory = self.directory_for(run)
+        link = self._fingerprint_link(run.experiment, run.project_run)
+        if link is None or not directory.is_dir():
+            return
+
+        link.parent.mkdir(parents=True, exist_ok=True)
+        partial = link.with_name(f".{link.name}.partial")
+        partial.unlink(missing_ok=True)
+        os.symlink(directory, partial, target_is_directory=True)
+        os.replace(partial, link)
+
+    ### PRIVATE #######################
+
+    def _upstream_directory(
+        self, owner: Experiment, project_run: ProjectRun
+    ) -> Optional[Path]:
+        run = project_run.latest_completed(owner)
+        if run is not None:
+            return self.directory_for(run)
+
+        link = self._fingerprint_link(owner, project_run)
+        if link is None or not link.exists():
+            return None
+        directory = link.resolve()
+        os.utime(directory)  # reused, so the garbage collector keeps it longer
+        return directory
+
+    def _fingerprint_link(
+        self, experiment: Experiment, project_run: ProjectRun
+    ) -> Optional[Path]:
+        """Where the experiment's reusable outputs are linked, if it's tracked"""
+        key = self._keys.get(project_run.id, {}).get(experiment.id)
+        return self._directory / FINGERPRINTS / key if key is not None else None
+
+
+def _scripts(experiment: Experiment, directory: Path) -> list[Path]:
+    """Files in `directory` its command is given, such as the script it runs"""
+    method = experiment.execution_method
+    if not isinstance(method, ScriptExecution):
+        return []
+    paths = [directory / arg for arg in method.args]
+    return [path for path in paths if os.path.isfile(path)]
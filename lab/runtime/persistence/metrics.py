@@ -0,0 +1,116 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, Iterable
+from uuid import uuid4
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+RUNS = "runs"
+SCALARS = "scalars"
+
+SCHEMAS: dict[str, dict[str, Any]] = {
+    RUNS: {
+        "run_id": pl.String,
+        "project_run_id": pl.String,
+        "experiment_id": pl.String,
+        "experiment": pl.String,
+        "fingerprint": pl.String,
+        "status": pl.String,
+        "started_at": pl.Datetime("us"),
+        "completed_at": pl.Datetime("us"),
+        "duration_seconds": pl.Float64,
+        "memory_peak_bytes": pl.Int64,
+        "cpu_time_seconds": pl.Float64,
+        "io_read_bytes": pl.Int64,
+        "io_write_bytes": pl.Int64,
+    },
+    SCALARS: {
+        "run_id": pl.String,
+        "experiment": pl.String,
+        "name": pl.String,
+        "step": pl.Int64,
+        "value": pl.Float64,
+        "timestamp": pl.Datetime("us"),
+    },
+}
+
+
+class MetricsStore:
+    """Append-only Parquet dataset of run metrics, partitioned by table and day.
+
+    Rows are buffered in memory and written as one small file per flush, so
+    appending never rewrites existing data. `compact` later merges the small files
+    of a partition into one file with large row groups. Readers get lazy scans, so
+    filters and projections are pushed down into the Parquet reader.
+    """
+
+    def __init__(
+        self, directory: Path, flush_rows: int = 1000, compact_files: int = 16
+    ):
+        self._directory = directory
+        self._flush_rows = flush_rows
+        self._compact_files = compact_files
+        self._buffers: dict[str, list[dict[str, Any]]] = {
+            table: [] for table in SCHEMAS
+        }
+
+    def append(self, table: str, rows: Iterable[dict[str, Any]]) -> None:
+        buffer = self._buffers[table]
+        buffer.extend(rows)
+        if len(buffer) >= self._flush_rows:
+            self._flush(table)
+
+    def flush(self) -> None:
+        for table in SCHEMAS:
+            self._flush(table)
+
+    def scan(self, table: str) -> pl.LazyFrame:
+        """Lazy scan of everything flushed so far; buffered rows aren't included"""
+        files = sorted((self._directory / table).glob("day=*/*.parquet"))
+        if not files:
+            return pl.LazyFrame(schema=SCHEMAS[table])
+        return pl.scan_parquet(files, schema=SCHEMAS[table], hive_partitioning=False)
+
+    def compact(self) -> int:
+        """Merge partitions holding many small files, returning how many were merged"""
+        merged = 0
+        for table in SCHEMAS:
+            for partition in sorted((self._directory / table).glob("day=*")):
+                files = sorted(partition.glob("*.parquet"))
+                if len(files) < self._compact_files:
+                    continue
+
+                target = partition / f"compacted-{uuid4().hex}.parquet"
+                tmp = target.with_suffix(".tmp")
+                pl.scan_parquet(files, schema=SCHEMAS[table]).sink_parquet(tmp)
+                os.replace(tmp, target)
+                for file in files:
+                    file.unlink()
+                merged += 1
+
+        return merged
+
+    ### PRIVATE #######################
+
+    def _flush(self, table: str) -> None:
+        rows = self._buffers[table]
+        if not rows:
+            return
+
+        self._buffers[table] = []
+        frame = pl.DataFrame(rows, schema=SCHEMAS[table])
+        day_column = "started_at" if table == RUNS else "timestamp"
+        for (day,), partition in frame.group_by(
+            pl.col(day_column).dt.date(), maintain_order=True
+        ):
+            directory = self._directory / table / f"day={day or 'unknown'}"
+            directory.mkdir(parents=True, exist_ok=True)
+            target = directory / f"part-{uuid4().hex}.parquet"
+            tmp = target.with_suffix(".tmp")
+            partition.write_parquet(tmp)
+            os.replace(tmp, target)
+
+        logger.debug(f"Flushed {len(rows)} rows to {table}")
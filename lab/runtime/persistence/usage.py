@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lab.core.model import Model
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pins (
+    project_run TEXT PRIMARY KEY
+);
+"""
+
+
+class UsageEntry(Model):
+    """Something under the data directory that can be collected as a whole"""
+
+    path: str
+    kind: str
+    size: int  # bytes it would free
+    used: float  # epoch seconds it was last written or read
+    mtime_ns: int  # when it was measured, to tell if it needs measuring again
+    owner: Optional[str] = None  # the project run it belongs to, if known
+
+
+class UsageIndex:
+    """Sizes and last use of collectable entries, kept in SQLite between runs.
+
+    Also records the mtime of directories that were listed, so a directory whose
+    entries haven't changed doesn't have to be listed again, and which project
+    runs are pinned.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # the background collector uses a thread
+
+    def entries(self, kind: Optional[str] = None) -> dict[str, UsageEntry]:
+        query = "SELECT path, kind, size, used, mtime_ns, owner FROM entries"
+        rows = (
+            self._execute(query + " WHERE kind = ?", (kind,))
+            if kind
+            else self._execute(query)
+        )
+        return {row[0]: _entry(row) for row in rows}
+
+    def save(self, entries: Iterable[UsageEntry]) -> None:
+        self._execute_many(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            [(e.path, e.kind, e.size, e.used, e.mtime_ns, e.owner) for e in entries],
+        )
+
+    def remove(self, paths: Iterable[str]) -> None:
+        self._execute_many(
+            "DELETE FROM entries WHERE path = ?", [(path,) for path in paths]
+        )
+
+    def directory_mtime(self, path: str) -> Optional[int]:
+        rows = self._execute("SELECT mtime_ns FROM directories WHERE path = ?", (path,))
+        return rows[0][0] if rows else None
+
+    def listed(self, path: str, mtime_ns: int) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?)", (path, mtime_ns)
+        )
+
+    def directories(self) -> dict[str, int]:
+        """Every listed directory, with the mtime it had then"""
+        return dict(self._execute("SELECT path, mtime_ns FROM directories"))
+
+    def save_directories(self, mtimes: dict[str, int]) -> None:
+        self._execute_many(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?)", list(mtimes.items())
+        )
+
+    def forget_directories(self, paths: Iterable[str]) -> None:
+        self._execute_many(
+            "DELETE FROM directories WHERE path = ?", [(path,) for path in paths]
+        )
+
+    def pins(self) -> set[str]:
+        return {row[0] for row in self._execute("SELECT project_run FROM pins")}
+
+    def pin(self, project_run: str) -> None:
+        self._execute("INSERT OR IGNORE INTO pins VALUES (?)", (project_run,))
+
+    def unpin(self, project_run: str) -> None:
+        self._execute("DELETE FROM pins WHERE project_run = ?", (project_run,))
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    ### PRIVATE #######################
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                return connection.execute(query, parameters).fetchall()
+
+    def _execute_many(self, query: str, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(query, rows)
+
+
+def _entry(row: tuple) -> UsageEntry:
+    path, kind, size, used, mtime_ns, owner = row
+    return UsageEntry.model_construct(
+        path=path, kind=kind, size=size, used=used, mtime_ns=mtime_ns, owner=owner
+    )
@@ -0,0 +1,268 @@
+"""Working directories for experiment runs, staged from a content-addressed store.
+
+The project directory is snapshotted once per project run: every file is stored
+under the hash of its content, and files whose size, mtime and inode haven't
+changed since the last snapshot aren't read again. Each experiment then gets its
+own copy of the snapshot as its working directory, built from links to the
+stored objects, so staging a workdir costs a directory entry per file rather than
+a copy of it.
+
+Reflinks (copy-on-write clones) are used where the filesystem supports them and
+hard links otherwise. Stored objects are read-only; with hard links an experiment
+that changes a staged file has to replace it rather than write to it in place.
+Outputs belong in the run's artifact directory (`LAB_ARTIFACTS`), which is kept
+apart from the workspace.
+"""
+
+import errno
+import fcntl
+import fnmatch
+import hashlib
+import logging
+import marshal
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lab.runtime.model.run import ExperimentRun, ProjectRun
+
+logger = logging.getLogger(__name__)
+
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+RETENTION_POLICIES = ("always", "failed", "never")
+FICLONE = 0x40049409  # from linux/fs.h
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Reflinks aren't supported by this filesystem (or across filesystems)
+_NO_REFLINK = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS}
+
+
+class Snapshot:
+    """The files of a directory at one point in time, as paths of stored objects"""
+
+    def __init__(
+        self, source: Path, directories: list[str], files: list[tuple[str, str]]
+    ):
+        self.source = source
+        self.directories = directories  # relative, parents before children
+        self.files = files  # (relative path, object path)
+
+
+class ContentStore:
+    """Files stored once each, named by the hash of their content.
+
+    An executable file is a different object from a plain one with the same
+    content, because links share the mode of what they point to.
+    """
+
+    def __init__(self, directory: Path):
+        self._directory = directory
+        self._objects = directory / "objects"
+        self._index_path = directory / "index"
+        # Absolute path -> (size, mtime_ns, inode, object) when it was last stored
+        self._index: Optional[dict[str, tuple[int, int, int, str]]] = None
+
+    def put(self, path: Path) -> str:
+        """Store a file, returning the path of its object"""
+        return self._put(str(path.absolute()), path.stat())
+
+    def snapshot(self, source: Path, ignore: Iterable[str] = ()) -> Snapshot:
+        """Store every file under `source`, skipping names that match `ignore`"""
+        patterns = list(ignore)
+        source = source.absolute()
+        base = str(source)
+        directories: list[str] = []
+        files: list[tuple[str, str]] = []
+        pending = [""]
+        while pending:
+            relative = pending.pop()
+            with os.scandir(f"{base}/{relative}") as entries:
+                for entry in entries:
+                    if any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                        continue
+                    path = f"{relative}/{entry.name}" if relative else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(path)
+                        pending.append(path)
+                    elif entry.is_file():
+                        files.append((path, self._put(entry.path, entry.stat())))
+
+        self._save_index()
+        directories.sort()
+        return Snapshot(source, directories, files)
+
+    def referenced(self) -> set[str]:
+        """Objects that the latest snapshot of some file refers to"""
+        index = {**self._read_index(), **(self._index or {})}
+        return {entry[3] for entry in index.values()}
+
+    ### PRIVATE #######################
+
+    def _put(self, path: str, info: os.stat_result) -> str:
+        index = self._load_index()
+        cached = index.get(path)
+        if (
+            cached is not None
+            and cached[:3] == (info.st_size, info.st_mtime_ns, info.st_ino)
+            and os.path.exists(cached[3])
+        ):
+            return cached[3]
+
+        digest = _hash_file(path)
+        executable = bool(info.st_mode & stat.S_IXUSR)
+        name = digest + (".x" if executable else "")
+        target = f"{self._objects}/{digest[:2]}/{name}"
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            partial = f"{self._objects}/{digest[:2]}/.{name}.{os.getpid()}"
+            shutil.copyfile(path, partial)
+            os.chmod(partial, 0o555 if executable else 0o444)
+            os.replace(partial, target)
+
+        index[path] = (info.st_size, info.st_mtime_ns, info.st_ino, target)
+        return target
+
+    def _load_index(self) -> dict[str, tuple[int, int, int, str]]:
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def _read_index(self) -> dict[str, tuple[int, int, int, str]]:
+        try:
+            return marshal.loads(self._index_path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+
+    def _save_index(self) -> None:
+        if self._index is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        partial = self._index_path.with_name(f".index.{os.getpid()}")
+        partial.write_bytes(marshal.dumps(self._index))
+        os.replace(partial, self._index_path)
+
+
+class WorkspaceProvisioner:
+    """Creates a working directory per experiment run from a project snapshot.
+
+    Workdirs live under `<directory>/<project run id>/<experiment name>`. After a
+    run, its workdir is kept or removed according to `retention`: "always",
+    "failed" (kept for debugging failed runs) or "never".
+    """
+
+    def __init__(
+        self,
+        store: ContentStore,
+        directory: Path,
+        links: str = "auto",
+        retention: str = "failed",
+        ignore: Iterable[str] = (),
+    ):
+        if links not in LINK_MODES:
+            raise ValueError(
+                f"Unknown link mode '{links}', expected one of {LINK_MODES}"
+            )
+        if retention not in RETENTION_POLICIES:
+            raise ValueError(
+                f"Unknown retention '{retention}', expected one of {RETENTION_POLICIES}"
+            )
+        self._store = store
+        self._directory = directory
+        self._links = links
+        self._retention = retention
+        self._ignore = list(ignore)
+
+    def snapshot(self, source: Path) -> Snapshot:
+        return self._store.snapshot(source, self._ignore)
+
+    def directory_for(self, run: ExperimentRun) -> Path:
+        return self._directory / str(run.project_run.id) / run.experiment.name
+
+    def provision(self, snapshot: Snapshot, run: ExperimentRun) -> Path:
+        """Create the run's working directory, populated from the snapshot"""
+        root = self.directory_for(run)
+        if root.exists():
+            shutil.rmtree(root)  # left by an earlier attempt
+        root.mkdir(parents=True)
+
+        base = str(root)
+        for directory in snapshot.directories:
+            os.mkdir(f"{base}/{directory}")
+        for relative, target in snapshot.files:
+            destination = f"{base}/{relative}"
+            while True:
+                links = self._links
+                try:
+                    self._link(target, destination, links)
+                    break
+                except OSError as e:
+                    if not self._fall_back(e, links):
+                        raise
+
+        return root
+
+    def release(self, run: ExperimentRun, failed: bool) -> None:
+        """Remove a run's working directory, unless the retention policy keeps it"""
+        if self._retention == "always" or (self._retention == "failed" and failed):
+            return
+        shutil.rmtree(self.directory_for(run), ignore_errors=True)
+
+    def finish(self, project_run: ProjectRun) -> None:
+        """Remove a project run's directory once none of its workdirs were kept"""
+        try:
+            (self._directory / str(project_run.id)).rmdir()
+        except OSError:
+            pass  # not empty, or nothing was provisioned
+
+    ### PRIVATE #######################
+
+    def _link(self, target: str, destination: str, links: str) -> None:
+        if links == "hardlink":
+            os.link(target, destination)
+        elif links in ("auto", "reflink"):
+            _reflink(target, destination)
+        else:
+            shutil.copyfile(target, destination)
+            if target.endswith(".x"):
+                os.chmod(destination, 0o755)
+
+    def _fall_back(self, error: OSError, links: str) -> bool:
+        """Switch to the next cheapest way of linking, if the error calls for it.
+
+        Workspaces are staged from several threads at once, so another one may
+        already have switched away from the way that failed.
+        """
+        if links != self._links:
+            return True
+        if self._links in ("auto", "reflink") and error.errno in _NO_REFLINK:
+            self._links = "hardlink" if self._links == "auto" else "copy"
+        elif self._links == "hardlink" and error.errno in (errno.EXDEV, errno.EMLINK):
+            self._links = "copy"
+        else:
+            return False
+
+        logger.info(f"Staging workspaces with {self._links} ({error.strerror})")
+        return True
+
+
+def _reflink(target: str, destination: str) -> None:
+    with open(target, "rb") as source:
+        with open(destination, "wb") as clone:
+            try:
+                fcntl.ioctl(clone.fileno(), FICLONE, source.fileno())
+            except OSError:
+                clone.close()
+                os.unlink(destination)
+                raise
+    if target.endswith(".x"):
+        os.chmod(destination, 0o755)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+from lab.core.model import Model
+
+WAIT_POLL_INTERVAL_SECONDS = 0.05
+TERMINATE_GRACE_SECONDS = 5.0  # between SIGTERM and SIGKILL when cancelled
+
+
+class ProcessResult(Model):
+    """Exit status and OS resource accounting for a finished process tree"""
+
+    returncode: int
+    cpu_time_seconds: float
+    memory_peak_bytes: int
+    io_read_bytes: int
+    io_write_bytes: int
+
+
+async def run_process(
+    argv: list[str],
+    cwd: Optional[Path] = None,
+    env: Optional[dict[str, str]] = None,
+    on_spawn: Optional[Callable[[int], None]] = None,
+) -> ProcessResult:
+    """Run a command in its own session and wait for it without blocking the loop.
+
+    The process is reaped with wait4(), so the kernel's accounting for it and every
+    descendant it waited for comes back with the exit status.
+
+    Cancelling the wait terminates the process group: SIGTERM, then SIGKILL for
+    whatever is left after `TERMINATE_GRACE_SECONDS`.
+    """
+    process = subprocess.Popen(argv, cwd=cwd, env=env, start_new_session=True)
+    if on_spawn:
+        on_spawn(process.pid)
+
+    try:
+        await _wait_for_exit(process.pid)
+    except asyncio.CancelledError:
+        await _terminate(process.pid)
+        raise
+
+    # The process is a zombie now, so its I/O counters are still readable
+    io = _read_io(process.pid)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return ProcessResult(
+        returncode=process.returncode,
+        cpu_time_seconds=usage.ru_utime + usage.ru_stime,
+        memory_peak_bytes=_maxrss_bytes(usage),
+        io_read_bytes=io.get("read_bytes", usage.ru_inblock * 512),
+        io_write_bytes=io.get("write_bytes", usage.ru_oublock * 512),
+    )
+
+
+### PRIVATE #######################
+
+
+async def _wait_for_exit(pid: int) -> None:
+    """Wait until the process exits, leaving it unreaped"""
+    pidfd_open = getattr(os, "pidfd_open", None)
+    if pidfd_open is not None:
+        try:
+            fd = pidfd_open(pid)
+        except OSError:
+            fd = None
+
+        if fd is not None:
+            loop = asyncio.get_running_loop()
+            exited = loop.create_future()
+            loop.add_reader(fd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(fd)
+                os.close(fd)
+            return
+
+    while os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+        await asyncio.sleep(WAIT_POLL_INTERVAL_SECONDS)
+
+
+async def _terminate(pid: int) -> None:
+    """Stop a session leader and everything in its process group, and reap it"""
+    _signal_group(pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(_wait_for_exit(pid), TERMINATE_GRACE_SECONDS)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass  # cancelled again while waiting: stop asking nicely
+
+    # The unreaped leader keeps the group id from being reused, so this can't
+    # reach anything else; it also catches descendants that ignored SIGTERM
+    _signal_group(pid, signal.SIGKILL)
+    os.wait4(pid, 0)
+
+
+def _signal_group(pid: int, sig: signal.Signals) -> None:
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _read_io(pid: int) -> dict[str, int]:
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            return {
+                key: int(value)
+                for key, value in (line.split(": ") for line in f.read().splitlines())
+            }
+    except (OSError, ValueError):
+        return {}
+
+
+def _maxrss_bytes(usage: resource.struct_rusage) -> int:
+    # Linux reports kilobytes, macOS reports bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
@@ -0,0 +1,55 @@
+"""Messages between a coordinator and its workers.
+
+Both ends keep one TCP connection open for the life of the worker. Every frame is a
+length prefix and a marshalled tuple whose first item is the message kind, so
+decoding never executes code.
+
+    worker                              coordinator
+    REGISTER name cpus memory [instr]  ->
+                                       <- REGISTERED worker_id heartbeat lease
+    CREDIT cpus memory                 ->   (capacity it wants work for)
+                                       <- ASSIGN lease_id method fields env cwd
+    STARTED lease_id                   ->
+    HEARTBEAT [lease_id, ...]          ->   (renews those leases)
+    FINISHED lease_id error [metrics]  ->
+                                       <- CANCEL lease_id
+"""
+
+import asyncio
+import marshal
+import struct
+from typing import Any, Optional
+
+FRAME_HEADER = struct.Struct("<I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+REGISTER = "register"
+REGISTERED = "registered"
+CREDIT = "credit"
+ASSIGN = "assign"
+STARTED = "started"
+HEARTBEAT = "heartbeat"
+FINISHED = "finished"
+CANCEL = "cancel"
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[tuple]:
+    """The next message, or None once the other end has closed the connection"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes is too large")
+
+    message = marshal.loads(await reader.readexactly(length))
+    if not isinstance(message, tuple) or not message:
+        raise ValueError("Malformed message")
+    return message
+
+
+def write_message(writer: asyncio.StreamWriter, *message: Any) -> None:
+    payload = marshal.dumps(message)
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
@@ -1,52 +1,533 @@
+import asyncio
+import os
 from pathlib import Path
+from typing import Optional
+from uuid import UUID
+
+from lab.core.tracing import tracer
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.pool import Allocation, ResourcePool
+from lab.instrument.service.registry import InstrumentRegistry
 from lab.project.model.plan import ExecutionPlan
 from lab.project.model.project import Experiment, Project
+from lab.runtime.admission import (
+    ReadyGroups,
+    Reservation,
+    Running,
+    admit,
+    next_slot,
+    release,
+)
 from lab.runtime.model.execution import ExecutionContext
 from lab.runtime.model.run import (
     ExperimentRun,
     ProjectRun,
     RunStatus,
 )
+from lab.runtime.persistence.artifacts import ArtifactStore
+from lab.runtime.persistence.workspace import Snapshot, WorkspaceProvisioner
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.metrics import ResourceSampler
+from lab.runtime.service.report import ReportServer
 from lab.runtime.service.run import RunService
+from lab.runtime.service.streams import StreamChannels
+from lab.settings import Settings
 
 
 class Runtime:
-    def __init__(self, run_service: RunService):
+    def __init__(
+        self,
+        run_service: RunService,
+        sampler: ResourceSampler,
+        registry: InstrumentRegistry,
+        calendar: ReservationCalendar,
+        reports: ReportServer,
+        artifacts: ArtifactStore,
+        streams: StreamChannels,
+        coordinator: Coordinator,
+        workspaces: WorkspaceProvisioner,
+        settings: Settings,
+    ):
         self._run_service = run_service
+        self._sampler = sampler
+        self._registry = registry
+        self._calendar = calendar
+        self._reports = reports
+        self._artifacts = artifacts
+        self._streams = streams
+        self._coordinator = coordinator
+        self._workspaces = workspaces
+        self._snapshots: dict[UUID, Snapshot] = {}  # by project run
+        self._aliases: dict[UUID, list[Experiment]] = {}
+        self._default_timeout = settings.experiment_timeout_seconds
+        self._running: dict[asyncio.Task, Running] = {}
+        self._active: dict[UUID, ProjectRun] = {}
+        self._cancelled = False
+
+    async def start(
+        self,
+        plan: ExecutionPlan,
+        jobs: Optional[int] = None,
+        source: Optional[Path] = None,
+    ) -> ProjectRun:
+        """Run a plan to the end, or until `cancel()` is called.
+
+        With a `source` directory (the project's), each experiment runs in its own
+        workspace staged from a snapshot of it; otherwise in the current directory.
+
+        A cancelled project run is returned with status CANCELLED. If the task
+        running this is cancelled instead, experiments are stopped and marked the
+        same way before the cancellation propagates.
+        """
+        (project_run,) = await self.start_all([(plan, source)], jobs=jobs)
+        if project_run.status == RunStatus.FAILED:
+            raise RuntimeError(project_run.error)
+        return project_run
 
-    async def start(self, plan: ExecutionPlan) -> ProjectRun:
-        project_run = ProjectRun(status=RunStatus.RUNNING, project=plan.project)
-        await self._run_service.project_run_started(project_run)
+    async def start_all(
+        self,
+        projects: list[tuple[ExecutionPlan, Optional[Path]]],
+        jobs: Optional[int] = None,
+    ) -> list[ProjectRun]:
+        """Run several plans at once, as `start` does one, sharing one pool.
 
+        Each plan has a project run of its own, which ends once its experiments
+        have; a failure stops only the project it happened in. A project whose
+        experiments could never get resources has its run marked FAILED.
+        """
+        sessions = []
+        for plan, source in projects:
+            project_run = ProjectRun(status=RunStatus.RUNNING, project=plan.project)
+            await self._run_service.project_run_started(project_run)
+            session = _Session(plan, project_run, source)
+            self._active[project_run.id] = project_run
+            if tracer.enabled:
+                _open_tracks(session)
+            sessions.append(session)
+
+        self._cancelled = False
+        self._aliases = {
+            id: aliases
+            for session in sessions
+            for id, aliases in session.plan.aliases.items()
+        }
+        pool = self._create_pool(jobs)
+        for session in sessions:
+            self._calendar.reserve_plan(session.plan)
         try:
-            for experiment in plan.ordered_experiments:
-                context = await self._create_execution_context(experiment)
-                experiment_run = ExperimentRun(
-                    experiment=experiment,
-                    context=context,
-                    status=RunStatus.RUNNING,
-                    project_run=project_run,
+            for session in sessions:
+                if session.source is None:
+                    continue
+                with tracer.span("snapshot", source=str(session.source)):
+                    snapshot = await asyncio.to_thread(
+                        self._workspaces.snapshot, session.source
+                    )
+                self._snapshots[session.project_run.id] = snapshot
+            for session in sessions:
+                await asyncio.to_thread(
+                    self._artifacts.track,
+                    session.project_run,
+                    session.source or Path.cwd(),
                 )
-                await self._run_service.experiment_run_started(experiment_run, context)
-
-                try:
-                    await experiment.execution_method.run(context)
-                    await self._run_service.experiment_run_completed(experiment_run)
-                except Exception as e:
-                    await self._run_service.experiment_run_failed(
-                        experiment_run, str(e)
+            async with self._reports.serve(), self._streams.serve():
+                await self._schedule(sessions, pool)
+            return [session.project_run for session in sessions]
+        except asyncio.CancelledError:
+            for session in sessions:
+                if not session.finished:
+                    await self._run_service.project_run_cancelled(session.project_run)
+            raise
+        except Exception as e:
+            for session in sessions:
+                if not session.finished:
+                    await self._run_service.project_run_failed(
+                        session.project_run, str(e)
                     )
+            raise
+        finally:
+            for session in sessions:
+                self._active.pop(session.project_run.id, None)
+                self._artifacts.untrack(session.project_run)
+                self._snapshots.pop(session.project_run.id, None)
+                self._workspaces.finish(session.project_run)
+
+    @property
+    def active(self) -> list[ProjectRun]:
+        """Project runs in progress"""
+        return list(self._active.values())
+
+    @property
+    def cancelling(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """
+        Stop the current project run: running experiments have their process groups
+        terminated and are marked cancelled, and nothing else is started.
+        """
+        self._cancelled = True
+        for task in self._running:
+            task.cancel()
+
+    def _create_pool(self, jobs: Optional[int]) -> ResourcePool:
+        """The local machine's resources, or those of the workers when distributed"""
+        if not self._coordinator.serving:
+            cpus = jobs or os.cpu_count() or 1
+            return ResourcePool(cpus=cpus, registry=self._registry)
+
+        if not self._coordinator.workers:
+            raise RuntimeError("No workers have registered with the coordinator")
+        return ResourcePool(
+            cpus=jobs or self._coordinator.total_cpus,
+            memory_bytes=self._coordinator.total_memory_bytes,
+            registry=self._registry,
+            max_cpus=self._coordinator.largest_cpus,
+            max_memory_bytes=self._coordinator.largest_memory_bytes,
+        )
 
+    async def _schedule(self, sessions: list["_Session"], pool: ResourcePool) -> None:
+        """
+        Runs experiments as soon as their dependencies have completed and the
+        resources they need are free. When more experiments are ready than can be
+        admitted, the one with the longest estimated critical path starts first.
+
+        Experiments joined by streamed references are scheduled as one group: they
+        start together once everything the group depends on has completed.
+
+        Experiments that need an exclusive instrument start in the slot booked for
+        them in the calendar, so the loop also wakes up when the next slot comes.
+
+        Each project's run is finished as soon as nothing more of it will run.
+        """
+        loop = asyncio.get_running_loop()
+        running = self._running = {}
+        owners: dict[asyncio.Task, _Session] = {}
+        try:
+            while True:
+                if not self._cancelled:
+                    self._admit(sessions, pool, running, owners, loop.time())
+
+                slots = []
+                for session in sessions:
+                    if session.finished or session.running:
+                        continue
+                    queue = session.groups.queue
+                    if queue and not (session.stopping or self._cancelled):
+                        slot = next_slot(queue, self._calendar)
+                        if slot is not None:
+                            slots.append(slot)
+                            continue  # booked to start later
+                        if running:
+                            continue  # other projects hold what it's waiting for
+                        names = ", ".join(exp.name for item in queue for exp in item[2])
+                        session.error = f"Resources never became free for: {names}"
+                    await self._finish(session)
+
+                if not running and not slots:
+                    break
+
+                timeout = (
+                    max((min(slots) - self._calendar.now()).total_seconds(), 0.0)
+                    if slots
+                    else None
+                )
+                if not running:
+                    await asyncio.sleep(timeout or 0.0)
+                    continue
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    run = running.pop(task)
+                    session = owners.pop(task)
+                    session.ended(run)
+                    experiment = run.experiment
+                    # Cancelled before it got as far as running anything
+                    error = (
+                        RuntimeError(f"Experiment '{experiment.name}' was cancelled")
+                        if task.cancelled()
+                        else task.result()
+                    )
+                    ready = session.groups.finished(
+                        experiment, failed=error is not None
+                    )
+                    for group in ready:
+                        for exp in group:
+                            tracer.transition(exp.id.hex, "queued")
                     # Let orchestrator decide how to handle failure
                     # @todo: design error handling for the runtime...
-                    if not self._should_continue(experiment, plan.project, e):
-                        break
+                    if error is not None and not self._should_continue(
+                        experiment, session.plan.project, error
+                    ):
+                        session.stopping = True
+        finally:
+            # Wait for cancelled experiments, so their processes are gone on return
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.wait(running)
+            running.clear()
+
+    def _admit(
+        self,
+        sessions: list["_Session"],
+        pool: ResourcePool,
+        running: dict[asyncio.Task, Running],
+        owners: dict[asyncio.Task, "_Session"],
+        now: float,
+    ) -> None:
+        """
+        Start what can start now. While several projects have experiments ready,
+        they take turns a group at a time, the one using the fewest CPUs first, so
+        each gets a fair share of the pool. A group that doesn't fit keeps its
+        reservation against the other projects' groups too.
+        """
+        reservation = Reservation()
+        while True:
+            waiting = [
+                s for s in sessions if s.groups.queue and not (s.stopping or s.finished)
+            ]
+            limit = 1 if len(waiting) > 1 else None
+            for session in sorted(waiting, key=lambda s: s.cpus):
+                admitted = admit(
+                    session.plan,
+                    pool,
+                    session.groups.queue,
+                    running.values(),
+                    now,
+                    reservation,
+                    limit,
+                    self._calendar,
+                )
+                for runs in admitted:
+                    self._launch(session, runs, pool, running, owners)
+                if admitted:
+                    break
+            else:
+                return
+            if limit is None:
+                return
+
+    def _launch(
+        self,
+        session: "_Session",
+        runs: list[Running],
+        pool: ResourcePool,
+        running: dict[asyncio.Task, Running],
+        owners: dict[asyncio.Task, "_Session"],
+    ) -> None:
+        if len(runs) > 1:
+            self._streams.open((run.experiment for run in runs), session.plan.project)
+        for run in runs:
+            task = asyncio.create_task(
+                self._run_experiment(
+                    run.experiment,
+                    session.project_run,
+                    pool,
+                    run.allocation,
+                    run.refusal,
+                )
+            )
+            running[task] = run
+            owners[task] = session
+            session.started(run)
+            tracer.transition(run.experiment.id.hex, "running")
+
+    async def _finish(self, session: "_Session") -> None:
+        session.finished = True
+        for exp in session.plan.ordered_experiments:
+            booking = self._calendar.booking(exp.id)
+            if booking is not None:
+                self._calendar.cancel(booking)  # never started
+        self._snapshots.pop(session.project_run.id, None)
+        if tracer.enabled:
+            _close_tracks(session)
+        if self._cancelled:
+            await self._run_service.project_run_cancelled(session.project_run)
+        elif session.error is not None:
+            await self._run_service.project_run_failed(
+                session.project_run, session.error
+            )
+        else:
+            await self._run_service.project_run_completed(session.project_run)
 
-            await self._run_service.project_run_completed(project_run)
-            return project_run
+    async def _run_experiment(
+        self,
+        experiment: Experiment,
+        project_run: ProjectRun,
+        pool: ResourcePool,
+        allocation: Optional[Allocation],
+        refusal: Optional[str] = None,
+    ) -> Optional[Exception]:
+        """Runs a single experiment, returning the error if it failed.
+
+        Experiments the plan merged into it get runs of their own, with its outcome.
+        """
+        tracer.enter_track(experiment.id.hex)
+        error = await self._execute_experiment(
+            experiment, project_run, pool, allocation, refusal
+        )
+        if experiment.id in self._aliases:
+            await self._record_aliases(experiment, project_run)
+        tracer.close_track(experiment.id.hex, experiment.name)
+        return error
+
+    async def _execute_experiment(
+        self,
+        experiment: Experiment,
+        project_run: ProjectRun,
+        pool: ResourcePool,
+        allocation: Optional[Allocation],
+        refusal: Optional[str],
+    ) -> Optional[Exception]:
+        context = await self._create_execution_context(experiment)
+        experiment_run = ExperimentRun(
+            experiment=experiment,
+            context=context,
+            status=RunStatus.RUNNING,
+            project_run=project_run,
+        )
+        await self._run_service.experiment_run_started(experiment_run, context)
+
+        if allocation is None:
+            error = RuntimeError(refusal)
+            await self._run_service.experiment_run_failed(experiment_run, str(error))
+            return error
+
+        # Bind referenced upstream outputs to this experiment's parameters
+        project = project_run.project
+        inputs = self._artifacts.resolve(experiment, project_run)
+        streamed = self._streams.inputs(experiment, project)
+        inputs.update(streamed)
+
+        context.resource_claims = allocation.claims
+        context.env_vars.update(self._artifacts.environment(experiment_run, inputs))
+        streaming = self._streams.environment(experiment, project)
+        context.env_vars.update(streaming)
+        context.env_vars.update(self._reports.attach(experiment_run))
+        self._sampler.track(context)
+        # Streams are local pipes, so their experiments stay on this machine
+        remote = self._coordinator.serving and not (streamed or streaming)
+        snapshot = None if remote else self._snapshots.get(project_run.id)
+        execution: Optional[asyncio.Future] = None
+        try:
+            if snapshot is not None:
+                with tracer.span("stage workspace"):
+                    context.working_dir = await asyncio.to_thread(
+                        self._workspaces.provision, snapshot, experiment_run
+                    )
+            execution = asyncio.ensure_future(
+                self._coordinator.execute(experiment, context)
+                if remote
+                else experiment.execution_method.run(context)
+            )
+            # Reports can't reach back from workers; their leases cover liveness
+            await self._supervise(execution, experiment_run, heartbeats=not remote)
+            tracer.transition(experiment.id.hex, "persisting")
+        except asyncio.CancelledError:
+            tracer.transition(experiment.id.hex, "persisting")
+            if execution is not None:
+                await _stop(execution)
+            await self._reports.detach(experiment_run)
+            metrics = self._sampler.finish(context)
+            await self._run_service.experiment_run_cancelled(
+                experiment_run, "Cancelled", metrics=[metrics]
+            )
+            return RuntimeError(f"Experiment '{experiment.name}' was cancelled")
         except Exception as e:
-            await self._run_service.project_run_failed(project_run, str(e))
-            raise
+            tracer.transition(experiment.id.hex, "persisting")
+            await self._reports.detach(experiment_run)
+            metrics = self._sampler.finish(context)
+            await self._run_service.experiment_run_failed(
+                experiment_run, str(e), metrics=[metrics]
+            )
+            return e
+        finally:
+            release(pool, allocation, self._calendar)
+            self._streams.release(experiment, project)
+            if snapshot is not None:
+                # Only a run that succeeded is still RUNNING at this point
+                await asyncio.to_thread(
+                    self._workspaces.release,
+                    experiment_run,
+                    failed=experiment_run.status != RunStatus.RUNNING,
+                )
+
+        await self._reports.detach(experiment_run)
+        self._artifacts.completed(experiment_run)
+        metrics = self._sampler.finish(context)
+        await self._run_service.experiment_run_completed(
+            experiment_run, metrics=[metrics]
+        )
+        return None
+
+    async def _record_aliases(
+        self, experiment: Experiment, project_run: ProjectRun
+    ) -> None:
+        run = next(
+            r
+            for r in reversed(project_run.experiment_runs)
+            if r.experiment.id == experiment.id
+        )
+        for alias in self._aliases[experiment.id]:
+            alias_run = ExperimentRun(
+                experiment=alias,
+                context=run.context,
+                status=RunStatus.RUNNING,
+                project_run=project_run,
+                started_at=run.started_at,
+                scalars=dict(run.scalars),
+                outputs=dict(run.outputs),
+            )
+            await self._run_service.experiment_run_started(alias_run, run.context)
+            if run.status == RunStatus.COMPLETED:
+                await self._run_service.experiment_run_completed(
+                    alias_run, metrics=run.metrics
+                )
+            elif run.status == RunStatus.CANCELLED:
+                await self._run_service.experiment_run_cancelled(
+                    alias_run, run.error or "Cancelled", metrics=run.metrics
+                )
+            else:
+                await self._run_service.experiment_run_failed(
+                    alias_run, run.error or "Failed", metrics=run.metrics
+                )
+
+    async def _supervise(
+        self, execution: asyncio.Future, run: ExperimentRun, heartbeats: bool
+    ) -> None:
+        """
+        Wait for an experiment's execution, stopping it with a TimeoutError once it
+        has run longer than its timeout, or (with heartbeats) gone longer than its
+        heartbeat interval without reporting anything.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        timeout = run.experiment.timeout_seconds or self._default_timeout
+        heartbeat = run.experiment.heartbeat_seconds if heartbeats else None
+
+        while not execution.done():
+            deadlines = []
+            if timeout is not None:
+                deadlines.append((started + timeout, f"Timed out after {timeout:g}s"))
+            if heartbeat is not None:
+                last = self._reports.last_report(run) or started
+                deadlines.append(
+                    (last + heartbeat, f"No heartbeat for {heartbeat:g}s, so it hung")
+                )
+            if not deadlines:
+                await asyncio.wait([execution])
+                break
+
+            deadline, reason = min(deadlines)
+            if deadline > loop.time():
+                await asyncio.wait([execution], timeout=deadline - loop.time())
+                continue
+
+            await _stop(execution)
+            raise TimeoutError(reason)
+
+        execution.result()
 
     def _should_continue(
         self, failed_experiment: Experiment, project: Project, _: Exception
@@ -56,9 +537,7 @@ class Runtime:
         Returns True if execution should continue, False if it should stop.
         """
         # Get experiments that depend on the failed one
-        dependent_experiments = {
-            exp for exp in project.experiments if failed_experiment in exp.dependencies
-        }
+        dependent_experiments = project.dependents_of(failed_experiment)
 
         # If other experiments depend on this one, we should stop
         if dependent_experiments:
@@ -72,10 +551,62 @@ class Runtime:
     ) -> ExecutionContext:
         # Create context with experiment-specific configuration
         context = ExecutionContext(
-            working_dir=Path(f"experiments/{experiment.id}"),
+            working_dir=Path.cwd(),  # until a workspace is staged for it
             env_vars={
                 "EXPERIMENT_ID": str(experiment.id),
                 "EXPERIMENT_NAME": experiment.name,
             },
         )
         return context
+
+
+### PRIVATE #######################
+
+
+class _Session:
+    """A project being run, sharing the pool with any others run alongside it"""
+
+    def __init__(
+        self, plan: ExecutionPlan, project_run: ProjectRun, source: Optional[Path]
+    ):
+        self.plan = plan
+        self.project_run = project_run
+        self.source = source
+        self.groups = ReadyGroups(plan)
+        self.running = 0
+        self.cpus = 0  # held by its running experiments
+        self.stopping = False  # after a failure that its other experiments need
+        self.finished = False
+        self.error: Optional[str] = None
+
+    def started(self, run: Running) -> None:
+        self.running += 1
+        if run.allocation is not None:
+            self.cpus += run.allocation.cpus
+
+    def ended(self, run: Running) -> None:
+        self.running -= 1
+        if run.allocation is not None:
+            self.cpus -= run.allocation.cpus
+
+
+def _open_tracks(session: _Session) -> None:
+    """Trace experiments from the start: waiting on dependencies, or queued"""
+    queued = {exp for item in session.groups.queue for exp in item[2]}
+    for exp in session.plan.ordered_experiments:
+        tracer.open_track(exp.id.hex, exp.name)
+        tracer.transition(exp.id.hex, "queued" if exp in queued else "waiting")
+
+
+def _close_tracks(session: _Session) -> None:
+    """End the traces of experiments that never started"""
+    started = {run.experiment.id for run in session.project_run.experiment_runs}
+    for exp in session.plan.ordered_experiments:
+        if exp.id not in started:
+            tracer.close_track(exp.id.hex, exp.name)
+
+
+async def _stop(execution: asyncio.Future) -> None:
+    """Cancel an execution and wait until it has cleaned up (its process is gone)"""
+    execution.cancel()
+    await asyncio.wait([execution])
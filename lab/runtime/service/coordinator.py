@@ -0,0 +1,454 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID, uuid4
+
+from lab.instrument.model.instrument import Instrument, InstrumentRequirements
+from lab.instrument.service.pool import DEFAULT_REQUIREMENTS
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.project import Experiment
+from lab.project.persistence.codec import encode_execution_method
+from lab.runtime.model.execution import ExecutionContext, ExecutionMetrics
+from lab.runtime.protocol import (
+    ASSIGN,
+    CANCEL,
+    CREDIT,
+    FINISHED,
+    HEARTBEAT,
+    REGISTER,
+    REGISTERED,
+    STARTED,
+    read_message,
+    write_message,
+)
+from lab.sdk.client import RUN_ID_ENV, SOCKET_ENV
+from lab.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# The report socket is local to the coordinator, so it isn't passed on
+_LOCAL_ENV = (SOCKET_ENV, RUN_ID_ENV)
+
+
+class _Task:
+    """An experiment waiting for, or leased to, a worker"""
+
+    def __init__(
+        self,
+        experiment: Experiment,
+        context: ExecutionContext,
+        requirements: InstrumentRequirements,
+        pinned: Optional[str],
+        hints: set[str],
+        queued_at: float,
+    ):
+        self.experiment = experiment
+        self.context = context
+        self.requirements = requirements
+        self.pinned = pinned  # the worker holding its claimed instruments
+        self.hints = hints  # workers that ran its upstream experiments
+        self.queued_at = queued_at
+        self.future: asyncio.Future[list[dict[str, Any]]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self.attempts = 0
+        self.lease_id: Optional[str] = None
+        self.expires_at = 0.0
+
+
+class _Worker:
+    """A connected worker and the leases it holds"""
+
+    def __init__(
+        self,
+        name: str,
+        writer: asyncio.StreamWriter,
+        cpus: int,
+        memory_bytes: int,
+        instruments: list[Instrument],
+        now: float,
+    ):
+        self.id = uuid4().hex
+        self.name = name
+        self.writer = writer
+        self.cpus = cpus
+        self.memory_bytes = memory_bytes
+        self.instruments = instruments
+        self.last_seen = now
+        self.leases: dict[str, _Task] = {}
+
+    @property
+    def free_cpus(self) -> int:
+        return self.cpus - sum(t.requirements.cpus for t in self.leases.values())
+
+    @property
+    def free_memory_bytes(self) -> int:
+        return self.memory_bytes - sum(
+            t.requirements.memory_bytes for t in self.leases.values()
+        )
+
+    def fits(self, task: _Task) -> bool:
+        return (
+            task.requirements.cpus <= self.free_cpus
+            and task.requirements.memory_bytes <= self.free_memory_bytes
+        )
+
+    def could_fit(self, task: _Task) -> bool:
+        """Whether the task would fit once the worker is idle"""
+        return (
+            task.requirements.cpus <= self.cpus
+            and task.requirements.memory_bytes <= self.memory_bytes
+        )
+
+
+class Coordinator:
+    """Hands experiments to worker agents, possibly on other machines.
+
+    Workers connect over TCP and advertise their CPUs, memory and instruments. The
+    instruments are added to the registry, so the runtime's resource pool admits
+    experiments that need them, and an experiment holding a worker's instrument runs
+    on that worker. Others go to the worker that ran their upstream experiments, if
+    it frees up within `coordinator_locality_wait_seconds`, since their inputs are
+    likely still in its page cache.
+
+    Each assignment is a lease, renewed by the worker's heartbeats. When a lease
+    expires or its worker disconnects, the experiment is queued again, up to
+    `coordinator_max_attempts` times.
+    """
+
+    def __init__(self, registry: InstrumentRegistry, settings: Settings):
+        self._registry = registry
+        self._heartbeat_seconds = settings.coordinator_heartbeat_seconds
+        self._lease_seconds = settings.coordinator_lease_seconds
+        self._locality_wait_seconds = settings.coordinator_locality_wait_seconds
+        self._max_attempts = settings.coordinator_max_attempts
+        self._server: Optional[asyncio.Server] = None
+        self._workers: dict[str, _Worker] = {}
+        self._owners: dict[UUID, _Worker] = {}  # instrument → worker
+        self._locations: dict[UUID, str] = {}  # experiment → worker that last ran it
+        self._queue: list[_Task] = []
+        self._registered = asyncio.Event()
+        self._retry: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def serving(self) -> bool:
+        return self._server is not None
+
+    @property
+    def workers(self) -> list[str]:
+        return [worker.name for worker in self._workers.values()]
+
+    @property
+    def total_cpus(self) -> int:
+        return sum(worker.cpus for worker in self._workers.values())
+
+    @property
+    def total_memory_bytes(self) -> int:
+        return sum(worker.memory_bytes for worker in self._workers.values())
+
+    @property
+    def largest_cpus(self) -> int:
+        return max((worker.cpus for worker in self._workers.values()), default=0)
+
+    @property
+    def largest_memory_bytes(self) -> int:
+        return max(
+            (worker.memory_bytes for worker in self._workers.values()), default=0
+        )
+
+    @asynccontextmanager
+    async def serve(self, host: str, port: int) -> AsyncIterator[tuple[str, int]]:
+        """Accept workers until the block exits, yielding the address listened on"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            yield self._server.sockets[0].getsockname()[:2]
+        finally:
+            monitor.cancel()
+            for worker in list(self._workers.values()):
+                self._lost(worker, "the coordinator stopped")
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def wait_for_workers(
+        self, count: int, timeout: Optional[float] = None
+    ) -> None:
+        async def registered() -> None:
+            while len(self._workers) < count:
+                self._registered.clear()
+                await self._registered.wait()
+
+        try:
+            await asyncio.wait_for(registered(), timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                f"Only {len(self._workers)} of {count} workers registered"
+            ) from None
+
+    async def execute(self, experiment: Experiment, context: ExecutionContext) -> None:
+        """Run an experiment on a worker, as its execution method would locally"""
+        owners = {
+            self._owners[claim.instrument.id].id
+            for claim in context.resource_claims
+            if claim.instrument.id in self._owners
+        }
+        if len(owners) > 1:
+            raise RuntimeError(
+                f"Experiment '{experiment.name}' needs instruments on different workers"
+            )
+
+        task = _Task(
+            experiment,
+            context,
+            experiment.requirements or DEFAULT_REQUIREMENTS,
+            pinned=next(iter(owners), None),
+            hints={
+                self._locations[dep.id]
+                for dep in experiment.dependencies
+                if dep.id in self._locations
+            },
+            queued_at=asyncio.get_running_loop().time(),
+        )
+        self._queue.append(task)
+        self._dispatch()
+        try:
+            metrics = await task.future
+        except asyncio.CancelledError:
+            self._abandon(task)
+            raise
+
+        context.metrics.extend(ExecutionMetrics.model_validate(m) for m in metrics)
+
+    ### PRIVATE #######################
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        worker: Optional[_Worker] = None
+        try:
+            message = await read_message(reader)
+            if message is None or message[0] != REGISTER:
+                return
+
+            _, name, cpus, memory_bytes, instruments = message
+            worker = _Worker(
+                name,
+                writer,
+                cpus,
+                memory_bytes,
+                [Instrument.model_validate(i) for i in instruments],
+                loop.time(),
+            )
+            self._register(worker)
+            write_message(
+                writer,
+                REGISTERED,
+                worker.id,
+                self._heartbeat_seconds,
+                self._lease_seconds,
+            )
+            self._dispatch()
+
+            while (message := await read_message(reader)) is not None:
+                worker.last_seen = loop.time()
+                self._receive(worker, message)
+        except (asyncio.IncompleteReadError, ConnectionError, EOFError) as e:
+            logger.warning(f"Lost connection to worker: {e}")
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Dropped worker sending malformed messages: {e}")
+        finally:
+            if worker is not None:
+                self._lost(worker, "its connection closed")
+            writer.close()
+
+    def _register(self, worker: _Worker) -> None:
+        self._workers[worker.id] = worker
+        for instrument in worker.instruments:
+            self._registry.register(instrument)
+            self._owners[instrument.id] = worker
+        self._registered.set()
+        logger.info(
+            f"Worker '{worker.name}' registered with {worker.cpus} CPUs and "
+            f"{len(worker.instruments)} instruments"
+        )
+
+    def _receive(self, worker: _Worker, message: tuple) -> None:
+        kind = message[0]
+        if kind == HEARTBEAT:
+            expires_at = worker.last_seen + self._lease_seconds
+            for lease_id in message[1]:
+                if lease_id in worker.leases:
+                    worker.leases[lease_id].expires_at = expires_at
+        elif kind == CREDIT:
+            worker.cpus, worker.memory_bytes = message[1], message[2]
+            self._dispatch()
+        elif kind == STARTED:
+            task = worker.leases.get(message[1])
+            if task is not None:
+                logger.debug(f"'{task.experiment.name}' started on '{worker.name}'")
+        elif kind == FINISHED:
+            _, lease_id, error, metrics = message
+            # A lease that has expired may since have been given to another worker
+            task = worker.leases.pop(lease_id, None)
+            if task is not None and not task.future.done():
+                if error is None:
+                    self._locations[task.experiment.id] = worker.id
+                    task.future.set_result(metrics)
+                else:
+                    task.future.set_exception(RuntimeError(error))
+            self._dispatch()
+        else:
+            raise ValueError(f"Unknown message {kind!r}")
+
+    def _dispatch(self) -> None:
+        """Lease queued experiments to workers with room for them, oldest first"""
+        now = asyncio.get_running_loop().time()
+        retry_at: Optional[float] = None
+        for task in list(self._queue):
+            if task.pinned is not None and task.pinned not in self._workers:
+                self._queue.remove(task)
+                task.future.set_exception(
+                    RuntimeError(
+                        f"Experiment '{task.experiment.name}' holds instruments of a "
+                        "worker that has left"
+                    )
+                )
+                continue
+
+            if not self._workers and now - task.queued_at > self._lease_seconds:
+                self._queue.remove(task)
+                task.future.set_exception(
+                    RuntimeError(
+                        f"Experiment '{task.experiment.name}' can't run: "
+                        "no workers are connected"
+                    )
+                )
+                continue
+
+            eligible = [
+                worker
+                for worker in self._workers.values()
+                if task.pinned in (None, worker.id)
+            ]
+            if eligible and not any(worker.could_fit(task) for worker in eligible):
+                # The workers that could have run it have left
+                self._queue.remove(task)
+                task.future.set_exception(
+                    RuntimeError(
+                        f"Experiment '{task.experiment.name}' needs more CPUs or "
+                        "memory than any connected worker has"
+                    )
+                )
+                continue
+
+            candidates = [worker for worker in eligible if worker.fits(task)]
+            if not candidates:
+                continue
+
+            local = [worker for worker in candidates if worker.id in task.hints]
+            if local:
+                self._assign(task, local[0], now)
+                continue
+
+            deadline = task.queued_at + self._locality_wait_seconds
+            if now < deadline and task.hints & self._workers.keys():
+                # Worth waiting briefly for a worker that already has the inputs
+                retry_at = deadline if retry_at is None else min(retry_at, deadline)
+                continue
+
+            self._assign(task, max(candidates, key=lambda w: w.free_cpus), now)
+
+        if retry_at is not None and self._retry is None:
+            self._retry = asyncio.get_running_loop().call_at(retry_at, self._retried)
+
+    def _retried(self) -> None:
+        self._retry = None
+        self._dispatch()
+
+    def _assign(self, task: _Task, worker: _Worker, now: float) -> None:
+        self._queue.remove(task)
+        task.attempts += 1
+        task.lease_id = uuid4().hex
+        task.expires_at = now + self._lease_seconds
+        worker.leases[task.lease_id] = task
+
+        method, fields = encode_execution_method(task.experiment)
+        env = {
+            name: value
+            for name, value in task.context.env_vars.items()
+            if name not in _LOCAL_ENV
+        }
+        write_message(
+            worker.writer,
+            ASSIGN,
+            task.lease_id,
+            method,
+            fields,
+            env,
+            str(task.context.working_dir),
+        )
+
+    def _abandon(self, task: _Task) -> None:
+        if task in self._queue:
+            self._queue.remove(task)
+            return
+
+        for worker in self._workers.values():
+            if worker.leases.pop(task.lease_id or "", None) is task:
+                write_message(worker.writer, CANCEL, task.lease_id)
+                self._dispatch()
+                return
+
+    def _requeue(self, task: _Task, reason: str) -> None:
+        if task.future.done():
+            return
+
+        name = task.experiment.name
+        if task.attempts >= self._max_attempts:
+            task.future.set_exception(
+                RuntimeError(
+                    f"Experiment '{name}' was lost {task.attempts} times, "
+                    f"most recently because {reason}"
+                )
+            )
+            return
+
+        logger.warning(f"Requeueing '{name}' because {reason}")
+        task.queued_at = asyncio.get_running_loop().time()
+        self._queue.insert(0, task)  # it has been waiting the longest
+
+    def _lost(self, worker: _Worker, reason: str) -> None:
+        if self._workers.pop(worker.id, None) is None:
+            return
+
+        logger.warning(f"Worker '{worker.name}' left because {reason}")
+        for instrument in worker.instruments:
+            self._registry.unregister(instrument.id)
+            self._owners.pop(instrument.id, None)
+        worker.writer.close()
+
+        leases, worker.leases = worker.leases, {}
+        for task in leases.values():
+            self._requeue(task, f"worker '{worker.name}' left")
+        self._dispatch()
+
+    async def _monitor(self) -> None:
+        """Expire leases that haven't been renewed, and workers gone silent"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._heartbeat_seconds)
+            now = loop.time()
+            for worker in list(self._workers.values()):
+                if now - worker.last_seen > self._lease_seconds:
+                    self._lost(worker, "it stopped sending heartbeats")
+                    continue
+
+                for lease_id, task in list(worker.leases.items()):
+                    if task.expires_at < now:
+                        del worker.leases[lease_id]
+                        write_message(worker.writer, CANCEL, lease_id)
+                        self._requeue(task, f"its lease on '{worker.name}' expired")
+            self._dispatch()
@@ -0,0 +1,389 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import polars as pl
+
+from lab.core.model import Model
+from lab.runtime.model.run import ProjectRun
+from lab.runtime.persistence.artifacts import FINGERPRINTS
+from lab.runtime.persistence.metrics import RUNS, MetricsStore
+from lab.runtime.persistence.usage import UsageEntry, UsageIndex
+from lab.runtime.persistence.workspace import ContentStore
+from lab.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS = "artifacts"
+WORKSPACE = "workspace"
+OBJECT = "object"  # a file in the content store
+
+
+class CollectionReport(Model):
+    total_bytes: int  # before collecting
+    budget_bytes: Optional[int]
+    freed_bytes: dict[str, int]  # per kind
+    evicted: dict[str, int]  # entries per kind
+    dry_run: bool = False
+
+    @property
+    def freed(self) -> int:
+        return sum(self.freed_bytes.values())
+
+    @property
+    def remaining_bytes(self) -> int:
+        return self.total_bytes - self.freed
+
+
+class GarbageCollector:
+    """Keeps run outputs, retained workspaces and stored files under a disk budget.
+
+    Entries are evicted least recently used first. Never evicted: the outputs and
+    workspaces of project runs still in progress, of the `gc_keep_runs` most
+    recent project runs and of pinned ones, stored files that a project's latest
+    snapshot refers to, and anything used in the last `gc_grace_seconds`.
+
+    Sizes come from a persistent index, which also keeps the mtime of every
+    directory in an entry. Each collection stats those directories, lists only the
+    ones (and the store shards) whose mtime changed, and measures an entry again
+    only when one of its directories changed. Files added or removed anywhere
+    below an entry are noticed that way without statting every file.
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsStore, store: ContentStore):
+        self._artifacts = settings.artifacts_dir
+        self._workspaces = settings.workspaces_dir
+        self._objects = settings.store_dir / "objects"
+        self._budget = settings.gc_budget_bytes
+        self._keep_runs = settings.gc_keep_runs
+        self._grace_seconds = settings.gc_grace_seconds
+        self._index = UsageIndex(settings.data_dir / "usage.sqlite")
+        self._metrics = metrics
+        self._store = store
+        self._collecting = threading.Lock()
+
+    def pin(self, project_run_id: str) -> None:
+        """Keep everything a project run produced, whatever the budget"""
+        self._index.pin(project_run_id)
+
+    def unpin(self, project_run_id: str) -> None:
+        self._index.unpin(project_run_id)
+
+    def collect(
+        self,
+        budget_bytes: Optional[int] = None,
+        dry_run: bool = False,
+        active: Iterable[ProjectRun] = (),
+    ) -> CollectionReport:
+        """Evict entries until what's left fits the budget (or nothing more can go).
+
+        The `active` project runs are still in progress: their runs may not be
+        recorded yet, so they are given here.
+        """
+        budget = budget_bytes if budget_bytes is not None else self._budget
+        with self._collecting:
+            runs = self._runs()
+            active_ids = set()
+            owners = dict(zip(runs["run_id"], runs["project_run_id"]))
+            for project_run in active:
+                active_ids.add(str(project_run.id))
+                for run in project_run.experiment_runs:
+                    owners[str(run.id)] = str(project_run.id)
+            entries = self._refresh(owners)
+            total = sum(entry.size for entry in entries)
+            report = CollectionReport(
+                total_bytes=total,
+                budget_bytes=budget,
+                freed_bytes={},
+                evicted={},
+                dry_run=dry_run,
+            )
+            if budget is None or total <= budget:
+                return report
+
+            evictable = self._evictable(entries, runs, active_ids)
+            evicted = []
+            for entry in sorted(evictable, key=lambda e: e.used):
+                if total <= budget:
+                    break
+                if entry.kind == OBJECT and os.lstat(entry.path).st_nlink > 1:
+                    continue  # still linked from a workspace, so nothing is freed
+                if not dry_run:
+                    self._evict(entry)
+                total -= entry.size
+                evicted.append(entry)
+                report.freed_bytes[entry.kind] = (
+                    report.freed_bytes.get(entry.kind, 0) + entry.size
+                )
+                report.evicted[entry.kind] = report.evicted.get(entry.kind, 0) + 1
+
+            if not dry_run:
+                self._index.remove(entry.path for entry in evicted)
+                self._unlink_fingerprints(
+                    {entry.path for entry in evicted if entry.kind == ARTIFACTS}
+                )
+            return report
+
+    async def run_periodically(
+        self,
+        interval_seconds: float,
+        active: Callable[[], Iterable[ProjectRun]] = tuple,
+    ) -> None:
+        """Collect in a thread every `interval_seconds`, until cancelled.
+
+        `active` gives the project runs in progress at the time of each collection.
+        """
+        while True:
+            # Copied here, since the runtime adds runs to them as they start
+            project_runs = [
+                p.model_copy(update={"experiment_runs": list(p.experiment_runs)})
+                for p in active()
+            ]
+            report = await asyncio.to_thread(self.collect, active=project_runs)
+            if report.evicted:
+                logger.info(
+                    f"Collected {report.freed} bytes from "
+                    f"{sum(report.evicted.values())} entries"
+                )
+            await asyncio.sleep(interval_seconds)
+
+    ### PRIVATE #######################
+
+    def _runs(self) -> pl.DataFrame:
+        """Each recorded experiment run, with its project run"""
+        return (
+            self._metrics.scan(RUNS)
+            .select("run_id", "project_run_id", "started_at")
+            .collect()
+        )
+
+    def _refresh(self, owners: dict[str, str]) -> list[UsageEntry]:
+        """Bring the index up to date with what's on disk, returning all entries.
+
+        `owners` maps experiment runs to their project runs.
+        """
+        tree = _Tree(self._index.directories())
+        artifacts = self._refresh_directories(
+            ARTIFACTS,
+            [d for d in _children(self._artifacts) if d.name != FINGERPRINTS],
+            lambda directory: owners.get(directory.name),
+            tree,
+        )
+        workspaces = self._refresh_directories(
+            WORKSPACE,
+            [
+                directory
+                for project_run in _children(self._workspaces)
+                for directory in _children(project_run)
+            ],
+            lambda directory: directory.parent.name,
+            tree,
+        )
+        self._index.save_directories(tree.changed())
+        self._index.forget_directories(
+            tree.gone(str(self._artifacts), str(self._workspaces))
+        )
+        return [*artifacts, *workspaces, *self._refresh_objects()]
+
+    def _refresh_directories(
+        self,
+        kind: str,
+        directories: list[Path],
+        owner: Callable[[Path], Optional[str]],
+        tree: "_Tree",
+    ) -> list[UsageEntry]:
+        known = self._index.entries(kind)
+        entries, changed = [], []
+        for directory in directories:
+            path = str(directory)
+            mtime_ns = tree.newest_mtime_ns(path)
+            entry = known.pop(path, None)
+            if entry is None or entry.mtime_ns != mtime_ns:
+                entry = UsageEntry(
+                    path=path,
+                    kind=kind,
+                    size=_unshared_bytes(directory),
+                    used=mtime_ns / 1e9,
+                    mtime_ns=mtime_ns,
+                    owner=owner(directory),
+                )
+                changed.append(entry)
+            elif entry.owner is None and (found := owner(directory)):
+                entry.owner = found
+                changed.append(entry)
+            entries.append(entry)
+
+        self._index.save(changed)
+        self._index.remove(known)  # no longer on disk
+        return entries
+
+    def _refresh_objects(self) -> list[UsageEntry]:
+        """Stored files, listing only the shards whose contents changed"""
+        known = self._index.entries(OBJECT)
+        by_shard: dict[str, list[UsageEntry]] = {}
+        for entry in known.values():
+            by_shard.setdefault(os.path.dirname(entry.path), []).append(entry)
+
+        entries = []
+        for shard in _children(self._objects):
+            path = str(shard)
+            mtime_ns = shard.stat().st_mtime_ns
+            if self._index.directory_mtime(path) == mtime_ns:
+                entries.extend(by_shard.pop(path, []))
+                continue
+
+            listed = []
+            with os.scandir(shard) as files:
+                for file in files:
+                    if file.name.startswith("."):
+                        continue  # still being written
+                    info = file.stat(follow_symlinks=False)
+                    listed.append(
+                        UsageEntry(
+                            path=file.path,
+                            kind=OBJECT,
+                            size=info.st_blocks * 512,
+                            used=info.st_mtime,
+                            mtime_ns=info.st_mtime_ns,
+                        )
+                    )
+            stale = {entry.path for entry in by_shard.pop(path, [])}
+            self._index.remove(stale - {entry.path for entry in listed})
+            self._index.save(listed)
+            self._index.listed(path, mtime_ns)
+            entries.extend(listed)
+
+        # Shards that no longer exist
+        self._index.remove(entry.path for rest in by_shard.values() for entry in rest)
+        return entries
+
+    def _evictable(
+        self, entries: list[UsageEntry], runs: pl.DataFrame, active: set[str]
+    ) -> list[UsageEntry]:
+        recent = set(
+            runs.group_by("project_run_id")
+            .agg(pl.col("started_at").max())
+            .sort("started_at", descending=True)
+            .head(self._keep_runs)["project_run_id"]
+        )
+        protected = recent | active | self._index.pins()
+        referenced = self._store.referenced()
+        cutoff = time.time() - self._grace_seconds
+        return [
+            entry
+            for entry in entries
+            if entry.used < cutoff
+            and entry.owner not in protected
+            and entry.path not in referenced
+        ]
+
+    def _evict(self, entry: UsageEntry) -> None:
+        if entry.kind == OBJECT:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            return
+
+        shutil.rmtree(entry.path, ignore_errors=True)
+        if entry.kind == WORKSPACE:
+            try:
+                os.rmdir(os.path.dirname(entry.path))  # the project run's, once empty
+            except OSError:
+                pass
+
+    def _unlink_fingerprints(self, evicted: set[str]) -> None:
+        """Remove links to evicted outputs, so they aren't mistaken for reusable"""
+        if not evicted:
+            return
+        for link in _children(self._artifacts / FINGERPRINTS, directories=False):
+            try:
+                if os.readlink(link) in evicted:
+                    link.unlink()
+            except OSError:
+                pass
+
+
+def _children(directory: Path, directories: bool = True) -> list[Path]:
+    try:
+        with os.scandir(directory) as entries:
+            return [
+                Path(entry.path)
+                for entry in entries
+                if entry.is_dir(follow_symlinks=False) == directories
+            ]
+    except FileNotFoundError:
+        return []
+
+
+class _Tree:
+    """Directories below the entries, as listed in earlier collections"""
+
+    def __init__(self, listed: dict[str, int]):
+        self._listed = listed
+        self._children: dict[str, list[str]] = {}
+        for path in listed:
+            self._children.setdefault(os.path.dirname(path), []).append(path)
+        self._seen: dict[str, int] = {}
+
+    def newest_mtime_ns(self, directory: str) -> int:
+        """The latest mtime of the directory or of any directory below it.
+
+        Only directories whose own mtime changed are listed again; the others'
+        subdirectories are the ones they had when last listed. Adding, removing or
+        renaming a file changes its directory's mtime, so it is still noticed.
+        """
+        newest = 0
+        pending = [directory]
+        while pending:
+            path = pending.pop()
+            try:
+                mtime_ns = os.lstat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            self._seen[path] = mtime_ns
+            newest = max(newest, mtime_ns)
+            if self._listed.get(path) == mtime_ns:
+                pending.extend(self._children.get(path, ()))
+            else:
+                pending.extend(str(child) for child in _children(Path(path)))
+        return newest
+
+    def changed(self) -> dict[str, int]:
+        return {
+            path: mtime_ns
+            for path, mtime_ns in self._seen.items()
+            if self._listed.get(path) != mtime_ns
+        }
+
+    def gone(self, *roots: str) -> list[str]:
+        """Directories under the roots that were listed before but not now"""
+        prefixes = tuple(os.path.join(root, "") for root in roots)
+        return [
+            path
+            for path in self._listed
+            if path.startswith(prefixes) and path not in self._seen
+        ]
+
+
+def _unshared_bytes(directory: Path) -> int:
+    """Disk space that removing the directory would free.
+
+    Files with other hard links (workspace files linked from the content store)
+    are left out, since their data stays on disk.
+    """
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                info = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            if info.st_nlink == 1:
+                total += info.st_blocks * 512
+    return total
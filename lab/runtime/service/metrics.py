@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from lab.runtime.model.execution import ExecutionContext, ExecutionMetrics
+from lab.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+PROC = Path("/proc")
+
+
+class _Usage:
+    """Running totals for one tracked execution"""
+
+    def __init__(self, context: ExecutionContext):
+        self.context = context
+        self.start_time = datetime.now()
+        self.memory_peak_bytes = 0
+        self.cpu_time_seconds = 0.0
+        self.io_read_bytes = 0
+        self.io_write_bytes = 0
+
+
+class ResourceSampler:
+    """Samples the process trees of running experiments from /proc.
+
+    One task serves every tracked execution: each tick reads /proc once and sums
+    the memory, CPU time and I/O of all processes in each experiment's session.
+    Sampling catches the combined peak memory of a tree and any descendants the
+    experiment never waited for, which OS accounting at exit misses.
+    """
+
+    def __init__(self, settings: Settings):
+        self._interval = settings.sample_interval_seconds
+        self._tracked: dict[int, _Usage] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._enabled = PROC.is_dir()
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if self._enabled else 0
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if self._enabled else 1
+
+    def track(self, context: ExecutionContext) -> None:
+        """Start measuring an execution; its process is found through `context.pid`"""
+        self._tracked[id(context)] = _Usage(context)
+        if self._enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def finish(self, context: ExecutionContext) -> ExecutionMetrics:
+        """Stop measuring an execution, combining samples with what it recorded"""
+        usage = self._tracked.pop(id(context))
+        end_time = datetime.now()
+        recorded = context.metrics
+        return ExecutionMetrics(
+            start_time=usage.start_time,
+            end_time=end_time,
+            duration_seconds=(end_time - usage.start_time).total_seconds(),
+            memory_peak_bytes=max(
+                [usage.memory_peak_bytes, *(m.memory_peak_bytes for m in recorded)]
+            ),
+            cpu_time_seconds=max(
+                [usage.cpu_time_seconds, *(m.cpu_time_seconds for m in recorded)]
+            ),
+            io_read_bytes=max(
+                [usage.io_read_bytes, *(m.io_read_bytes for m in recorded)]
+            ),
+            io_write_bytes=max(
+                [usage.io_write_bytes, *(m.io_write_bytes for m in recorded)]
+            ),
+        )
+
+    ### PRIVATE #######################
+
+    async def _run(self) -> None:
+        while self._tracked:
+            sessions = {
+                usage.context.pid: usage
+                for usage in self._tracked.values()
+                if usage.context.pid is not None
+            }
+            if sessions:
+                try:
+                    totals = await asyncio.to_thread(self._sample, set(sessions))
+                except Exception:
+                    logger.exception("Resource sampling failed")
+                    return
+
+                for session, (rss, cpu, read, write) in totals.items():
+                    usage = sessions[session]
+                    usage.memory_peak_bytes = max(usage.memory_peak_bytes, rss)
+                    usage.cpu_time_seconds = max(usage.cpu_time_seconds, cpu)
+                    usage.io_read_bytes = max(usage.io_read_bytes, read)
+                    usage.io_write_bytes = max(usage.io_write_bytes, write)
+
+            await asyncio.sleep(self._interval)
+
+    def _sample(self, sessions: set[int]) -> dict[int, tuple[int, float, int, int]]:
+        """Sum resident memory, CPU time and I/O over the processes in each session"""
+        totals: dict[int, list] = {}
+        for entry in os.scandir(PROC):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"{entry.path}/stat") as f:
+                    stat = f.read()
+            except OSError:
+                continue  # exited since listing
+
+            # Fields after the command name, which may itself contain spaces
+            fields = stat[stat.rfind(")") + 2 :].split()
+            session = int(fields[3])
+            if session not in sessions:
+                continue
+
+            utime, stime, cutime, cstime = (int(v) for v in fields[11:15])
+            rss = int(fields[21]) * self._page_size
+            read, write = self._read_io(entry.path)
+
+            total = totals.setdefault(session, [0, 0.0, 0, 0])
+            total[0] += rss
+            total[1] += (utime + stime + cutime + cstime) / self._clock_ticks
+            total[2] += read
+            total[3] += write
+
+        return {session: tuple(total) for session, total in totals.items()}  # type: ignore[misc]
+
+    def _read_io(self, path: str) -> tuple[int, int]:
+        read = write = 0
+        try:
+            with open(f"{path}/io") as f:
+                for line in f:
+                    if line.startswith("read_bytes:"):
+                        read = int(line.split()[1])
+                    elif line.startswith("write_bytes:"):
+                        write = int(line.split()[1])
+        except OSError:
+            pass
+
+        return read, write
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import marshal
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from lab.core.messaging.bus import MessageBus
+from lab.runtime.messages import ExperimentRunReported
+from lab.runtime.model.run import ExperimentRun
+from lab.sdk.client import (
+    ACK,
+    FRAME_HEADER,
+    HELLO,
+    OUTPUT,
+    RUN_ID_ENV,
+    SCALAR,
+    SOCKET_ENV,
+)
+
+logger = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT_SECONDS = 5.0
+
+
+class ReportServer:
+    """Receives what running experiments log through `lab.sdk`.
+
+    Listens on a Unix socket for the duration of a project run. Each batch is
+    attached to its ExperimentRun (latest scalar values and outputs) and published
+    on the bus as one ExperimentRunReported message. Any batch, including a bare
+    heartbeat, counts as a sign of life for the run.
+    """
+
+    def __init__(self, message_bus: MessageBus):
+        self._message_bus = message_bus
+        self._path: Optional[Path] = None
+        self._runs: dict[str, ExperimentRun] = {}
+        self._connections: dict[str, set[asyncio.Task]] = {}
+        self._last_seen: dict[str, float] = {}  # loop time of the latest batch
+
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator[None]:
+        directory = Path(tempfile.mkdtemp(prefix="lab-"))
+        self._path = directory / "report.sock"
+        server = await asyncio.start_unix_server(self._handle, path=str(self._path))
+        try:
+            yield
+        finally:
+            server.close()
+            await server.wait_closed()
+            self._path = None
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def attach(self, run: ExperimentRun) -> dict[str, str]:
+        """Accept reports for a run, returning the environment its process needs"""
+        if self._path is None:
+            return {}
+
+        self._runs[str(run.id)] = run
+        return {SOCKET_ENV: str(self._path), RUN_ID_ENV: str(run.id)}
+
+    async def detach(self, run: ExperimentRun) -> None:
+        """Stop accepting reports for a run, once its connections have been drained"""
+        run_id = str(run.id)
+        connections = self._connections.pop(run_id, set())
+        if connections:
+            # The process has exited, so these only have buffered data left to read
+            _, pending = await asyncio.wait(connections, timeout=DRAIN_TIMEOUT_SECONDS)
+            for task in pending:
+                task.cancel()
+        self._runs.pop(run_id, None)
+        self._last_seen.pop(run_id, None)
+
+    def last_report(self, run: ExperimentRun) -> Optional[float]:
+        """When (in event loop time) the run last sent anything, if it has"""
+        return self._last_seen.get(str(run.id))
+
+    ### PRIVATE #######################
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        run_id: Optional[str] = None
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return
+
+                (length,) = FRAME_HEADER.unpack(header)
+                records = marshal.loads(await reader.readexactly(length))
+                if run_id is None:
+                    run_id = self._hello(records)
+                    if run_id is None:
+                        return
+                    # Once acknowledged, detach() knows to wait for this connection
+                    writer.write(ACK)
+                    await writer.drain()
+                    continue
+
+                self._last_seen[run_id] = asyncio.get_running_loop().time()
+                await self._receive(self._runs[run_id], records)
+        except (asyncio.IncompleteReadError, EOFError, ValueError, TypeError) as e:
+            logger.warning(f"Dropped report connection: {e}")
+        finally:
+            writer.close()
+
+    def _hello(self, records: list[tuple]) -> Optional[str]:
+        kind, run_id = records[0]
+        if kind != HELLO or run_id not in self._runs:
+            logger.warning(f"Rejected report connection for unknown run {run_id}")
+            return None
+
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections.setdefault(run_id, set()).add(task)
+        return run_id
+
+    async def _receive(self, run: ExperimentRun, records: list[tuple]) -> None:
+        scalars = []
+        outputs = {}
+        for record in records:
+            if record[0] == SCALAR:
+                scalars.append(record[1:])
+            elif record[0] == OUTPUT:
+                outputs[record[1]] = record[2]
+
+        if not (scalars or outputs):
+            return  # only heartbeats
+
+        run.scalars.update((name, value) for name, _, value, _ in scalars)
+        run.outputs.update(outputs)
+        # Batches can hold thousands of scalars, and they are already well-formed
+        await self._message_bus.publish(
+            ExperimentRunReported.model_construct(
+                run=run, scalars=scalars, outputs=outputs
+            )
+        )
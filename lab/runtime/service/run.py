@@ -5,15 +5,18 @@ from uuid import UUID
 
 from lab.core.messaging.bus import MessageBus
 from lab.core.messaging.message import Message
+from lab.core.tracing import tracer
 from lab.runtime.messages import (
+    ExperimentRunCancelled,
     ExperimentRunComplete,
     ExperimentRunFailed,
     ExperimentRunStarted,
+    ProjectRunCancelled,
     ProjectRunComplete,
     ProjectRunFailed,
     ProjectRunStarted,
 )
-from lab.runtime.model.execution import ExecutionContext
+from lab.runtime.model.execution import ExecutionContext, ExecutionMetrics
 from lab.runtime.model.run import (
     ExperimentRun,
     ProjectRun,
@@ -39,7 +42,7 @@ class RunService:
 
     async def project_run_started(self, run: ProjectRun) -> None:
         """Start tracking a new pipeline run"""
-        await self._project_run_repo.save(run)
+        await self._save_project_run(run)
         await self._emit(ProjectRunStarted(run=run))
 
     async def experiment_run_started(
@@ -50,46 +53,75 @@ class RunService:
         """Start tracking a new experiment run"""
         run.project_run.experiment_runs.append(run)
         # @todo(rory): do we have to save both, or will sqlalchemy do it recursively?
-        await self._project_run_repo.save(run.project_run)
-        await self._experiment_run_repo.save(run)
+        await self._save_project_run(run.project_run)
+        await self._save_experiment_run(run)
         await self._emit(ExperimentRunStarted(run=run))
         return run
 
     async def experiment_run_completed(
         self,
         run: ExperimentRun,
+        metrics: Optional[list[ExecutionMetrics]] = None,
     ) -> None:
         """Mark experiment as completed with results"""
         run.status = RunStatus.COMPLETED
         run.completed_at = datetime.now()
-        # run.metrics = metrics
+        run.metrics = metrics or []
+        run.project_run.completed(run)
         # run.experiment_data = data
-        await self._experiment_run_repo.save(run)
+        await self._save_experiment_run(run)
         await self._emit(ExperimentRunComplete(run=run))
 
-    async def experiment_run_failed(self, run: ExperimentRun, error: str) -> None:
+    async def experiment_run_failed(
+        self,
+        run: ExperimentRun,
+        error: str,
+        metrics: Optional[list[ExecutionMetrics]] = None,
+    ) -> None:
         """Mark experiment as failed"""
         run.status = RunStatus.FAILED
         run.completed_at = datetime.now()
         run.error = error
-        await self._experiment_run_repo.save(run)
+        run.metrics = metrics or []
+        await self._save_experiment_run(run)
         await self._emit(ExperimentRunFailed(run=run, reason=error))
 
+    async def experiment_run_cancelled(
+        self,
+        run: ExperimentRun,
+        reason: str,
+        metrics: Optional[list[ExecutionMetrics]] = None,
+    ) -> None:
+        """Mark experiment as stopped before it finished"""
+        run.status = RunStatus.CANCELLED
+        run.completed_at = datetime.now()
+        run.error = reason
+        run.metrics = metrics or []
+        await self._save_experiment_run(run)
+        await self._emit(ExperimentRunCancelled(run=run, reason=reason))
+
     async def project_run_failed(self, run: ProjectRun, error: str) -> None:
         """Mark experiment as failed"""
         run.status = RunStatus.FAILED
         run.completed_at = datetime.now()
         run.error = error
-        await self._project_run_repo.save(run)
+        await self._save_project_run(run)
         await self._emit(ProjectRunFailed(run=run, reason=error))
 
     async def project_run_completed(self, project_run: ProjectRun) -> None:
         """Mark pipeline as completed"""
         project_run.status = RunStatus.COMPLETED
         project_run.completed_at = datetime.now()
-        await self._project_run_repo.save(project_run)
+        await self._save_project_run(project_run)
         await self._emit(ProjectRunComplete(run=project_run))
 
+    async def project_run_cancelled(self, project_run: ProjectRun) -> None:
+        """Mark pipeline as stopped before all of it ran"""
+        project_run.status = RunStatus.CANCELLED
+        project_run.completed_at = datetime.now()
+        await self._save_project_run(project_run)
+        await self._emit(ProjectRunCancelled(run=project_run))
+
     # Query methods
     async def get_project_run(self, id: UUID) -> Optional[ProjectRun]:
         return await self._project_run_repo.get(id)
@@ -102,6 +134,19 @@ class RunService:
     ) -> list[ProjectRun]:
         return await self._project_run_repo.list(status, since)
 
+    async def list_experiment_runs(
+        self, status: Optional[RunStatus] = None, since: Optional[datetime] = None
+    ) -> list[ExperimentRun]:
+        return await self._experiment_run_repo.list(status, since)
+
+    async def _save_project_run(self, run: ProjectRun) -> None:
+        with tracer.span("save ProjectRun", "repository"):
+            await self._project_run_repo.save(run)
+
+    async def _save_experiment_run(self, run: ExperimentRun) -> None:
+        with tracer.span("save ExperimentRun", "repository"):
+            await self._experiment_run_repo.save(run)
+
     async def _emit(self, message: Message) -> None:
         """Emit event to subscribers of that event type"""
         await self._message_bus.publish(message)
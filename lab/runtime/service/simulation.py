@@ -0,0 +1,302 @@
+import heapq
+import itertools
+import random
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Iterable, Optional
+from uuid import UUID
+
+from lab.core.model import Model
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.pool import ResourcePool, physical_memory_bytes
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.plan import ExecutionPlan
+from lab.project.model.project import Experiment
+from lab.project.service.estimate import DurationEstimator
+from lab.runtime.admission import ReadyGroups, Running, admit, next_slot, release
+
+TIMELINE_SLICES = 40
+SWEEP_TOLERANCE = 0.05  # recommend the fewest jobs within this of the best makespan
+EPOCH = datetime(2000, 1, 1)  # simulated time zero, for the reservation calendar
+
+
+class SimulationResult(Model):
+    """Predicted outcome of running a plan with a number of jobs"""
+
+    jobs: int
+    makespans: list[float]  # seconds, one per trial
+    utilisation: float  # busy share of the CPUs over the whole run
+    timeline: list[float]  # busy share of the CPUs in equal slices of the run
+    peak_cpus: int  # most CPUs in use at once
+    critical_path: list[str]  # the chain of starts that ended last
+    refused: list[str]  # experiments whose requirements the pool can never meet
+
+    @property
+    def makespan(self) -> float:
+        return median(self.makespans)
+
+    @property
+    def makespan_p90(self) -> float:
+        ordered = sorted(self.makespans)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+
+class ConcurrencySweep(Model):
+    results: list[SimulationResult]  # by increasing jobs
+    recommended: int
+
+
+class PlanSimulator:
+    """Predicts how a plan would run by replaying the runtime's scheduling.
+
+    Admission goes through the same code as `Runtime`: critical-path priorities,
+    stream groups, backfilling around a reserved blocked experiment and slots
+    booked on exclusive instruments, all based on the plan's estimates. How long
+    each experiment then takes is drawn from the durations of its previous runs,
+    so trials differ the way real runs do; experiments that never ran take their
+    estimate. No experiment fails, except those whose requirements can never be
+    met.
+    """
+
+    def __init__(self, registry: InstrumentRegistry):
+        self._registry = registry
+        self._groups: Optional[tuple[UUID, ReadyGroups]] = None  # for the last plan
+
+    def simulate(
+        self,
+        plan: ExecutionPlan,
+        jobs: int,
+        estimator: Optional[DurationEstimator] = None,
+        trials: int = 1,
+        seed: Optional[int] = None,
+    ) -> SimulationResult:
+        """Simulate the plan `trials` times, detailing the median trial"""
+        if estimator is None or not any(
+            estimator.samples(exp) for exp in plan.ordered_experiments
+        ):
+            trials = 1  # without history every trial would be the same
+        rng = random.Random(seed)
+        traces = []
+        for trial in range(trials):
+            # The first trial uses the estimates, the others draw from history
+            durations = (
+                self._sample_durations(plan, estimator, rng)
+                if trial > 0 and estimator is not None
+                else None
+            )
+            traces.append(self._run(plan, jobs, durations))
+
+        traces.sort(key=lambda t: t.makespan)
+        typical = traces[len(traces) // 2]
+        return SimulationResult(
+            jobs=jobs,
+            makespans=[t.makespan for t in traces],
+            utilisation=typical.utilisation(jobs),
+            timeline=typical.timeline(jobs, TIMELINE_SLICES),
+            peak_cpus=typical.peak_cpus,
+            critical_path=[exp.name for exp in typical.critical_path()],
+            refused=sorted(exp.name for exp in typical.refused),
+        )
+
+    def sweep(self, plan: ExecutionPlan, jobs: Iterable[int] = ()) -> ConcurrencySweep:
+        """Simulate with powers of two jobs (and any given), using the estimates.
+
+        Stops adding jobs once a simulation never had all of its CPUs busy, since
+        more can't make any difference.
+        """
+        requested = set(jobs)
+        widest = max(len(plan.ordered_experiments), 1)
+        powers = {2**i for i in range(widest.bit_length() + 1)}
+        results: list[SimulationResult] = []
+        for count in sorted(requested | powers):
+            saturated = not results or results[-1].peak_cpus >= results[-1].jobs
+            if not saturated and count not in requested:
+                continue
+            results.append(self.simulate(plan, count))
+
+        best = min((r.makespan for r in results), default=0.0)
+        recommended = next(
+            (r.jobs for r in results if r.makespan <= best * (1 + SWEEP_TOLERANCE)),
+            1,
+        )
+        return ConcurrencySweep(results=results, recommended=recommended)
+
+    ### PRIVATE #######################
+
+    def _run(
+        self,
+        plan: ExecutionPlan,
+        jobs: int,
+        durations: Optional[dict[Experiment, float]],
+    ) -> "_Trace":
+        """One simulated run, stepping from one completion to the next"""
+        registry = InstrumentRegistry(
+            i.model_copy() for i in self._registry.instruments
+        )
+        pool = ResourcePool(
+            cpus=jobs, memory_bytes=physical_memory_bytes(), registry=registry
+        )
+        now = 0.0
+        calendar = ReservationCalendar(
+            registry, clock=lambda: EPOCH + timedelta(seconds=now)
+        )
+        calendar.reserve_plan(plan)
+        project = plan.project
+        groups = self._ready_groups(plan)
+        trace = _Trace()
+        events: list[tuple[float, int, Running, bool]] = []  # (end, seq, run, failed)
+        running: dict[int, Running] = {}
+        sequence = itertools.count()  # orders events that end at the same time
+        cause: Optional[Experiment] = None
+        stopping = False
+        while running or (groups.queue and not stopping):
+            if not stopping:
+                admissions = admit(
+                    plan, pool, groups.queue, running.values(), now, calendar=calendar
+                )
+                for admitted in admissions:
+                    for run in admitted:
+                        experiment = run.experiment
+                        if run.allocation is None:
+                            trace.refused.append(experiment)
+                            end, failed = now, True
+                        else:
+                            end = now + (
+                                durations[experiment]
+                                if durations is not None
+                                else plan.estimates.get(experiment.id, 0.0)
+                            )
+                            failed = False
+                            trace.started(
+                                experiment, now, end, run.allocation.cpus, cause
+                            )
+                        heapq.heappush(events, (end, next(sequence), run, failed))
+                        running[id(run)] = run
+
+            slot = None if stopping else next_slot(groups.queue, calendar)
+            if not running and slot is None:
+                trace.refused.extend(exp for item in groups.queue for exp in item[2])
+                break
+
+            upcoming = (slot - EPOCH).total_seconds() if slot is not None else None
+            if upcoming is not None and (not events or upcoming < events[0][0]):
+                now = upcoming  # a booked slot comes before anything finishes
+                continue
+
+            # Everything that finishes at the same moment, before admitting again
+            now = events[0][0]
+            while events and events[0][0] == now:
+                _, _, run, failed = heapq.heappop(events)
+                del running[id(run)]
+                if run.allocation is not None:
+                    release(pool, run.allocation, calendar)
+                    trace.finished(now, run.allocation.cpus)
+                groups.finished(run.experiment, failed=failed)
+                cause = run.experiment
+                if failed and project.dependents_of(run.experiment):
+                    stopping = True  # as the runtime does
+
+        return trace
+
+    def _ready_groups(self, plan: ExecutionPlan) -> ReadyGroups:
+        """The plan's groups, only worked out again for a different plan"""
+        if self._groups is None or self._groups[0] != plan.id:
+            self._groups = (plan.id, ReadyGroups(plan))
+        else:
+            self._groups[1].restart()
+        return self._groups[1]
+
+    def _sample_durations(
+        self, plan: ExecutionPlan, estimator: DurationEstimator, rng: random.Random
+    ) -> dict[Experiment, float]:
+        durations = {}
+        for exp in plan.ordered_experiments:
+            samples = estimator.samples(exp)
+            durations[exp] = (
+                rng.choice(samples) if samples else plan.estimates.get(exp.id, 0.0)
+            )
+        return durations
+
+
+### PRIVATE #######################
+
+
+class _Trace:
+    """What happened in one simulated run"""
+
+    def __init__(self) -> None:
+        # experiment -> (start, end, the experiment whose completion let it start)
+        self.starts: dict[Experiment, tuple[float, float, Optional[Experiment]]] = {}
+        self.refused: list[Experiment] = []
+        self.changes: list[tuple[float, int]] = []  # (time, change in busy CPUs)
+        self.busy_seconds = 0.0  # CPU-seconds
+        self.makespan = 0.0
+        self.peak_cpus = 0
+        self._busy = 0
+
+    def started(
+        self,
+        experiment: Experiment,
+        start: float,
+        end: float,
+        cpus: int,
+        cause: Optional[Experiment],
+    ) -> None:
+        self.starts[experiment] = (start, end, cause)
+        self.changes.append((start, cpus))
+        self.busy_seconds += cpus * (end - start)
+        self.makespan = max(self.makespan, end)
+        self._busy += cpus
+        self.peak_cpus = max(self.peak_cpus, self._busy)
+
+    def finished(self, end: float, cpus: int) -> None:
+        self.changes.append((end, -cpus))
+        self._busy -= cpus
+
+    def utilisation(self, jobs: int) -> float:
+        if self.makespan == 0:
+            return 0.0
+        return self.busy_seconds / (jobs * self.makespan)
+
+    def timeline(self, jobs: int, slices: int) -> list[float]:
+        """Average share of the CPUs in use in each of `slices` equal intervals"""
+        if self.makespan == 0:
+            return []
+        width = self.makespan / slices
+        busy = [0.0] * slices  # CPU-seconds in each slice
+        level, last = 0, 0.0
+        for time, change in sorted(self.changes):
+            _spread(busy, width, last, time, level)
+            level, last = level + change, time
+        return [seconds / (width * jobs) for seconds in busy]
+
+    def critical_path(self) -> list[Experiment]:
+        """From the last experiment to end, back through what let each one start.
+
+        That's an upstream experiment finishing, or one freeing the resources it
+        was waiting for.
+        """
+        if not self.starts:
+            return []
+        current: Optional[Experiment] = max(
+            self.starts, key=lambda e: self.starts[e][1]
+        )
+        path = []
+        while current is not None:
+            path.append(current)
+            current = self.starts[current][2]
+        return path[::-1]
+
+
+def _spread(
+    busy: list[float], width: float, start: float, end: float, level: int
+) -> None:
+    """Add `level` CPUs in use from `start` to `end` to the slices they overlap"""
+    if level == 0 or end <= start:
+        return
+    first = min(int(start / width), len(busy) - 1)
+    last = min(int(end / width), len(busy) - 1)
+    for i in range(first, last + 1):
+        overlap = min(end, (i + 1) * width) - max(start, i * width)
+        if overlap > 0:
+            busy[i] += level * overlap
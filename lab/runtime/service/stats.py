@@ -0,0 +1,187 @@
+from datetime import datetime
+from typing import Iterable, Optional, Sequence, Union
+
+import polars as pl
+
+from lab.core.messaging.bus import MessageBus
+from lab.project.model.project import Experiment
+from lab.project.service.estimate import DEFAULT_DURATION_SECONDS, DurationEstimator
+from lab.runtime.messages import (
+    ExperimentRunCancelled,
+    ExperimentRunComplete,
+    ExperimentRunFailed,
+    ExperimentRunReported,
+    ProjectRunCancelled,
+    ProjectRunComplete,
+    ProjectRunFailed,
+)
+from lab.runtime.model.run import ExperimentRun
+from lab.runtime.persistence.metrics import RUNS, SCALARS, MetricsStore
+
+RUN_METRICS = (
+    "duration_seconds",
+    "memory_peak_bytes",
+    "cpu_time_seconds",
+    "io_read_bytes",
+    "io_write_bytes",
+)
+ESTIMATE_SAMPLES = 50  # most recent runs of each definition to estimate from
+
+
+class StatsService:
+    """Records finished runs in the metrics store and summarises their history"""
+
+    def __init__(self, store: MetricsStore, message_bus: MessageBus):
+        self._store = store
+        message_bus.subscribe(ExperimentRunComplete, self._on_experiment_finished)
+        message_bus.subscribe(ExperimentRunFailed, self._on_experiment_finished)
+        message_bus.subscribe(ExperimentRunCancelled, self._on_experiment_finished)
+        message_bus.subscribe(ExperimentRunReported, self._on_experiment_reported)
+        message_bus.subscribe(ProjectRunComplete, self._on_project_finished)
+        message_bus.subscribe(ProjectRunFailed, self._on_project_finished)
+        message_bus.subscribe(ProjectRunCancelled, self._on_project_finished)
+
+    def record_run(self, run: ExperimentRun) -> None:
+        completed_at = run.completed_at or datetime.now()
+        metrics = run.metrics[-1] if run.metrics else None
+        self._store.append(
+            RUNS,
+            [
+                {
+                    "run_id": str(run.id),
+                    "project_run_id": str(run.project_run.id),
+                    "experiment_id": str(run.experiment.id),
+                    "experiment": run.experiment.name,
+                    "fingerprint": run.experiment.fingerprint,
+                    "status": run.status.value,
+                    "started_at": run.started_at,
+                    "completed_at": completed_at,
+                    "duration_seconds": (completed_at - run.started_at).total_seconds(),
+                    "memory_peak_bytes": metrics.memory_peak_bytes if metrics else None,
+                    "cpu_time_seconds": metrics.cpu_time_seconds if metrics else None,
+                    "io_read_bytes": metrics.io_read_bytes if metrics else None,
+                    "io_write_bytes": metrics.io_write_bytes if metrics else None,
+                }
+            ],
+        )
+
+    def record_scalars(
+        self,
+        run: ExperimentRun,
+        scalars: Sequence[tuple[str, int, float, float]],
+    ) -> None:
+        """Add (name, step, value, epoch seconds) scalars reported by an experiment"""
+        run_id, experiment = str(run.id), run.experiment.name
+        self._store.append(
+            SCALARS,
+            (
+                {
+                    "run_id": run_id,
+                    "experiment": experiment,
+                    "name": name,
+                    "step": step,
+                    "value": value,
+                    "timestamp": datetime.fromtimestamp(timestamp),
+                }
+                for name, step, value, timestamp in scalars
+            ),
+        )
+
+    def flush(self) -> None:
+        self._store.flush()
+        self._store.compact()
+
+    def runs(self) -> pl.LazyFrame:
+        return self._store.scan(RUNS)
+
+    def estimator(
+        self,
+        experiments: Iterable[Experiment] = (),
+        default: float = DEFAULT_DURATION_SECONDS,
+        last: Optional[int] = ESTIMATE_SAMPLES,
+    ) -> DurationEstimator:
+        """Duration estimates from the successful runs recorded so far.
+
+        With `experiments`, only runs with their fingerprints are read; with `last`,
+        only each fingerprint's most recent runs.
+        """
+        runs = self.runs().filter(pl.col("status") == "completed")
+        fingerprints = {experiment.fingerprint for experiment in experiments}
+        if fingerprints:
+            runs = runs.filter(pl.col("fingerprint").is_in(list(fingerprints)))
+        seconds = pl.col("duration_seconds").sort_by("started_at", maintain_order=True)
+        samples = runs.group_by("fingerprint").agg(
+            seconds.tail(last) if last is not None else seconds
+        )
+
+        estimator = DurationEstimator(default=default)
+        for fingerprint, durations in samples.collect().iter_rows():
+            for duration in durations:
+                estimator.add(fingerprint, duration)
+        return estimator
+
+    def scalars(self) -> pl.LazyFrame:
+        return self._store.scan(SCALARS)
+
+    def summarise(
+        self,
+        metric: str = "duration_seconds",
+        experiments: Sequence[str] = (),
+        last: Optional[int] = None,
+        since: Optional[datetime] = None,
+        quantile: float = 0.95,
+    ) -> pl.DataFrame:
+        """Per-experiment summary of a run metric over successful runs.
+
+        With `last`, only each experiment's most recent runs are considered. Filters
+        are applied to the lazy scan, so only matching row groups are read.
+        """
+        if metric not in RUN_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+
+        runs = self.runs().filter(pl.col("status") == "completed")
+        if experiments:
+            runs = runs.filter(pl.col("experiment").is_in(list(experiments)))
+        if since is not None:
+            runs = runs.filter(pl.col("started_at") >= since)
+        runs = runs.select("experiment", "started_at", metric)
+        if last is not None:
+            runs = runs.filter(
+                pl.col("started_at").rank("ordinal", descending=True).over("experiment")
+                <= last
+            )
+
+        value = pl.col(metric).cast(pl.Float64)
+        return (
+            runs.group_by("experiment")
+            .agg(
+                pl.len().alias("runs"),
+                value.mean().alias("mean"),
+                value.median().alias("p50"),
+                value.quantile(quantile, interpolation="linear").alias(
+                    f"p{quantile * 100:g}"
+                ),
+                value.max().alias("max"),
+                pl.col("started_at").max().alias("last_run"),
+            )
+            .sort("experiment")
+            .collect()
+        )
+
+    ### PRIVATE #######################
+
+    async def _on_experiment_finished(
+        self,
+        message: Union[
+            ExperimentRunComplete, ExperimentRunFailed, ExperimentRunCancelled
+        ],
+    ) -> None:
+        self.record_run(message.run)
+
+    async def _on_experiment_reported(self, message: ExperimentRunReported) -> None:
+        self.record_scalars(message.run, message.scalars)
+
+    async def _on_project_finished(
+        self, _: Union[ProjectRunComplete, ProjectRunFailed, ProjectRunCancelled]
+    ) -> None:
+        self.flush()
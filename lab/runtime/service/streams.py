@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.sdk.artifacts import STREAM
+from lab.sdk.streams import STREAMS_ENV
+
+
+class StreamChannels:
+    """Named pipes connecting experiments that stream outputs to each other.
+
+    There is one pipe per streamed parameter, created in a temporary directory for
+    the duration of a project run. The pipe's buffer bounds how far a producer can
+    get ahead of its consumer.
+    """
+
+    def __init__(self) -> None:
+        self._directory: Optional[Path] = None
+
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator[None]:
+        self._directory = Path(tempfile.mkdtemp(prefix="lab-streams-"))
+        try:
+            yield
+        finally:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def open(self, experiments: Iterable[Experiment], project: Project) -> None:
+        """Create the pipes of a group before any of its experiments start"""
+        for experiment in experiments:
+            for path in self._pipes(experiment, project):
+                if not path.exists():
+                    os.mkfifo(path)
+
+    def inputs(
+        self, experiment: Experiment, project: Project
+    ) -> dict[str, dict[str, str]]:
+        """The streamed inputs of a consumer, as entries for `lab.sdk.input`"""
+        return {
+            parameter: {"kind": STREAM, "path": str(self._pipe(experiment, parameter))}
+            for parameter, _ in self._streamed_parameters(experiment, project)
+        }
+
+    def environment(self, experiment: Experiment, project: Project) -> dict[str, str]:
+        """Where a producer writes each of its streamed outputs"""
+        outputs: dict[str, list[str]] = {}
+        for consumer in project.dependents_of(experiment):
+            for parameter, value in self._streamed_parameters(consumer, project):
+                if value.owner == experiment:
+                    path = str(self._pipe(consumer, parameter))
+                    outputs.setdefault(value.output, []).append(path)
+        return {STREAMS_ENV: json.dumps(outputs)} if outputs else {}
+
+    def release(self, experiment: Experiment, project: Project) -> None:
+        """Unblock the peers of an experiment that has exited.
+
+        A peer can be stuck opening a pipe whose other end will now never be opened.
+        Opening and closing that end lets it through to see end-of-file (consumer)
+        or a broken pipe (producer), so a failure can't hang the group. The pipe is
+        then removed, so a peer that hasn't opened it yet fails instead of waiting.
+        """
+        for path in self._pipes(experiment, project):
+            for flags in (os.O_RDONLY, os.O_WRONLY):
+                try:
+                    os.close(os.open(path, flags | os.O_NONBLOCK))
+                except OSError:
+                    pass  # No one is waiting at the other end
+            path.unlink(missing_ok=True)
+
+    ### PRIVATE #######################
+
+    def _pipes(self, experiment: Experiment, project: Project) -> list[Path]:
+        """The pipes an experiment reads from or writes to"""
+        pipes = [
+            self._pipe(experiment, parameter)
+            for parameter, _ in self._streamed_parameters(experiment, project)
+        ]
+        for consumer in project.dependents_of(experiment):
+            for parameter, value in self._streamed_parameters(consumer, project):
+                if value.owner == experiment:
+                    pipes.append(self._pipe(consumer, parameter))
+        return pipes
+
+    def _streamed_parameters(
+        self, experiment: Experiment, project: Project
+    ) -> list[tuple[str, ValueReference]]:
+        return [
+            (parameter, value)
+            for parameter, value in experiment.parameters.items()
+            if isinstance(value, ValueReference)
+            and value.stream
+            and project.is_streamed(value.owner, experiment)
+        ]
+
+    def _pipe(self, consumer: Experiment, parameter: str) -> Path:
+        if self._directory is None:
+            raise RuntimeError("Streams are only available during a project run")
+
+        return self._directory / f"{consumer.id.hex}-{parameter}"
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lab.instrument.model.instrument import Instrument
+from lab.instrument.service.pool import physical_memory_bytes
+from lab.project.persistence.codec import decode_execution_method
+from lab.runtime.model.execution import ExecutionContext
+from lab.runtime.protocol import (
+    ASSIGN,
+    CANCEL,
+    CREDIT,
+    FINISHED,
+    HEARTBEAT,
+    REGISTER,
+    REGISTERED,
+    STARTED,
+    read_message,
+    write_message,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_ENV = "LAB_WORKER"  # the worker's name, for experiments that care
+CONNECT_RETRY_SECONDS = 0.5
+
+
+class Worker:
+    """Runs experiments leased by a coordinator on this machine.
+
+    Everything the coordinator assigns runs concurrently; the coordinator only
+    assigns as much as the CPUs and memory the worker advertised. Runs until the
+    coordinator closes the connection.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        name: Optional[str] = None,
+        cpus: Optional[int] = None,
+        memory_bytes: Optional[int] = None,
+        instruments: Iterable[Instrument] = (),
+        connect_timeout: float = 0.0,
+    ):
+        self.host = host
+        self.port = port
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.cpus = cpus or os.cpu_count() or 1
+        self.memory_bytes = (
+            memory_bytes if memory_bytes is not None else physical_memory_bytes()
+        )
+        self.instruments = list(instruments)
+        self.connect_timeout = connect_timeout  # for a coordinator still starting
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._running: dict[str, tuple[asyncio.Task, ExecutionContext]] = {}
+
+    async def run(self) -> None:
+        reader, writer = await self._connect()
+        self._writer = writer
+        write_message(
+            writer,
+            REGISTER,
+            self.name,
+            self.cpus,
+            self.memory_bytes,
+            [i.model_dump(mode="json") for i in self.instruments],
+        )
+        message = await read_message(reader)
+        if message is None or message[0] != REGISTERED:
+            raise ConnectionError("The coordinator refused this worker")
+
+        _, worker_id, heartbeat_seconds, _ = message
+        logger.info(f"Registered with {self.host}:{self.port} as {worker_id}")
+        heartbeat = asyncio.create_task(self._heartbeat(heartbeat_seconds))
+        try:
+            while (message := await read_message(reader)) is not None:
+                if message[0] == ASSIGN:
+                    self._start(*message[1:])
+                elif message[0] == CANCEL:
+                    self._cancel(message[1])
+        finally:
+            heartbeat.cancel()
+            for lease_id in list(self._running):
+                self._cancel(lease_id)
+            writer.close()
+            self._writer = None
+
+    def offer(self, cpus: int, memory_bytes: int) -> None:
+        """Change how much work the coordinator may give this worker"""
+        self.cpus, self.memory_bytes = cpus, memory_bytes
+        if self._writer is not None:
+            write_message(self._writer, CREDIT, cpus, memory_bytes)
+
+    ### PRIVATE #######################
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        deadline = asyncio.get_running_loop().time() + self.connect_timeout
+        while True:
+            try:
+                return await asyncio.open_connection(self.host, self.port)
+            except ConnectionRefusedError:
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise
+                await asyncio.sleep(CONNECT_RETRY_SECONDS)
+
+    def _start(
+        self,
+        lease_id: str,
+        method: str,
+        fields: dict,
+        env: dict[str, str],
+        working_dir: str,
+    ) -> None:
+        # The coordinator's workspace only exists here on a shared filesystem
+        directory = Path(working_dir)
+        context = ExecutionContext(
+            working_dir=directory if directory.is_dir() else Path.cwd(),
+            env_vars={**env, WORKER_ENV: self.name},
+        )
+        task = asyncio.create_task(self._execute(lease_id, method, fields, context))
+        self._running[lease_id] = (task, context)
+
+    async def _execute(
+        self, lease_id: str, method: str, fields: dict, context: ExecutionContext
+    ) -> None:
+        assert self._writer is not None
+        write_message(self._writer, STARTED, lease_id)
+        error: Optional[str] = None
+        try:
+            await decode_execution_method(method, fields).run(context)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            self._running.pop(lease_id, None)
+
+        metrics = [m.model_dump(mode="json") for m in context.metrics]
+        write_message(self._writer, FINISHED, lease_id, error, metrics)
+
+    def _cancel(self, lease_id: str) -> None:
+        """Stop a run; cancelling its process terminates the whole process group"""
+        task, _ = self._running.pop(lease_id, (None, None))
+        if task is not None:
+            task.cancel()
+
+    async def _heartbeat(self, interval: float) -> None:
+        assert self._writer is not None
+        while True:
+            write_message(self._writer, HEARTBEAT, list(self._running))
+            await self._writer.drain()
+            await asyncio.sleep(interval)
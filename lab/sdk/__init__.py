@@ -0,0 +1,16 @@
+from lab.sdk.artifacts import input, parameters, publish
+from lab.sdk.client import Client, flush, get_client, heartbeat, log, output
+from lab.sdk.streams import stream
+
+__all__ = [
+    "Client",
+    "flush",
+    "get_client",
+    "heartbeat",
+    "input",
+    "log",
+    "output",
+    "parameters",
+    "publish",
+    "stream",
+]
@@ -0,0 +1,120 @@
+"""Passing outputs between experiments.
+
+An experiment publishes named outputs into its run's artifact directory. Arrays
+(anything NumPy can view, including CPU tensors) are written as `.npy` files, paths
+are hard-linked (or copied) in, and other values, strings included, are stored as
+JSON. A downstream
+experiment reads them through `input`, which maps arrays into memory read-only
+rather than loading them, so large intermediates are shared through the page cache
+instead of being copied or pickled.
+"""
+
+import json
+import os
+import shutil
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+from lab.sdk.streams import StreamReader
+
+ARTIFACTS_ENV = "LAB_ARTIFACTS"
+INPUTS_ENV = "LAB_INPUTS"
+PARAMETERS_ENV = "LAB_PARAMETERS"
+
+MANIFEST = "manifest.json"
+
+ARRAY = "array"
+FILE = "file"
+VALUE = "value"
+STREAM = "stream"
+
+
+def publish(name: str, value: Any, directory: Optional[Path] = None) -> Path:
+    """Store an output under `name` for downstream experiments"""
+    directory = directory or Path(os.environ[ARTIFACTS_ENV])
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if isinstance(value, os.PathLike) and Path(value).is_file():
+        kind, path = FILE, directory / f"{name}{Path(value).suffix}"
+        _link_or_copy(Path(value), path)
+    elif _is_array(value):
+        import numpy as np
+
+        kind, path = ARRAY, directory / f"{name}.npy"
+        detach = getattr(value, "detach", None)
+        if detach is not None:  # torch tensors, possibly on a GPU
+            value = detach().cpu().numpy()
+        with open(_partial(path), "wb") as file:
+            np.save(file, np.asarray(value), allow_pickle=False)
+        os.replace(_partial(path), path)
+    else:
+        kind, path = VALUE, directory / f"{name}.json"
+        _partial(path).write_text(json.dumps(value))
+        os.replace(_partial(path), path)
+
+    manifest = read_manifest(directory)
+    manifest[name] = {"kind": kind, "path": path.name}
+    _partial(directory / MANIFEST).write_text(json.dumps(manifest))
+    os.replace(_partial(directory / MANIFEST), directory / MANIFEST)
+    return path
+
+
+def input(name: str) -> Any:
+    """An output of an upstream experiment, bound to parameter `name`.
+
+    Arrays come back as read-only memory maps, files as paths and anything else as
+    the published value. Streamed inputs come back as an iterable of chunks.
+    """
+    inputs = _inputs()
+    if name not in inputs:
+        raise KeyError(f"No input named '{name}'")
+
+    kind, path = inputs[name]["kind"], Path(inputs[name]["path"])
+    if kind == STREAM:
+        return StreamReader(name, str(path))
+    if kind == ARRAY:
+        import numpy as np
+
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+    if kind == FILE:
+        return path
+    return json.loads(path.read_text())
+
+
+def parameters() -> dict[str, Any]:
+    """The experiment's literal parameters from the Labfile"""
+    return json.loads(os.environ.get(PARAMETERS_ENV, "{}"))
+
+
+def read_manifest(directory: Path) -> dict[str, dict[str, str]]:
+    try:
+        return json.loads((directory / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+### PRIVATE #######################
+
+
+@cache
+def _inputs() -> dict[str, dict[str, str]]:
+    return json.loads(os.environ.get(INPUTS_ENV, "{}"))
+
+
+def _is_array(value: Any) -> bool:
+    return hasattr(value, "__array__") or hasattr(value, "__array_interface__")
+
+
+def _partial(path: Path) -> Path:
+    return path.with_name(f".{path.name}.partial")
+
+
+def _link_or_copy(source: Path, destination: Path) -> None:
+    partial = _partial(destination)
+    partial.unlink(missing_ok=True)
+    try:
+        os.link(source, partial)
+    except OSError:
+        shutil.copyfile(source, partial)
+    os.replace(partial, destination)
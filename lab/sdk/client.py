@@ -0,0 +1,135 @@
+"""Reporting from inside a running experiment.
+
+Logged values are buffered in the experiment's process and sent to the lab runtime
+in batches over a Unix socket, so logging a scalar costs a tuple and a list append.
+The batch is sent once it's full or `FLUSH_INTERVAL_SECONDS` have passed since the
+last send, and whatever is left is sent when the process exits.
+
+Outside `lab run` (no `LAB_SOCKET` in the environment) logging does nothing.
+"""
+
+import atexit
+import marshal
+import os
+import socket
+import struct
+import time
+from typing import Any, Optional
+
+SOCKET_ENV = "LAB_SOCKET"
+RUN_ID_ENV = "LAB_RUN_ID"
+
+BATCH_SIZE = 4096
+FLUSH_INTERVAL_SECONDS = 0.25
+
+# Every frame is a length prefix and a marshalled list of records
+FRAME_HEADER = struct.Struct("<I")
+HELLO = 0
+SCALAR = 1
+OUTPUT = 2
+HEARTBEAT = 3
+ACK = b"\x01"
+
+
+class Client:
+    """Batched connection to the runtime for one experiment run"""
+
+    def __init__(self, path: Optional[str], run_id: Optional[str]):
+        self._socket: Optional[socket.socket] = None
+        self._buffer: list[tuple] = []
+        self._steps: dict[str, int] = {}
+        self._deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+        self._pid = os.getpid()
+        if path and run_id:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+            self._send([(HELLO, run_id)])
+            if self._socket.recv(1) != ACK:
+                self._socket.close()
+                self._socket = None
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def log(self, name: str, value: float, step: Optional[int] = None) -> None:
+        """Record a scalar; without a step, it follows the last one logged for `name`"""
+        if self._socket is None:
+            return
+
+        if step is None:
+            step = self._steps.get(name, -1) + 1
+        self._steps[name] = step
+        buffer = self._buffer
+        buffer.append((SCALAR, name, step, float(value), time.time()))
+        if len(buffer) >= BATCH_SIZE or time.monotonic() >= self._deadline:
+            self.flush()
+
+    def output(self, name: str, value: Any) -> None:
+        """Record a named result; values must be builtin types (numbers, str, list, dict)"""
+        if self._socket is None:
+            return
+
+        self._buffer.append((OUTPUT, name, value))
+        self.flush()
+
+    def heartbeat(self) -> None:
+        """Tell the runtime the experiment is still making progress"""
+        if self._socket is None:
+            return
+
+        self._buffer.append((HEARTBEAT,))
+        self.flush()
+
+    def flush(self) -> None:
+        self._deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+        if self._socket is None or not self._buffer:
+            return
+        if os.getpid() != self._pid:
+            # A forked child shares the parent's socket, so it must not write to it
+            self._socket = None
+            return
+
+        batch, self._buffer = self._buffer, []
+        self._send(batch)
+
+    def close(self) -> None:
+        self.flush()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    ### PRIVATE #######################
+
+    def _send(self, records: list[tuple]) -> None:
+        assert self._socket is not None
+        payload = marshal.dumps(records)
+        self._socket.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+_client: Optional[Client] = None
+
+
+def get_client() -> Client:
+    """The client for this process, connected on first use"""
+    global _client
+    if _client is None:
+        _client = Client(os.environ.get(SOCKET_ENV), os.environ.get(RUN_ID_ENV))
+        atexit.register(_client.close)
+    return _client
+
+
+def log(name: str, value: float, step: Optional[int] = None) -> None:
+    get_client().log(name, value, step)
+
+
+def output(name: str, value: Any) -> None:
+    get_client().output(name, value)
+
+
+def heartbeat() -> None:
+    get_client().heartbeat()
+
+
+def flush() -> None:
+    get_client().flush()
@@ -0,0 +1,113 @@
+"""Streaming outputs to experiments that run at the same time.
+
+A streamed reference connects producer and consumer through a named pipe, so the
+consumer can work on chunks as they are produced. The pipe's buffer is small, so a
+producer that gets ahead blocks until the consumer catches up. Chunks are arrays
+(written in `.npy` format, never pickled), bytes, or JSON values.
+"""
+
+import io
+import json
+import os
+import struct
+from typing import IO, Any, Iterator, Optional, Union
+
+STREAMS_ENV = "LAB_STREAMS"
+
+_LENGTH = struct.Struct("<Q")
+_ARRAY = b"a"
+_BYTES = b"b"
+_JSON = b"j"
+_END = b"e"
+
+
+class StreamWriter:
+    """Writes chunks of one output to every experiment consuming it"""
+
+    def __init__(self, name: str, paths: list[str]):
+        self.name = name
+        # Opening a pipe blocks until its reader has opened it too
+        self._files: list[IO[bytes]] = [open(path, "wb") for path in paths]
+
+    def write(self, chunk: Any) -> None:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            self._frame(_BYTES, bytes(chunk))
+        elif hasattr(chunk, "__array__") or hasattr(chunk, "__array_interface__"):
+            import numpy as np
+
+            if hasattr(chunk, "detach"):  # torch tensors, possibly on a GPU
+                chunk = chunk.detach().cpu().numpy()
+            # NumPy can't write arrays straight to a pipe, as it can't seek one
+            buffer = io.BytesIO()
+            np.lib.format.write_array(buffer, np.asarray(chunk), allow_pickle=False)
+            self._frame(_ARRAY, buffer.getbuffer())
+        else:
+            self._frame(_JSON, json.dumps(chunk).encode())
+
+    def close(self) -> None:
+        for file in self._files:
+            file.write(_END)
+            file.close()
+        self._files = []
+
+    def __enter__(self) -> "StreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Optional[type], *_: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Without the end marker, consumers see the stream as broken
+            for file in self._files:
+                file.close()
+
+    ### PRIVATE #######################
+
+    def _frame(self, kind: bytes, payload: Union[bytes, memoryview]) -> None:
+        for file in self._files:
+            file.write(kind + _LENGTH.pack(len(payload)))
+            file.write(payload)
+            file.flush()
+
+
+class StreamReader:
+    """Iterates over the chunks of a streamed input as they arrive"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self._path = path
+
+    def __iter__(self) -> Iterator[Any]:
+        with open(self._path, "rb") as file:
+            while True:
+                kind = file.read(1)
+                if kind == _END:
+                    return
+                if kind not in (_ARRAY, _BYTES, _JSON):
+                    raise EOFError(f"Stream '{self.name}' ended before it was closed")
+
+                (length,) = _LENGTH.unpack(_read_exactly(file, _LENGTH.size))
+                payload = _read_exactly(file, length)
+                if kind == _ARRAY:
+                    import numpy as np
+
+                    yield np.lib.format.read_array(
+                        io.BytesIO(payload), allow_pickle=False
+                    )
+                else:
+                    yield payload if kind == _BYTES else json.loads(payload)
+
+
+def stream(name: str) -> StreamWriter:
+    """Open output `name` for streaming; use as a context manager"""
+    paths = json.loads(os.environ.get(STREAMS_ENV, "{}")).get(name)
+    if paths is None:
+        raise KeyError(f"No experiment streams output '{name}'")
+    return StreamWriter(name, paths)
+
+
+def _read_exactly(file: IO[bytes], size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise EOFError("Stream ended in the middle of a chunk")
+    return data
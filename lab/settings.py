@@ -1,7 +1,71 @@
 from pathlib import Path
-from pydantic_settings import BaseSettings
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="LAB_")
+
     root: Path = Path(__file__).parent.parent  # @bug: this won't work when installed
     spec_root: Path = root / "spec"
+
+    home: Path = Path("~/.local/lab")  # per-user data, logs and caches
+
+    parse_cache: bool = True
+    parse_cache_max_bytes: int = 256 * 1024 * 1024
+
+    sample_interval_seconds: float = 0.5  # resource sampling of running experiments
+
+    # Wall-clock limit for experiments that don't set `_timeout` (None: no limit)
+    experiment_timeout_seconds: Optional[float] = None
+
+    # Instrument readings kept per metric: raw samples, then (bucket seconds, buckets)
+    telemetry_buffer_samples: int = 65_536
+    telemetry_tiers: list[tuple[float, int]] = [(1.0, 86_400), (60.0, 43_200)]
+
+    metrics_flush_rows: int = 1000  # buffered rows before a Parquet file is written
+    metrics_compact_files: int = 16  # files in a partition before they are merged
+
+    # Experiments run in their own copy of the project directory, linked from a
+    # content-addressed store: "auto" (reflinks where supported, else hard links),
+    # "reflink", "hardlink" or "copy"
+    workspace_links: str = "auto"
+    workspace_retention: str = "failed"  # which workdirs to keep: always/failed/never
+    workspace_ignore: list[str] = [".git", ".venv", "__pycache__", "node_modules"]
+
+    # Garbage collection of run outputs, kept workspaces and stored project files
+    gc_budget_bytes: Optional[int] = None  # None: no limit
+    gc_keep_runs: int = 5  # most recent project runs that are never collected
+    gc_grace_seconds: float = 3600.0  # nothing used more recently is collected
+    gc_interval_seconds: Optional[float] = None  # also collect during `lab run`
+
+    # `lab watch`: changes are batched until files are quiet for the debounce time
+    watch_debounce_seconds: float = 0.2
+    watch_poll_interval_seconds: float = 0.5  # where inotify isn't available
+
+    # Distributed runs: a worker's leases expire without a heartbeat for this long
+    coordinator_heartbeat_seconds: float = 1.0
+    coordinator_lease_seconds: float = 5.0
+    coordinator_locality_wait_seconds: float = 0.5  # for the worker holding inputs
+    coordinator_max_attempts: int = 3
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.home.expanduser() / "cache"
+
+    @property
+    def data_dir(self) -> Path:
+        return self.home.expanduser() / "data"
+
+    @property
+    def artifacts_dir(self) -> Path:
+        return self.data_dir / "artifacts"
+
+    @property
+    def store_dir(self) -> Path:
+        return self.data_dir / "store"
+
+    @property
+    def workspaces_dir(self) -> Path:
+        return self.data_dir / "workspaces"
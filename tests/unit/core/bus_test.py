@@ -0,0 +1,32 @@
+import asyncio
+import logging
+
+import pytest
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.core.messaging.message import Message
+
+
+class Ping(Message):
+    pass
+
+
+def test_notifies_plain_and_coroutine_subscribers(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    bus = InMemoryMessageBus()
+    received: list[str] = []
+
+    def on_ping(_: Ping) -> None:
+        received.append("plain")
+
+    async def on_ping_async(_: Ping) -> None:
+        received.append("coroutine")
+
+    bus.subscribe(Ping, on_ping)
+    bus.subscribe(Ping, on_ping_async)
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(bus.publish(Ping()))
+
+    assert received == ["plain", "coroutine"]
+    assert not caplog.records
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from pathlib import Path
+
+from lab.core.tracing import Tracer
+
+
+def test_records_nothing_while_disabled(tmp_path: Path) -> None:
+    tracer = Tracer()
+
+    with tracer.span("parse"):
+        pass
+    tracer.open_track("t", "train")
+    tracer.transition("t", "running")
+    tracer.write(tmp_path / "trace.json")
+
+    assert tracer.span("a") is tracer.span("b")
+    assert json.loads((tmp_path / "trace.json").read_text())["traceEvents"] == []
+
+
+def test_writes_spans_as_chrome_trace_events(tmp_path: Path) -> None:
+    tracer = Tracer()
+    tracer.enable()
+
+    with tracer.span("parse", "phase", path="Labfile"):
+        pass
+    tracer.write(tmp_path / "trace.json")
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    (span,) = [e for e in events if e["ph"] == "X"]
+    assert span["name"] == "parse"
+    assert span["cat"] == "phase"
+    assert span["args"] == {"path": "Labfile"}
+    assert span["dur"] >= 0
+
+
+def test_draws_spans_in_a_task_on_its_track(tmp_path: Path) -> None:
+    tracer = Tracer()
+    tracer.enable()
+
+    async def experiment() -> None:
+        tracer.enter_track("t")
+        tracer.transition("t", "running")
+        with tracer.span("save"):
+            await asyncio.sleep(0)
+        tracer.transition("t", "persisting")
+        tracer.close_track("t", "train")
+
+    async def main() -> None:
+        tracer.open_track("t", "train")
+        tracer.transition("t", "queued")
+        await asyncio.create_task(experiment())
+        with tracer.span("outside"):
+            pass
+
+    asyncio.run(main())
+    tracer.write(tmp_path / "trace.json")
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    on_track = [(e["ph"], e["name"]) for e in events if e.get("id") == "t"]
+    assert sorted(on_track) == sorted(
+        [
+            ("b", "train"),
+            ("b", "queued"),
+            ("e", "queued"),
+            ("b", "running"),
+            ("b", "save"),
+            ("e", "save"),
+            ("e", "running"),
+            ("b", "persisting"),
+            ("e", "persisting"),
+            ("e", "train"),
+        ]
+    )
+    assert [e["name"] for e in events if e["ph"] == "X"] == ["outside"]
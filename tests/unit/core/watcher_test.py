@@ -0,0 +1,48 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from lab.core.watcher import FileWatcher
+
+
+async def _save_twice(path: Path) -> None:
+    """Save the way editors do: write a new file, then rename it over the old one"""
+    for content in ("one", "two"):
+        await asyncio.sleep(0.05)
+        partial = path.with_name(f".{path.name}.swp")
+        partial.write_text(content)
+        os.replace(partial, path)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_reports_debounced_changes(tmp_path: Path, use_inotify: bool) -> None:
+    """Saves in quick succession should come back as one batch of watched files"""
+    script = tmp_path / "train.py"
+    script.write_text("")
+    (tmp_path / "unwatched.py").write_text("")
+
+    async def main() -> set[Path]:
+        with FileWatcher(0.1, 0.05, use_inotify=use_inotify) as watcher:
+            watcher.watch([script])
+            saving = asyncio.ensure_future(_save_twice(script))
+            (tmp_path / "unwatched.py").write_text("changed")
+            changed = await asyncio.wait_for(watcher.changes(), 5)
+            assert saving.done()  # nothing comes back until the saves are over
+            return changed
+
+    assert asyncio.run(main()) == {script}
+
+
+def test_notices_files_created_after_watching(tmp_path: Path) -> None:
+    """A watched file that doesn't exist yet should be reported once created"""
+    labfile = tmp_path / "Labfile"
+
+    async def main() -> set[Path]:
+        with FileWatcher(0.05) as watcher:
+            watcher.watch([labfile])
+            asyncio.get_running_loop().call_later(0.05, labfile.write_text, "")
+            return await asyncio.wait_for(watcher.changes(), 5)
+
+    assert asyncio.run(main()) == {labfile}
@@ -0,0 +1,6 @@
+from lab.di import DI
+from lab.runtime.runtime import Runtime
+
+
+def test_container_resolves_runtime() -> None:
+    assert isinstance(DI().container.get(Runtime), Runtime)
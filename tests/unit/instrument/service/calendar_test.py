@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import ScriptExecution
+
+START = datetime(2025, 1, 1, 9)
+
+IMAGING = InstrumentCapability(
+    name="imaging", unit="nanometer", range=(200, 1000), precision=1
+)
+REQUIREMENTS = InstrumentRequirements(capabilities={IMAGING})
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = START
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def create_microscope() -> Instrument:
+    return Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.PHYSICAL,
+        capabilities={IMAGING},
+        status=InstrumentStatus.AVAILABLE,
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def hours(n: float) -> timedelta:
+    return timedelta(hours=n)
+
+
+def test_books_back_to_back_on_a_single_instrument(clock: FakeClock) -> None:
+    calendar = ReservationCalendar(InstrumentRegistry([create_microscope()]), clock)
+
+    first = calendar.reserve(uuid4(), REQUIREMENTS, hours(2))
+    second = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+
+    assert (first.acquired_at, first.released_at) == (START, START + hours(2))
+    assert second.acquired_at == START + hours(2)
+
+
+def test_backfills_gaps_without_delaying_earlier_reservations(
+    clock: FakeClock,
+) -> None:
+    microscope = create_microscope()
+    calendar = ReservationCalendar(InstrumentRegistry([microscope]), clock)
+
+    late = calendar.reserve(uuid4(), REQUIREMENTS, hours(2), earliest=START + hours(3))
+    long = calendar.reserve(uuid4(), REQUIREMENTS, hours(4))
+    short = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+
+    assert late.acquired_at == START + hours(3)
+    assert long.acquired_at == START + hours(5)
+    assert short.acquired_at == START
+    assert calendar.utilisation(hours(10))[microscope.id] == pytest.approx(0.7)
+
+
+def test_uses_whichever_instrument_frees_up_first(clock: FakeClock) -> None:
+    microscopes = [create_microscope(), create_microscope()]
+    calendar = ReservationCalendar(InstrumentRegistry(microscopes), clock)
+
+    first = calendar.reserve(uuid4(), REQUIREMENTS, hours(2))
+    second = calendar.reserve(uuid4(), REQUIREMENTS, hours(3))
+    third = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+
+    assert first.instrument is not second.instrument
+    assert second.acquired_at == START
+    assert (third.instrument, third.acquired_at) == (first.instrument, START + hours(2))
+
+
+def test_early_release_frees_the_rest_of_the_slot(clock: FakeClock) -> None:
+    calendar = ReservationCalendar(InstrumentRegistry([create_microscope()]), clock)
+    reservation = calendar.reserve(uuid4(), REQUIREMENTS, hours(4))
+
+    clock.now = START + hours(1)
+    calendar.release(reservation)
+
+    assert calendar.reserve(uuid4(), REQUIREMENTS, hours(1)).acquired_at == clock.now
+    assert reservation not in calendar.reservations(reservation.instrument)
+
+
+def test_rebooks_into_an_earlier_gap_and_holds_until_released(
+    clock: FakeClock,
+) -> None:
+    microscope = create_microscope()
+    calendar = ReservationCalendar(InstrumentRegistry([microscope]), clock)
+    experiment_id = uuid4()
+    first = calendar.reserve(uuid4(), REQUIREMENTS, hours(2))
+    booked = calendar.reserve(experiment_id, REQUIREMENTS, hours(1))
+    calendar.begin(first)
+
+    clock.now = START + hours(1)
+    calendar.release(first)
+    rebooked = calendar.rebook(experiment_id, REQUIREMENTS, hours(1))
+
+    assert booked.acquired_at == START + hours(2)
+    assert rebooked.acquired_at == clock.now
+    assert calendar.booking(experiment_id) is rebooked
+    assert calendar.due(rebooked)
+    calendar.begin(rebooked)
+    assert calendar.booking(experiment_id) is None
+    assert microscope.status == InstrumentStatus.IN_USE
+    assert not calendar.due(calendar.reserve(uuid4(), REQUIREMENTS, hours(1)))
+
+    calendar.release(rebooked, at=clock.now + hours(1))
+    assert microscope.status == InstrumentStatus.AVAILABLE
+
+
+def test_lists_upcoming_bookings_earliest_first(clock: FakeClock) -> None:
+    calendar = ReservationCalendar(InstrumentRegistry([create_microscope()]), clock)
+    first = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+    second = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+    third = calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+
+    assert calendar.upcoming() == [second, third]  # the first slot has come
+    calendar.cancel(second)
+    assert calendar.upcoming() == [third]
+    calendar.begin(first)
+    clock.now = START + hours(2)
+    assert calendar.upcoming() == []
+
+
+def test_rejects_requirements_no_exclusive_instrument_meets(clock: FakeClock) -> None:
+    calendar = ReservationCalendar(InstrumentRegistry(), clock)
+
+    with pytest.raises(ValueError):
+        calendar.reserve(uuid4(), REQUIREMENTS, hours(1))
+
+
+def test_books_plans_after_their_dependencies(clock: FakeClock) -> None:
+    def create_experiment(name: str, **refs: Experiment) -> Experiment:
+        return Experiment(
+            id=uuid4(),
+            name=name,
+            execution_method=ScriptExecution(command="true", args=[]),
+            requirements=REQUIREMENTS if name != "prepare" else None,
+            parameters={
+                key: ValueReference(owner=owner, attribute="output")
+                for key, owner in refs.items()
+            },
+        )
+
+    prepare = create_experiment("prepare")
+    image = create_experiment("image", sample=prepare)
+    project = Project(experiments={prepare, image})
+    plan = PlanService().create_execution_plan(project, DurationEstimator(default=3600))
+    calendar = ReservationCalendar(InstrumentRegistry([create_microscope()]), clock)
+
+    reservations = calendar.reserve_plan(plan)
+
+    assert set(reservations) == {image.id}
+    assert reservations[image.id].acquired_at == START + hours(1)
@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.pool import ResourcePool
+from lab.instrument.service.registry import InstrumentRegistry
+
+GPU_MEMORY = InstrumentCapability(
+    name="accelerator_memory", unit="gigabyte", range=(0, 80), precision=1
+)
+
+
+def create_instrument() -> Instrument:
+    return Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.COMPUTE,
+        capabilities={GPU_MEMORY},
+        status=InstrumentStatus.AVAILABLE,
+    )
+
+
+def test_acquires_all_or_nothing() -> None:
+    pool = ResourcePool(cpus=4, memory_bytes=1000)
+
+    assert pool.try_acquire(InstrumentRequirements(cpus=2, memory_bytes=2000)) is None
+    assert (pool.free_cpus, pool.free_memory_bytes) == (4, 1000)
+
+
+def test_claims_matching_instrument_until_released() -> None:
+    instrument = create_instrument()
+    pool = ResourcePool(
+        cpus=4, memory_bytes=1000, registry=InstrumentRegistry([instrument])
+    )
+    requirements = InstrumentRequirements(
+        capabilities={
+            InstrumentCapability(
+                name="accelerator_memory", unit="gigabyte", range=(0, 40), precision=1
+            )
+        }
+    )
+
+    allocation = pool.try_acquire(requirements)
+    assert allocation is not None
+    (claim,) = allocation.claims
+    assert claim.instrument is instrument
+    assert instrument.status == InstrumentStatus.IN_USE
+    assert pool.try_acquire(requirements) is None
+
+    pool.release(allocation)
+
+    assert claim.released_at is not None
+    assert instrument.status == InstrumentStatus.AVAILABLE
+    assert pool.free_cpus == 4
+
+
+def test_explains_requirements_it_can_never_meet() -> None:
+    pool = ResourcePool(cpus=2, memory_bytes=1000)
+
+    assert "needs 4 CPUs" in (pool.check(InstrumentRequirements(cpus=4)) or "")
+    assert "capabilities" in (
+        pool.check(InstrumentRequirements(capabilities={GPU_MEMORY})) or ""
+    )
+    assert pool.check(InstrumentRequirements(cpus=2)) is None
+
+
+def test_leaves_exclusive_instruments_to_the_calendar() -> None:
+    sensor = create_instrument().model_copy(update={"kind": InstrumentKind.SENSOR})
+    pool = ResourcePool(
+        cpus=2, memory_bytes=1000, registry=InstrumentRegistry([sensor])
+    )
+    requirements = InstrumentRequirements(capabilities={GPU_MEMORY})
+
+    assert "capabilities" in (pool.check(requirements) or "")
+    assert pool.try_acquire(requirements) is None
+    assert sensor.status == InstrumentStatus.AVAILABLE
@@ -0,0 +1,104 @@
+import random
+from uuid import uuid4
+
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.registry import InstrumentRegistry
+
+
+def capability(
+    low: float, high: float, precision: float, name: str = "temperature"
+) -> InstrumentCapability:
+    return InstrumentCapability(
+        name=name, unit="celsius", range=(low, high), precision=precision
+    )
+
+
+def create_instrument(*capabilities: InstrumentCapability) -> Instrument:
+    return Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.SENSOR,
+        capabilities=set(capabilities),
+        status=InstrumentStatus.AVAILABLE,
+    )
+
+
+def requires(*capabilities: InstrumentCapability) -> InstrumentRequirements:
+    return InstrumentRequirements(capabilities=set(capabilities))
+
+
+def test_matches_range_and_precision() -> None:
+    wide = create_instrument(capability(-50, 150, 0.5))
+    precise = create_instrument(capability(0, 100, 0.01))
+    narrow = create_instrument(capability(20, 30, 0.01))
+    registry = InstrumentRegistry([wide, precise, narrow])
+
+    assert registry.match(requires(capability(10, 90, 1))) == [wide, precise]
+    assert registry.match(requires(capability(10, 90, 0.1))) == [precise]
+    assert registry.match(requires(capability(-40, 0, 0.1))) == []
+
+
+def test_requires_every_capability_from_one_instrument() -> None:
+    both = create_instrument(
+        capability(0, 100, 0.1), capability(0, 10, 0.1, "pressure")
+    )
+    temperature = create_instrument(capability(0, 100, 0.1))
+    registry = InstrumentRegistry([both, temperature])
+
+    assert registry.match(
+        requires(capability(0, 50, 1), capability(0, 5, 1, "pressure"))
+    ) == [both]
+
+
+def test_tracks_availability_incrementally() -> None:
+    instrument = create_instrument(capability(0, 100, 0.1))
+    registry = InstrumentRegistry([instrument])
+    requirements = requires(capability(0, 50, 1))
+
+    registry.set_status(instrument, InstrumentStatus.IN_USE)
+    assert registry.match(requirements) == []
+    assert registry.match(requirements, available=False) == [instrument]
+
+    registry.set_status(instrument, InstrumentStatus.AVAILABLE)
+    assert registry.match(requirements) == [instrument]
+
+    registry.unregister(instrument.id)
+    assert registry.match(requirements, available=False) == []
+
+
+def test_agrees_with_a_full_scan() -> None:
+    rng = random.Random(7)
+
+    def random_capability() -> InstrumentCapability:
+        low = rng.randint(-100, 100)
+        return capability(
+            low, low + rng.randint(1, 200), rng.choice([0.01, 0.1, 1]), rng.choice("ab")
+        )
+
+    instruments = [
+        create_instrument(*(random_capability() for _ in range(rng.randint(1, 3))))
+        for _ in range(300)
+    ]
+    registry = InstrumentRegistry(instruments)
+    for instrument in instruments[::3]:
+        registry.set_status(instrument, InstrumentStatus.IN_USE)
+
+    for _ in range(100):
+        requirements = requires(
+            *(random_capability() for _ in range(rng.randint(1, 2)))
+        )
+        expected = [
+            instrument
+            for instrument in instruments
+            if instrument.status == InstrumentStatus.AVAILABLE
+            and all(
+                any(have.satisfies(need) for have in instrument.capabilities)
+                for need in requirements.capabilities
+            )
+        ]
+        assert registry.match(requirements) == expected
@@ -0,0 +1,84 @@
+from datetime import datetime
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from lab.instrument.model.instrument import Instrument, InstrumentKind, InstrumentStatus
+from lab.instrument.service.telemetry import RingBuffer, TelemetryService
+from lab.settings import Settings
+
+THERMOMETER = Instrument(
+    id=uuid4(),
+    kind=InstrumentKind.SENSOR,
+    capabilities=set(),
+    status=InstrumentStatus.AVAILABLE,
+)
+
+
+@pytest.fixture
+def telemetry() -> TelemetryService:
+    return TelemetryService(
+        Settings(telemetry_buffer_samples=1000, telemetry_tiers=[(1.0, 100)])
+    )
+
+
+def test_ring_buffer_keeps_newest_rows_in_order() -> None:
+    buffer = RingBuffer(capacity=5, columns=1)
+
+    buffer.extend(np.arange(3.0))
+    buffer.extend(np.arange(3.0, 7.0))
+
+    assert buffer.columns()[0].tolist() == [2, 3, 4, 5, 6]
+
+    buffer.extend(np.arange(7.0, 20.0))
+    assert buffer.columns()[0].tolist() == [15, 16, 17, 18, 19]
+
+
+def test_downsamples_across_batches(telemetry: TelemetryService) -> None:
+    # 1kHz for three seconds, in batches that split buckets
+    timestamps = np.arange(3000) / 1000
+    values = np.arange(3000, dtype=float)
+    for batch in np.array_split(np.arange(3000), 7):
+        telemetry.record(THERMOMETER, "temperature", timestamps[batch], values[batch])
+
+    starts, means = telemetry.samples(THERMOMETER, "temperature", resolution=1.0)
+    _, highs = telemetry.samples(
+        THERMOMETER, "temperature", resolution=1.0, aggregate="max"
+    )
+
+    assert starts.tolist() == [0.0, 1.0, 2.0]
+    assert means.tolist() == [499.5, 1499.5, 2499.5]
+    assert highs.tolist() == [999, 1999, 2999]
+
+
+def test_falls_back_to_tiers_once_raw_samples_are_overwritten(
+    telemetry: TelemetryService,
+) -> None:
+    telemetry.record(THERMOMETER, "temperature", np.arange(5000) / 1000, np.ones(5000))
+
+    recent, _ = telemetry.samples(THERMOMETER, "temperature")
+    history, _ = telemetry.samples(
+        THERMOMETER, "temperature", start=datetime.fromtimestamp(0)
+    )
+
+    assert len(recent) == 1000
+    assert history.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_materialises_metrics_when_queried(telemetry: TelemetryService) -> None:
+    telemetry.record(THERMOMETER, "temperature", [10.0, 10.5], [20.0, 21.0], "celsius")
+
+    metrics = telemetry.query(THERMOMETER, "temperature")
+
+    assert [m.value for m in metrics] == [20.0, 21.0]
+    assert metrics[0].unit == "celsius"
+    assert metrics[0].instrument is THERMOMETER
+    assert telemetry.query(THERMOMETER, "pressure") == []
+
+
+def test_rejects_out_of_order_samples(telemetry: TelemetryService) -> None:
+    telemetry.record(THERMOMETER, "temperature", [2.0], [1.0])
+
+    with pytest.raises(ValueError):
+        telemetry.record(THERMOMETER, "temperature", [1.0], [1.0])
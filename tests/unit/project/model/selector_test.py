@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+import pytest
+
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.model.selector import Selector, select
+from lab.runtime.model.execution import ScriptExecution
+
+
+def create_experiment(name: str, *upstream: Experiment) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="echo", args=[name]),
+        parameters={
+            f"input{i}": ValueReference(owner=owner, attribute="output")
+            for i, owner in enumerate(upstream)
+        },
+    )
+
+
+@pytest.fixture
+def project() -> Project:
+    """prepare -> train -> single_reach, train -> multi_reach, plus unrelated"""
+    prepare = create_experiment("prepare")
+    train = create_experiment("train", prepare)
+    single = create_experiment("single_reach", train)
+    multi = create_experiment("multi_reach", train)
+    unrelated = create_experiment("unrelated")
+    return Project(experiments={prepare, train, single, multi, unrelated})
+
+
+def names(project: Project) -> set[str]:
+    return {exp.name for exp in project.experiments}
+
+
+def test_parses_selector_syntax() -> None:
+    selector = Selector.parse("+train+")
+
+    assert selector.pattern == "train"
+    assert selector.ancestors and selector.descendants
+    assert str(selector) == "+train+"
+
+
+def test_selects_descendants(project: Project) -> None:
+    assert names(select(project, ["train+"])) == {
+        "train",
+        "single_reach",
+        "multi_reach",
+    }
+
+
+def test_selects_ancestors(project: Project) -> None:
+    assert names(select(project, ["+single_reach"])) == {
+        "prepare",
+        "train",
+        "single_reach",
+    }
+
+
+def test_selects_union_of_globs(project: Project) -> None:
+    assert names(select(project, ["*_reach", "unrelated"])) == {
+        "single_reach",
+        "multi_reach",
+        "unrelated",
+    }
+
+
+def test_subproject_drops_dependencies_outside_selection(project: Project) -> None:
+    subproject = select(project, ["single_reach"])
+    (single,) = subproject.experiments
+
+    assert subproject.dependencies_of(single) == ()
+    assert project.dependencies_of(single) == (project.get("train"),)
+
+
+def test_rejects_selector_matching_nothing(project: Project) -> None:
+    with pytest.raises(ValueError, match="No experiments match"):
+        select(project, ["missing+"])
@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from lab.project.persistence.cache import ParseCache
+
+
+def test_round_trips_entries(tmp_path: Path) -> None:
+    cache = ParseCache(tmp_path, max_bytes=1024)
+
+    cache.put("key", b"data")
+
+    assert cache.get("key") == b"data"
+    assert cache.get("missing") is None
+
+
+def test_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ParseCache(tmp_path, max_bytes=25)
+    cache.put("old", b"x" * 10)
+    cache.put("recent", b"x" * 10)
+    os.utime(tmp_path / "old", (0, 0))
+    os.utime(tmp_path / "recent", (1, 1))
+    cache.get("old")  # now the most recently used
+
+    cache.put("new", b"x" * 10)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new", "old"]
+
+
+def test_does_nothing_when_disabled(tmp_path: Path) -> None:
+    cache = ParseCache(tmp_path / "cache", max_bytes=1024, enabled=False)
+
+    cache.put("key", b"data")
+
+    assert cache.get("key") is None
+    assert not (tmp_path / "cache").exists()
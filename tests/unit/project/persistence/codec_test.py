@@ -0,0 +1,83 @@
+from uuid import uuid4
+
+import pytest
+
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.persistence.codec import (
+    PLAN,
+    PROJECT,
+    CodecError,
+    decode_plan,
+    encode_plan,
+    pack,
+    unpack,
+)
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import LocalFunctionExecution, ScriptExecution
+
+
+def create_experiment(name: str, **parameters) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="python", args=[f"{name}.py"]),
+        parameters=parameters,
+    )
+
+
+def test_round_trips_plan() -> None:
+    """A decoded plan should have the same experiments, order and estimates"""
+    train = create_experiment("train", epochs=100, lr=0.0005, optimiser="adam")
+    reach = create_experiment(
+        "single_reach", network=ValueReference(owner=train, attribute="train.network")
+    )
+    plan = PlanService().create_execution_plan(
+        Project(experiments={train, reach}), DurationEstimator(default=3)
+    )
+
+    metadata, body = unpack(pack(PLAN, {"source": "Labfile"}, encode_plan(plan)), PLAN)
+    decoded = decode_plan(body)
+
+    assert metadata == {"source": "Labfile"}
+    assert decoded.id == plan.id
+    assert [e.name for e in decoded.ordered_experiments] == ["train", "single_reach"]
+    decoded_train, decoded_reach = decoded.ordered_experiments
+    assert decoded_train.parameters == train.parameters
+    assert decoded_train.execution_method == train.execution_method
+    assert decoded_reach.parameters["network"].owner is decoded_train
+    assert decoded.project.dependents_of(decoded_train) == (decoded_reach,)
+    assert decoded.ranks == plan.ranks
+    assert decoded.critical_path == plan.critical_path
+    assert decoded_reach.fingerprint == reach.fingerprint
+
+
+def test_round_trips_merged_experiments() -> None:
+    """Aliases should decode as copies of the experiment they were merged into"""
+    prepare = create_experiment("prepare", seed=1)
+    again = prepare.model_copy(update={"id": uuid4(), "name": "prepare_again"})
+    plan = PlanService().create_execution_plan(Project(experiments={prepare, again}))
+
+    decoded = decode_plan(unpack(pack(PLAN, {}, encode_plan(plan)), PLAN)[1])
+
+    (alias,) = decoded.aliases[prepare.id]
+    assert (alias.id, alias.name) == (again.id, "prepare_again")
+    assert alias.parameters == prepare.parameters
+
+
+def test_rejects_wrong_kind() -> None:
+    with pytest.raises(CodecError, match="Expected a PLAN file"):
+        unpack(pack(PROJECT, {}, ()), PLAN)
+
+
+def test_rejects_unserializable_execution_method() -> None:
+    experiment = Experiment(
+        id=uuid4(),
+        name="local",
+        execution_method=LocalFunctionExecution(func=print, is_async=False),
+        parameters={},
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={experiment}))
+
+    with pytest.raises(CodecError, match="can't be serialized"):
+        encode_plan(plan)
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+import lab
+from lab.project.persistence.cache import ParseCache
+from lab.project.service.artifact import PlanArtifactService, StalePlanError
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.labfile import LabfileService
+from lab.project.service.plan import PlanService
+
+LABFILE = """
+EXPERIMENT SupervisedTraining AS train
+    VIA exp1.py
+    WITH
+        epochs  100
+
+EXPERIMENT SimulateReach AS reach
+    VIA exp2.py
+    WITH
+        network @train.network
+"""
+
+
+@pytest.fixture
+def labfile_service(tmp_path: Path) -> LabfileService:
+    return LabfileService(ParseCache(tmp_path / "cache", max_bytes=1 << 20))
+
+
+@pytest.fixture
+def service(labfile_service: LabfileService) -> PlanArtifactService:
+    return PlanArtifactService(labfile_service)
+
+
+@pytest.fixture
+def labfile(tmp_path: Path) -> Path:
+    path = tmp_path / "Labfile"
+    path.write_text(LABFILE)
+    return path
+
+
+def save_plan(
+    service: PlanArtifactService, labfile_service: LabfileService, labfile: Path
+) -> Path:
+    """What `lab plan LABFILE -o plan.lab` does"""
+    plan = PlanService().create_execution_plan(
+        labfile_service.parse(labfile), DurationEstimator(default=5)
+    )
+    destination = labfile.parent / "plan.lab"
+    service.save(plan, source=labfile, destination=destination)
+    return destination
+
+
+def test_loads_a_saved_plan(
+    service: PlanArtifactService, labfile_service: LabfileService, labfile: Path
+) -> None:
+    path = save_plan(service, labfile_service, labfile)
+
+    plan = service.load(path)
+
+    assert [e.name for e in plan.ordered_experiments] == ["train", "reach"]
+    assert [e.name for e in plan.critical_path] == ["train", "reach"]
+    reach = plan.project.get("reach")
+    train = plan.project.get("train")
+    assert reach is not None and train is not None
+    assert reach.dependencies == {train}
+    assert plan.estimates == {train.id: 5, reach.id: 5}
+
+
+def test_rejects_a_plan_whose_labfile_changed(
+    service: PlanArtifactService, labfile_service: LabfileService, labfile: Path
+) -> None:
+    path = save_plan(service, labfile_service, labfile)
+    labfile.write_text(LABFILE.replace("100", "200"))
+
+    with pytest.raises(StalePlanError, match="has changed"):
+        service.load(path)
+
+
+def test_rejects_a_plan_from_another_lab_version(
+    service: PlanArtifactService,
+    labfile_service: LabfileService,
+    labfile: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    path = save_plan(service, labfile_service, labfile)
+    monkeypatch.setattr(lab, "__version__", "0.0.0-other")
+
+    with pytest.raises(StalePlanError, match="compiled by lab"):
+        service.load(path)
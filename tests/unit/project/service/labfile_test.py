@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import pytest
+
+import lab.project.service.labfile as labfile_module
+from lab.project.persistence.cache import ParseCache
+from lab.project.persistence.codec import PROJECT, pack
+from lab.project.service.labfile import LabfileService
+
+TRAIN = """
+EXPERIMENT SupervisedTraining AS train
+    VIA exp1.py
+    WITH
+        epochs  100
+"""
+
+REACH = """
+EXPERIMENT SimulateReach AS single_reach
+    VIA exp2.py
+    WITH
+        network @train.network
+"""
+
+
+@pytest.fixture
+def service(tmp_path: Path) -> LabfileService:
+    return LabfileService(ParseCache(tmp_path / "cache", max_bytes=1 << 20))
+
+
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    (root / "reach").mkdir(parents=True)
+    (root / "Labfile").write_text(TRAIN)
+    (root / "reach" / "reach.labfile").write_text(REACH)
+    return root
+
+
+def test_resolves_references_across_files(
+    service: LabfileService, project_dir: Path
+) -> None:
+    project = service.parse(project_dir)
+
+    reach = project.get("single_reach")
+    assert reach is not None
+    assert project.dependencies_of(reach) == (project.get("train"),)
+
+
+def test_rejects_duplicate_names_across_files(
+    service: LabfileService, project_dir: Path
+) -> None:
+    (project_dir / "copy.labfile").write_text(TRAIN)
+
+    with pytest.raises(ValueError, match="'train' is defined in both"):
+        service.parse(project_dir)
+
+
+def test_only_reparses_changed_files(
+    service: LabfileService, project_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service.parse(project_dir)
+    parsed: list[Path] = []
+    parse_file = labfile_module._parse_file
+
+    def tracking_parse_file(path: Path) -> list[tuple]:
+        parsed.append(path)
+        return parse_file(path)
+
+    monkeypatch.setattr(labfile_module, "_parse_file", tracking_parse_file)
+    (project_dir / "Labfile").write_text(TRAIN.replace("100", "200"))
+
+    project = service.parse(project_dir)
+
+    assert parsed == [project_dir / "Labfile"]
+    train = project.get("train")
+    assert train is not None and train.parameters["epochs"] == 200
+
+
+def test_cached_project_matches_parsed_project(
+    service: LabfileService, project_dir: Path
+) -> None:
+    parsed = service.parse(project_dir, use_cache=False)
+    service.parse(project_dir)
+    cached = service.parse(project_dir)
+
+    assert {e.fingerprint for e in cached.experiments} == {
+        e.fingerprint for e in parsed.experiments
+    }
+
+
+def test_discards_cached_bodies_of_the_wrong_shape(
+    service: LabfileService, tmp_path: Path
+) -> None:
+    labfile = tmp_path / "Labfile"
+    labfile.write_text(TRAIN)
+    key = service._cache_key("project", service.digest(labfile))
+    service._cache.put(key, pack(PROJECT, {}, ["not", "a", "project"]))
+
+    project = service.parse(labfile)
+
+    assert project.get("train") is not None
+    assert service.parse(labfile).get("train") is not None
+
+
+def test_discards_cached_bodies_that_fail_to_decode(
+    service: LabfileService, tmp_path: Path
+) -> None:
+    labfile = tmp_path / "Labfile"
+    labfile.write_text(TRAIN)
+    key = service._cache_key("project", service.digest(labfile))
+    service._cache.put(key, pack(PROJECT, {}, ([("truncated",)], [0])))
+
+    project = service.parse(labfile)
+
+    assert project.get("train") is not None
+    assert service.parse(labfile).get("train") is not None
+
+
+def test_reads_runtime_limits_from_reserved_parameters(
+    service: LabfileService, tmp_path: Path
+) -> None:
+    (tmp_path / "Labfile").write_text(
+        TRAIN.replace(
+            "epochs  100", "epochs  100\n        _timeout 3600\n        _heartbeat 60"
+        )
+    )
+
+    train = service.parse(tmp_path).get("train")
+
+    assert train is not None
+    assert train.parameters == {"epochs": 100}
+    assert (train.timeout_seconds, train.heartbeat_seconds) == (3600.0, 60.0)
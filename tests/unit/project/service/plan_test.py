@@ -1,10 +1,14 @@
+from datetime import datetime, timedelta
+from pathlib import Path
 from uuid import UUID, uuid4
 import pytest
 
 from lab.project.model.project import Experiment, Project, ValueReference
 from lab.project.model.plan import ExecutionPlan
+from lab.project.service.estimate import DurationEstimator
 from lab.project.service.plan import PlanService
-from lab.runtime.model.execution import ScriptExecution
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun, RunStatus
 
 
 @pytest.fixture
@@ -17,7 +21,7 @@ def create_experiment(name: str) -> Experiment:
     return Experiment(
         id=uuid4(),
         name=name,
-        execution_method=ScriptExecution(command="echo", args=["test"]),
+        execution_method=ScriptExecution(command="echo", args=[name]),
         parameters={},
     )
 
@@ -92,3 +96,133 @@ def test_handles_complex_dependencies(plan_service: PlanService) -> None:
     assert plan.ordered_experiments[-1] == exp4
     # exp2 and exp3 can be in either order
     assert set(plan.ordered_experiments[1:3]) == {exp2, exp3}
+
+
+def test_merges_identical_experiments(plan_service: PlanService) -> None:
+    """Identical experiments should run once, with dependents rewired to it"""
+    prepare = create_experiment("prepare")
+    prepare_copy = prepare.model_copy(update={"id": uuid4(), "name": "prepare_copy"})
+    train = create_experiment("train")
+    train.parameters["data"] = ValueReference(
+        owner=prepare_copy, attribute="prepare_copy.data"
+    )
+    project = Project(experiments={prepare, prepare_copy, train})
+
+    plan = plan_service.create_execution_plan(project)
+
+    assert [e.name for e in plan.ordered_experiments] == ["prepare", "train"]
+    rewired = plan.ordered_experiments[1]
+    assert rewired.id == train.id
+    assert rewired.parameters["data"].owner is plan.ordered_experiments[0]
+    assert rewired.parameters["data"].output == "data"
+    assert rewired.fingerprint == train.fingerprint
+    assert [a.name for a in plan.aliases[prepare.id]] == ["prepare_copy"]
+    assert "Also runs as: prepare_copy" in str(plan)
+
+
+def test_merges_identical_pipelines(plan_service: PlanService) -> None:
+    """Experiments with identical upstreams should merge along with them"""
+    prepare = create_experiment("a_prepare")
+    train = create_experiment("a_train")
+    train.parameters["data"] = ValueReference(owner=prepare, attribute="data")
+    prepare_copy = prepare.model_copy(update={"id": uuid4(), "name": "b_prepare"})
+    train_copy = train.model_copy(update={"id": uuid4(), "name": "b_train"})
+    train_copy.parameters = {
+        "data": ValueReference(owner=prepare_copy, attribute="data")
+    }
+    project = Project(experiments={prepare, train, prepare_copy, train_copy})
+
+    plan = plan_service.create_execution_plan(project)
+
+    assert plan.ordered_experiments == [prepare, train]
+    assert [a.name for a in plan.aliases[train.id]] == ["b_train"]
+    assert plan.aliases[train.id][0].parameters["data"].owner is prepare
+
+
+def test_ranks_experiments_by_critical_path(plan_service: PlanService) -> None:
+    """Should rank each experiment by the longest estimated path to the end"""
+    exp1 = create_experiment("exp1")
+    exp2 = create_experiment("exp2")
+    exp3 = create_experiment("exp3")
+    exp2.parameters["input"] = ValueReference(owner=exp1, attribute="output")
+    exp3.parameters["input"] = ValueReference(owner=exp2, attribute="output")
+    project = Project(experiments={exp1, exp2, exp3})
+
+    plan = plan_service.create_execution_plan(project, DurationEstimator(default=10))
+
+    assert plan.priority(exp1) == 30
+    assert plan.priority(exp2) == 20
+    assert plan.priority(exp3) == 10
+    assert plan.critical_path == [exp1, exp2, exp3]
+    assert plan.makespan == 30
+
+
+def test_ranks_streamed_experiments_from_their_producers_start(
+    plan_service: PlanService,
+) -> None:
+    """Should overlap streamed experiments with their producer"""
+    exp1 = create_experiment("exp1")
+    exp2 = create_experiment("exp2")
+    exp3 = create_experiment("exp3")
+    exp2.parameters["input"] = ValueReference(
+        owner=exp1, attribute="output", stream=True
+    )
+    exp3.parameters["input"] = ValueReference(owner=exp2, attribute="output")
+    project = Project(experiments={exp1, exp2, exp3})
+
+    plan = plan_service.create_execution_plan(project, DurationEstimator(default=10))
+
+    assert {frozenset(group) for group in project.stream_groups()} == {
+        frozenset({exp1, exp2}),
+        frozenset({exp3}),
+    }
+    assert plan.priority(exp1) == 20
+    assert plan.priority(exp2) == 20
+
+
+def test_rejects_streams_between_experiments_that_wait_on_each_other(
+    plan_service: PlanService,
+) -> None:
+    """Should refuse a stream group whose members also wait on one another"""
+    exp1 = create_experiment("exp1")
+    exp2 = create_experiment("exp2")
+    exp3 = create_experiment("exp3")
+    exp2.parameters["input"] = ValueReference(owner=exp1, attribute="output")
+    exp3.parameters["input"] = ValueReference(owner=exp2, attribute="output")
+    exp3.parameters["raw"] = ValueReference(owner=exp1, attribute="raw", stream=True)
+    project = Project(experiments={exp1, exp2, exp3})
+
+    with pytest.raises(ValueError, match="'exp3' streams with exp1 but also waits"):
+        plan_service.create_execution_plan(project)
+
+
+def test_estimates_durations_from_history(plan_service: PlanService) -> None:
+    """Should estimate durations from completed runs of the same definition"""
+    slow = create_experiment("slow")
+    fast = Experiment(
+        id=uuid4(),
+        name="fast",
+        execution_method=ScriptExecution(command="echo", args=["fast"]),
+        parameters={},
+    )
+    project = Project(experiments={slow, fast})
+    project_run = ProjectRun(project=project)
+    started = datetime(2024, 1, 1)
+    history = [
+        ExperimentRun(
+            experiment=create_experiment("slow"),  # same definition, new id
+            project_run=project_run,
+            context=ExecutionContext(working_dir=Path(".")),
+            status=RunStatus.COMPLETED,
+            started_at=started,
+            completed_at=started + timedelta(seconds=120),
+        )
+    ]
+
+    plan = plan_service.create_execution_plan(
+        project, DurationEstimator(history, default=5)
+    )
+
+    assert plan.estimates[slow.id] == 120
+    assert plan.estimates[fast.id] == 5
+    assert plan.critical_path == [slow]
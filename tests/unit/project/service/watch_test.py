@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from lab.project.persistence.cache import ParseCache
+from lab.project.service.labfile import LabfileService
+from lab.project.service.watch import ProjectWatch
+from lab.runtime.model.execution import ExecutionContext
+from lab.runtime.model.run import ExperimentRun, ProjectRun, RunStatus
+
+LABFILE = """
+EXPERIMENT Prepare AS prepare
+    VIA prepare.py
+    WITH
+        size  10
+
+EXPERIMENT Train AS train
+    VIA train.py
+    WITH
+        data @prepare.data
+
+EXPERIMENT Evaluate AS evaluate
+    VIA evaluate.py
+    WITH
+        model @train.model
+
+EXPERIMENT Baseline AS baseline
+    VIA baseline.py
+    WITH
+        data @prepare.data
+"""
+
+
+@pytest.fixture
+def watch(tmp_path: Path) -> ProjectWatch:
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "Labfile").write_text(LABFILE)
+    for script in ("prepare", "train", "evaluate", "baseline"):
+        (root / f"{script}.py").write_text("")
+    service = LabfileService(ParseCache(tmp_path / "cache", max_bytes=1 << 20))
+    watch = ProjectWatch(service, root)
+    watch.load()
+    return watch
+
+
+def names(experiments) -> set[str]:
+    return {exp.name for exp in experiments}
+
+
+def test_watches_labfiles_and_scripts(watch: ProjectWatch) -> None:
+    assert {path.name for path in watch.files()} == {
+        "Labfile",
+        "prepare.py",
+        "train.py",
+        "evaluate.py",
+        "baseline.py",
+    }
+
+
+def test_script_change_affects_its_experiments_and_downstream(
+    watch: ProjectWatch,
+) -> None:
+    """A script change shouldn't parse again, only look up the project in memory"""
+    project = watch.project
+
+    affected = watch.affected({watch.source / "train.py"})
+
+    assert names(affected) == {"train", "evaluate"}
+    assert watch.project is project
+
+
+def test_labfile_change_affects_changed_definitions(watch: ProjectWatch) -> None:
+    labfile = watch.source / "Labfile"
+    labfile.write_text(LABFILE.replace("model @train.model", "model @baseline.data"))
+
+    assert names(watch.affected({labfile})) == {"evaluate"}
+
+
+def test_runs_unfinished_experiments_again(watch: ProjectWatch) -> None:
+    """Experiments that failed or never started should be affected by any change"""
+    project = watch.project
+    project_run = ProjectRun(project=project)
+    for name, status in (("prepare", RunStatus.COMPLETED), ("train", RunStatus.FAILED)):
+        experiment = project.get(name)
+        assert experiment is not None
+        project_run.experiment_runs.append(
+            ExperimentRun(
+                experiment=experiment,
+                project_run=project_run,
+                context=ExecutionContext(working_dir=watch.source),
+                status=status,
+            )
+        )
+    watch.finished(project.experiments, project_run)
+
+    affected = watch.affected({watch.source / "baseline.py"})
+
+    assert names(affected) == {"train", "evaluate", "baseline"}
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from lab.runtime.http import HttpClient
+from lab.runtime.model.execution import APIExecution, ExecutionContext
+from lab.sdk.artifacts import ARTIFACTS_ENV, MANIFEST
+
+
+class StandIn(ThreadingHTTPServer):
+    """Records what an instrument's HTTP API would have been asked"""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.connections = 0
+        self.requests: list[tuple[str, str, object]] = []
+        self.failures_left = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are written separately
+    server: StandIn
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *_) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_request()
+
+    def do_POST(self) -> None:
+        self.handle_request()
+
+    def handle_request(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, body))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failing = self.path.startswith("/flaky") and server.failures_left > 0
+            server.failures_left -= failing
+
+        if self.path.startswith("/slow"):
+            time.sleep(0.1)
+        if failing:
+            self.reply(503, {"error": "busy"})
+        elif self.path.startswith("/double"):
+            self.reply(200, [item["value"] * 2 for item in body])
+        else:
+            self.reply(200, {"method": self.command, "path": self.path, "body": body})
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def reply(self, status: int, value: object) -> None:
+        data = json.dumps(value).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server() -> Iterator[StandIn]:
+    server = StandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_reuses_connections(server: StandIn) -> None:
+    async def main() -> list:
+        client = HttpClient()
+        responses = [await client.request("GET", f"{server.url}/a") for _ in range(20)]
+        await client.close()
+        return responses
+
+    responses = asyncio.run(main())
+
+    assert all(r.ok for r in responses)
+    assert responses[0].json_body() == {"method": "GET", "path": "/a", "body": None}
+    assert server.connections == 1
+
+
+def test_sends_payload_as_query_or_json_body(server: StandIn) -> None:
+    async def main() -> tuple:
+        client = HttpClient()
+        get = await client.request("GET", f"{server.url}/q", {"n": 3})
+        post = await client.request("POST", f"{server.url}/q", {"n": 3})
+        return get.json_body(), post.json_body()
+
+    get, post = asyncio.run(main())
+
+    assert get["path"] == "/q?n=3" and get["body"] is None
+    assert post["path"] == "/q" and post["body"] == {"n": 3}
+
+
+def test_retries_idempotent_requests_only(server: StandIn) -> None:
+    server.failures_left = 2
+
+    async def main() -> tuple[int, int]:
+        client = HttpClient()
+        post = await client.request("POST", f"{server.url}/flaky")
+        get = await client.request("GET", f"{server.url}/flaky")
+        return post.status, get.status
+
+    assert asyncio.run(main()) == (503, 200)
+    assert len(server.requests) == 3
+
+
+def test_times_out_slow_requests(server: StandIn) -> None:
+    async def main() -> None:
+        await HttpClient().request("POST", f"{server.url}/slow", timeout=0.02)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+
+
+def test_limits_requests_in_flight_per_endpoint(server: StandIn) -> None:
+    async def main() -> None:
+        client = HttpClient()
+        await asyncio.gather(
+            *(
+                client.request("GET", f"{server.url}/slow", concurrency=2)
+                for _ in range(6)
+            )
+        )
+
+    asyncio.run(main())
+
+    assert server.max_in_flight == 2
+
+
+def test_batches_payloads_for_the_same_endpoint(
+    server: StandIn, tmp_path: Path
+) -> None:
+    def execution(value: int) -> APIExecution:
+        return APIExecution(
+            endpoint=f"{server.url}/double",
+            method="POST",
+            payload={"value": value},
+            batch_size=4,
+            batch_linger_seconds=0.5,
+        )
+
+    contexts = [
+        ExecutionContext(
+            working_dir=tmp_path, env_vars={ARTIFACTS_ENV: str(tmp_path / str(i))}
+        )
+        for i in range(4)
+    ]
+
+    async def main() -> None:
+        await asyncio.gather(
+            *(execution(i).run(context) for i, context in enumerate(contexts))
+        )
+
+    asyncio.run(main())
+
+    assert server.requests == [
+        ("POST", "/double", [{"value": i} for i in range(4)]),
+    ]
+    for i in range(4):
+        manifest = json.loads((tmp_path / str(i) / MANIFEST).read_text())
+        response = tmp_path / str(i) / manifest["response"]["path"]
+        assert json.loads(response.read_text()) == i * 2
+
+
+def test_fails_api_execution_on_error_status(server: StandIn, tmp_path: Path) -> None:
+    server.failures_left = 1
+    execution = APIExecution(endpoint=f"{server.url}/flaky", method="POST")
+
+    with pytest.raises(RuntimeError, match="returned 503"):
+        asyncio.run(execution.run(ExecutionContext(working_dir=tmp_path)))
+
+
+def test_rejects_batching_payloads_sent_in_the_query_string() -> None:
+    with pytest.raises(ValueError, match="can't be batched"):
+        APIExecution(endpoint="http://localhost/read", method="get", batch_size=4)
@@ -0,0 +1,110 @@
+import os
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from lab.project.model.project import Experiment, Project
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun, RunStatus
+from lab.runtime.persistence import workspace
+from lab.runtime.persistence.workspace import ContentStore, WorkspaceProvisioner
+
+
+def create_run(name: str, project_run: ProjectRun) -> ExperimentRun:
+    experiment = Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="true", args=[]),
+        parameters={},
+    )
+    return ExperimentRun(
+        experiment=experiment,
+        context=ExecutionContext(working_dir=Path(".")),
+        status=RunStatus.RUNNING,
+        project_run=project_run,
+    )
+
+
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    (root / "src" / "__pycache__").mkdir(parents=True)
+    (root / "train.py").write_text("print('training')")
+    (root / "src" / "model.py").write_text("print('training')")  # same content
+    (root / "src" / "__pycache__" / "model.pyc").write_bytes(b"\0")
+    (root / "run.sh").write_text("#!/bin/sh\n")
+    (root / "run.sh").chmod(0o755)
+    return root
+
+
+def test_stages_workspaces_as_links_to_one_copy(
+    tmp_path: Path, project_dir: Path
+) -> None:
+    store = ContentStore(tmp_path / "store")
+    provisioner = WorkspaceProvisioner(
+        store, tmp_path / "workspaces", links="hardlink", ignore=["__pycache__"]
+    )
+    project_run = ProjectRun(
+        status=RunStatus.RUNNING, project=Project(experiments=set())
+    )
+    snapshot = provisioner.snapshot(project_dir)
+
+    first, second = (
+        provisioner.provision(snapshot, create_run(name, project_run))
+        for name in ("first", "second")
+    )
+
+    assert sorted(str(p.relative_to(first)) for p in first.rglob("*")) == [
+        "run.sh",
+        "src",
+        "src/model.py",
+        "train.py",
+    ]
+    # Identical files are stored once, and every workspace links to them
+    assert (first / "train.py").stat().st_ino == (
+        second / "src" / "model.py"
+    ).stat().st_ino
+    assert os.access(second / "run.sh", os.X_OK)
+    assert not os.access(second / "train.py", os.X_OK)
+
+
+def test_only_hashes_files_that_changed(
+    tmp_path: Path, project_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ContentStore(tmp_path / "store").snapshot(project_dir)
+    (project_dir / "train.py").write_text("print('tuned')")
+    hashed = []
+    hash_file = workspace._hash_file
+    monkeypatch.setattr(
+        workspace, "_hash_file", lambda path: hashed.append(path) or hash_file(path)
+    )
+
+    # A new store instance, so the index has to come from disk
+    ContentStore(tmp_path / "store").snapshot(project_dir, ignore=["__pycache__"])
+
+    assert hashed == [str(project_dir / "train.py")]
+
+
+def test_falls_back_when_reflinks_are_unsupported(
+    tmp_path: Path, project_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def unsupported(target: str, destination: str) -> None:
+        raise OSError(95, "Operation not supported")
+
+    monkeypatch.setattr(workspace, "_reflink", unsupported)
+    provisioner = WorkspaceProvisioner(
+        ContentStore(tmp_path / "store"), tmp_path / "workspaces", links="reflink"
+    )
+    project_run = ProjectRun(
+        status=RunStatus.RUNNING, project=Project(experiments=set())
+    )
+    run = create_run("copied", project_run)
+
+    root = provisioner.provision(provisioner.snapshot(project_dir), run)
+
+    assert (root / "train.py").read_text() == "print('training')"
+    assert (root / "train.py").stat().st_nlink == 1  # a copy, so safe to modify
+    provisioner.release(run, failed=False)
+    provisioner.finish(project_run)
+    assert not (tmp_path / "workspaces" / str(project_run.id)).exists()
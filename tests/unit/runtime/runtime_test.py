@@ -0,0 +1,628 @@
+import asyncio
+import json
+import sys
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.core.tracing import tracer
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.plan import ExecutionPlan
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import (
+    ExecutionContext,
+    ExecutionMethod,
+    ScriptExecution,
+)
+from lab.runtime.model.run import RunStatus
+from lab.runtime.persistence.memory import (
+    InMemoryExperimentRunRepository,
+    InMemoryProjectRunRepository,
+)
+from lab.runtime import process
+from lab.runtime.persistence.artifacts import ArtifactStore
+from lab.runtime.persistence.workspace import ContentStore, WorkspaceProvisioner
+from lab.runtime.runtime import Runtime
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.metrics import ResourceSampler
+from lab.runtime.service.report import ReportServer
+from lab.runtime.service.run import RunService
+from lab.runtime.service.streams import StreamChannels
+from lab.settings import Settings
+
+started: list[str] = []
+
+MICROSCOPE = InstrumentRequirements(
+    capabilities={
+        InstrumentCapability(
+            name="magnification", unit="x", range=(1, 1000), precision=1
+        )
+    }
+)
+
+
+class RecordingExecution(ExecutionMethod):
+    """Records the order experiments start in"""
+
+    fail: bool = False
+    seconds: float = 0
+    label: str = ""  # tells experiments apart, so plans don't merge them
+
+    async def run(self, context: ExecutionContext) -> None:
+        started.append(context.env_vars["EXPERIMENT_NAME"])
+        await asyncio.sleep(self.seconds)
+        if self.fail:
+            raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def reset_started():
+    started.clear()
+
+
+@pytest.fixture
+def registry() -> InstrumentRegistry:
+    return InstrumentRegistry()
+
+
+@pytest.fixture
+def calendar(registry: InstrumentRegistry) -> ReservationCalendar:
+    return ReservationCalendar(registry)
+
+
+@pytest.fixture
+def runtime(
+    tmp_path: Path, registry: InstrumentRegistry, calendar: ReservationCalendar
+) -> Runtime:
+    bus = InMemoryMessageBus()
+    run_service = RunService(
+        InMemoryProjectRunRepository(),
+        InMemoryExperimentRunRepository(),
+        bus,
+    )
+    return Runtime(
+        run_service,
+        ResourceSampler(Settings()),
+        registry,
+        calendar,
+        ReportServer(bus),
+        ArtifactStore(tmp_path, ContentStore(tmp_path / "store")),
+        StreamChannels(),
+        Coordinator(registry, Settings()),
+        WorkspaceProvisioner(ContentStore(tmp_path / "store"), tmp_path / "workspaces"),
+        Settings(),
+    )
+
+
+def create_experiment(
+    name: str,
+    fail: bool = False,
+    seconds: float = 0,
+    requirements: Optional[InstrumentRequirements] = None,
+    **refs: Experiment,
+) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=RecordingExecution(fail=fail, seconds=seconds, label=name),
+        requirements=requirements,
+        parameters={
+            key: ValueReference(owner=owner, attribute="output")
+            for key, owner in refs.items()
+        },
+    )
+
+
+def test_starts_longest_critical_path_first(runtime: Runtime) -> None:
+    """With one worker, the head of the longest chain should start first"""
+    short = create_experiment("short")
+    head = create_experiment("head")
+    middle = create_experiment("middle", input=head)
+    tail = create_experiment("tail", input=middle)
+    project = Project(experiments={short, head, middle, tail})
+    plan = PlanService().create_execution_plan(project, DurationEstimator(default=1))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=1))
+
+    # tail and short tie on rank once middle is done
+    assert started[:2] == ["head", "middle"]
+    assert set(started[2:]) == {"tail", "short"}
+    assert project_run.status == RunStatus.COMPLETED
+    assert all(r.status == RunStatus.COMPLETED for r in project_run.experiment_runs)
+
+
+def test_records_runs_for_merged_experiments(runtime: Runtime) -> None:
+    """A merged experiment should run once but have a run under each name"""
+    prepare = create_experiment("prepare")
+    again = prepare.model_copy(update={"id": uuid4(), "name": "prepare_again"})
+    train = create_experiment("train", input=again)
+    project = Project(experiments={prepare, again, train})
+    plan = PlanService().create_execution_plan(project)
+
+    project_run = asyncio.run(runtime.start(plan))
+
+    assert started == ["prepare", "train"]
+    runs = {r.experiment.name: r for r in project_run.experiment_runs}
+    assert set(runs) == {"prepare", "prepare_again", "train"}
+    assert all(r.status == RunStatus.COMPLETED for r in runs.values())
+    assert runs["prepare_again"].experiment.id == again.id
+    assert runs["prepare_again"].context is runs["prepare"].context
+
+
+def test_stops_when_failed_experiment_has_dependents(runtime: Runtime) -> None:
+    """Dependents of a failed experiment should never start"""
+    upstream = create_experiment("upstream", fail=True)
+    downstream = create_experiment("downstream", input=upstream)
+    project = Project(experiments={upstream, downstream})
+    plan = PlanService().create_execution_plan(project)
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    assert started == ["upstream"]
+    assert [r.status for r in project_run.experiment_runs] == [RunStatus.FAILED]
+
+
+def test_backfills_without_delaying_blocked_experiment(runtime: Runtime) -> None:
+    """Small jobs may fill gaps only if they finish before the blocked job could start"""
+    first = create_experiment("first", seconds=0.2)
+    big = create_experiment("big", requirements=InstrumentRequirements(cpus=2))
+    short = create_experiment("short", seconds=0.05)
+    long = create_experiment("long", seconds=0.05)
+    order = [first, big, short, long]
+    estimates = {first.id: 10.0, big.id: 1.0, short.id: 5.0, long.id: 50.0}
+    plan = ExecutionPlan(
+        project=Project(experiments=set(order)),
+        ordered_experiments=order,
+        estimates=estimates,
+        ranks={exp.id: rank for exp, rank in zip(order, [1000, 500, 100, 50])},
+    )
+
+    asyncio.run(runtime.start(plan, jobs=2))
+
+    # short fits in the gap before big's reservation, long would have delayed it
+    assert started == ["first", "short", "big", "long"]
+
+
+def test_fails_experiments_that_can_never_be_admitted(runtime: Runtime) -> None:
+    greedy = create_experiment("greedy", requirements=InstrumentRequirements(cpus=8))
+    plan = PlanService().create_execution_plan(Project(experiments={greedy}))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    (run,) = project_run.experiment_runs
+    assert run.status == RunStatus.FAILED
+    assert run.error and "needs 8 CPUs" in run.error
+    assert started == []
+
+
+def register_microscope(registry: InstrumentRegistry) -> Instrument:
+    microscope = Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.PHYSICAL,
+        capabilities=MICROSCOPE.capabilities,
+        status=InstrumentStatus.AVAILABLE,
+    )
+    registry.register(microscope)
+    return microscope
+
+
+def test_takes_turns_on_an_exclusive_instrument(
+    runtime: Runtime, registry: InstrumentRegistry, calendar: ReservationCalendar
+) -> None:
+    microscope = register_microscope(registry)
+    first = create_experiment("first", seconds=0.1, requirements=MICROSCOPE)
+    second = create_experiment("second", seconds=0.1, requirements=MICROSCOPE)
+    plan = PlanService().create_execution_plan(
+        Project(experiments={first, second}), DurationEstimator(default=1)
+    )
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    assert project_run.status == RunStatus.COMPLETED
+    earlier, later = sorted(project_run.experiment_runs, key=lambda r: r.started_at)
+    assert earlier.completed_at is not None
+    assert later.started_at >= earlier.completed_at
+    assert [c.instrument.id for c in later.context.resource_claims] == [microscope.id]
+    assert microscope.status == InstrumentStatus.AVAILABLE
+    assert calendar.reservations(microscope) == []  # pruned once released
+
+
+def test_starts_experiments_in_their_booked_slot(
+    runtime: Runtime, registry: InstrumentRegistry, calendar: ReservationCalendar
+) -> None:
+    microscope = register_microscope(registry)
+    booked = calendar.reserve(uuid4(), MICROSCOPE, timedelta(seconds=0.3))
+    imaging = create_experiment("imaging", requirements=MICROSCOPE)
+    plan = PlanService().create_execution_plan(Project(experiments={imaging}))
+
+    project_run = asyncio.run(runtime.start(plan))
+
+    (run,) = project_run.experiment_runs
+    assert run.status == RunStatus.COMPLETED
+    assert run.started_at >= booked.ends_at
+    assert microscope.status == InstrumentStatus.AVAILABLE
+
+
+def test_shares_jobs_fairly_between_projects(runtime: Runtime) -> None:
+    """The project using fewer jobs should start its next experiment first"""
+    plans = [
+        PlanService().create_execution_plan(
+            Project(
+                experiments={
+                    create_experiment(f"{prefix}{i}", seconds=0.05) for i in range(4)
+                }
+            )
+        )
+        for prefix in ["a", "b"]
+    ]
+
+    project_runs = asyncio.run(
+        runtime.start_all([(plan, None) for plan in plans], jobs=2)
+    )
+
+    assert len(started) == 8
+    for i in range(1, len(started) + 1):
+        a = sum(name.startswith("a") for name in started[:i])
+        assert abs(a - (i - a)) <= 1
+    for project_run, prefix in zip(project_runs, ["a", "b"]):
+        assert project_run.status == RunStatus.COMPLETED
+        assert {r.experiment.name[0] for r in project_run.experiment_runs} == {prefix}
+
+
+def test_traces_each_experiments_states(runtime: Runtime, tmp_path: Path) -> None:
+    upstream = create_experiment("upstream")
+    downstream = create_experiment("downstream", input=upstream)
+    plan = PlanService().create_execution_plan(
+        Project(experiments={upstream, downstream})
+    )
+
+    tracer.enable()
+    try:
+        asyncio.run(runtime.start(plan))
+        tracer.write(tmp_path / "trace.json")
+    finally:
+        tracer.disable()
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    states = [
+        e["name"]
+        for e in events
+        if e.get("id") == downstream.id.hex
+        and e["ph"] == "b"
+        and e["name"] in {"waiting", "queued", "running", "persisting"}
+    ]
+    assert states == ["waiting", "queued", "running", "persisting"]
+    assert any(e["name"] == "ExperimentRunComplete" for e in events)
+    assert any(e["name"] == "save ExperimentRun" for e in events)
+
+
+def test_failure_only_stops_its_own_project(runtime: Runtime) -> None:
+    upstream = create_experiment("upstream", fail=True)
+    downstream = create_experiment("downstream", input=upstream)
+    failing = Project(experiments={upstream, downstream})
+    first = create_experiment("first", seconds=0.05)
+    second = create_experiment("second", input=first)
+    other = Project(experiments={first, second})
+    service = PlanService()
+
+    failed_run, other_run = asyncio.run(
+        runtime.start_all(
+            [
+                (service.create_execution_plan(failing), None),
+                (service.create_execution_plan(other), None),
+            ]
+        )
+    )
+
+    assert "downstream" not in started
+    assert [r.status for r in failed_run.experiment_runs] == [RunStatus.FAILED]
+    assert [r.experiment.name for r in other_run.experiment_runs] == [
+        "first",
+        "second",
+    ]
+    assert all(r.status == RunStatus.COMPLETED for r in other_run.experiment_runs)
+
+
+def create_script(
+    name: str,
+    code: str,
+    heartbeat_seconds: Optional[float] = None,
+    **refs: ValueReference,
+) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(
+            command=sys.executable,
+            args=["-c", code],
+            env={"PYTHONPATH": str(Path(__file__).parents[3])},
+        ),
+        parameters=dict(refs),
+        heartbeat_seconds=heartbeat_seconds,
+    )
+
+
+def create_shell(name: str, script: str, **fields) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="sh", args=["-c", script]),
+        parameters={},
+        **fields,
+    )
+
+
+def is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_passes_strings_naming_files_as_values(
+    runtime: Runtime, tmp_path: Path
+) -> None:
+    log = tmp_path / "run.log"
+    log.touch()
+    train = create_script(
+        "train",
+        "from pathlib import Path; from lab import sdk; "
+        f"sdk.publish('log', '{log}'); sdk.publish('file', Path('{log}'))",
+    )
+    evaluate = create_script(
+        "evaluate",
+        "from pathlib import Path; from lab import sdk; "
+        f"assert sdk.input('log') == '{log}'; "
+        "assert isinstance(sdk.input('file'), Path); sdk.output('checked', True)",
+        log=ValueReference(owner=train, attribute="train.log"),
+        file=ValueReference(owner=train, attribute="train.file"),
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={train, evaluate}))
+
+    project_run = asyncio.run(runtime.start(plan))
+
+    assert [run.status for run in project_run.experiment_runs] == [
+        RunStatus.COMPLETED,
+        RunStatus.COMPLETED,
+    ]
+
+
+def test_passes_published_arrays_to_dependents(runtime: Runtime) -> None:
+    train = create_script(
+        "train",
+        "import numpy as np; from lab import sdk; "
+        "sdk.publish('weights', np.arange(1000.0))",
+    )
+    evaluate = create_script(
+        "evaluate",
+        "import numpy as np; from lab import sdk; w = sdk.input('network'); "
+        "assert isinstance(w, np.memmap) and w.sum() == 499500, w; "
+        "sdk.output('checked', True)",
+        network=ValueReference(owner=train, attribute="train.weights"),
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={train, evaluate}))
+
+    project_run = asyncio.run(runtime.start(plan))
+
+    assert [run.status for run in project_run.experiment_runs] == [
+        RunStatus.COMPLETED,
+        RunStatus.COMPLETED,
+    ]
+    assert project_run.experiment_runs[1].outputs == {"checked": True}
+
+
+def test_reuses_earlier_outputs_only_while_their_script_is_unchanged(
+    runtime: Runtime, tmp_path: Path
+) -> None:
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "make.py").write_text("from lab import sdk; sdk.publish('n', 1)")
+    (project_dir / "use.py").write_text(
+        "from lab import sdk; sdk.output('n', sdk.input('n'))"
+    )
+    make, use = (
+        Experiment(
+            id=uuid4(),
+            name=name,
+            execution_method=ScriptExecution(
+                command=sys.executable,
+                args=[f"{name}.py"],
+                env={"PYTHONPATH": str(Path(__file__).parents[3])},
+            ),
+            parameters={},
+        )
+        for name in ("make", "use")
+    )
+    use.parameters["n"] = ValueReference(owner=make, attribute="make.n")
+    full = PlanService().create_execution_plan(Project(experiments={make, use}))
+    alone = PlanService().create_execution_plan(Project(experiments={use}))
+
+    asyncio.run(runtime.start(full, source=project_dir))
+    reused = asyncio.run(runtime.start(alone, source=project_dir))
+    (project_dir / "make.py").write_text("from lab import sdk; sdk.publish('n', 2)")
+    stale = asyncio.run(runtime.start_all([(alone, project_dir)]))[0]
+
+    assert reused.experiment_runs[0].outputs == {"n": 1}
+    assert stale.experiment_runs[0].status == RunStatus.FAILED
+
+
+def test_warns_when_referenced_output_was_not_published(
+    runtime: Runtime, caplog: pytest.LogCaptureFixture
+) -> None:
+    train = create_experiment("train")
+    evaluate = create_experiment("evaluate", network=train)
+    evaluate.parameters["network"] = ValueReference(owner=train, attribute="network")
+    plan = PlanService().create_execution_plan(Project(experiments={train, evaluate}))
+
+    project_run = asyncio.run(runtime.start(plan))
+
+    assert all(r.status == RunStatus.COMPLETED for r in project_run.experiment_runs)
+    assert "output 'network' of 'train', which it didn't publish" in caplog.text
+
+
+def test_streams_chunks_while_both_experiments_run(runtime: Runtime) -> None:
+    produce = create_script(
+        "produce",
+        "import time, numpy as np; from lab import sdk\n"
+        "with sdk.stream('batches') as out:\n"
+        "    for i in range(5):\n"
+        "        out.write(np.full(1000, i)); out.write({'step': i}); time.sleep(0.05)\n"
+        "sdk.output('finished', time.time())",
+    )
+    consume = create_script(
+        "consume",
+        "from lab import sdk\n"
+        "chunks = list(sdk.input('batches'))\n"
+        "sdk.output('total', sum(int(c.sum()) for c in chunks[::2]))\n"
+        "sdk.output('steps', [c['step'] for c in chunks[1::2]])",
+        batches=ValueReference(owner=produce, attribute="produce.batches", stream=True),
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={produce, consume}))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    runs = {run.experiment.name: run for run in project_run.experiment_runs}
+    assert all(run.status == RunStatus.COMPLETED for run in runs.values())
+    assert runs["consume"].outputs["total"] == 1000 * sum(range(5))
+    assert runs["consume"].outputs["steps"] == list(range(5))
+    # The producer can only finish once the consumer has opened the stream
+    assert runs["consume"].started_at.timestamp() < runs["produce"].outputs["finished"]
+
+
+def test_fails_stream_consumer_when_producer_fails(runtime: Runtime) -> None:
+    produce = create_script(
+        "produce",
+        "from lab import sdk\n"
+        "with sdk.stream('batches') as out:\n"
+        "    out.write([1, 2]); raise SystemExit(1)",
+    )
+    consume = create_script(
+        "consume",
+        "from lab import sdk; list(sdk.input('batches'))",
+        batches=ValueReference(owner=produce, attribute="produce.batches", stream=True),
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={produce, consume}))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    assert [run.status for run in project_run.experiment_runs] == [
+        RunStatus.FAILED,
+        RunStatus.FAILED,
+    ]
+
+
+def test_kills_experiments_that_time_out(runtime: Runtime, tmp_path: Path) -> None:
+    """The whole process group goes, and the slot is free for the next experiment"""
+    hung = create_shell(
+        "hung", f"sleep 30 & echo $! > {tmp_path}/child; wait", timeout_seconds=0.5
+    )
+    quick = create_shell("quick", "true")
+    plan = PlanService().create_execution_plan(
+        Project(experiments={hung, quick}), DurationEstimator(default=1)
+    )
+
+    project_run = asyncio.run(runtime.start(plan, jobs=1))
+
+    runs = {run.experiment.name: run for run in project_run.experiment_runs}
+    assert runs["hung"].status == RunStatus.FAILED
+    assert "Timed out after 0.5s" in (runs["hung"].error or "")
+    assert runs["quick"].status == RunStatus.COMPLETED
+    assert not is_running(int((tmp_path / "child").read_text()))
+
+
+def test_fails_experiments_that_stop_sending_heartbeats(runtime: Runtime) -> None:
+    steady = create_script(
+        "steady",
+        "import time; from lab import sdk\n"
+        "for _ in range(10): sdk.heartbeat(); time.sleep(0.1)",
+        heartbeat_seconds=5,  # room for starting Python on a busy machine
+    )
+    stalled = create_script(
+        "stalled",
+        "import time; from lab import sdk; sdk.heartbeat(); time.sleep(30)",
+        heartbeat_seconds=0.5,
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={steady, stalled}))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2))
+
+    runs = {run.experiment.name: run for run in project_run.experiment_runs}
+    assert runs["steady"].status == RunStatus.COMPLETED
+    assert runs["stalled"].status == RunStatus.FAILED
+    assert "No heartbeat" in (runs["stalled"].error or "")
+
+
+def test_cancels_running_experiments(
+    runtime: Runtime, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Processes that ignore SIGTERM are killed, and queued experiments never start"""
+    monkeypatch.setattr(process, "TERMINATE_GRACE_SECONDS", 0.2)
+    stubborn = create_shell(
+        "stubborn", f"trap '' TERM; echo $$ > {tmp_path}/pid; sleep 30 & wait"
+    )
+    queued = create_shell("queued", "true")
+    # Puts stubborn on the critical path, so it starts first
+    downstream = create_experiment("downstream", input=stubborn)
+    plan = PlanService().create_execution_plan(
+        Project(experiments={stubborn, queued, downstream}),
+        DurationEstimator(default=1),
+    )
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.5, runtime.cancel)
+        return await runtime.start(plan, jobs=1)
+
+    project_run = asyncio.run(main())
+
+    assert project_run.status == RunStatus.CANCELLED
+    (run,) = project_run.experiment_runs
+    assert run.experiment.name == "stubborn"
+    assert run.status == RunStatus.CANCELLED
+    assert not is_running(int((tmp_path / "pid").read_text()))
+
+
+def test_runs_experiments_in_staged_workspaces(
+    runtime: Runtime, tmp_path: Path
+) -> None:
+    """Each run gets the project files; what it writes stays in its own workdir"""
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "data.txt").write_text("42")
+    script = 'cat data.txt; echo "$PWD" > scratch; echo 1 >> data.txt.new; exit $FAIL'
+    ok, broken = (
+        Experiment(
+            id=uuid4(),
+            name=name,
+            execution_method=ScriptExecution(
+                command="sh", args=["-c", script], env={"FAIL": fail}
+            ),
+            parameters={},
+        )
+        for name, fail in [("ok", "0"), ("broken", "1")]
+    )
+    plan = PlanService().create_execution_plan(Project(experiments={ok, broken}))
+
+    project_run = asyncio.run(runtime.start(plan, jobs=2, source=project_dir))
+
+    runs = {run.experiment.name: run for run in project_run.experiment_runs}
+    assert sorted(project_dir.iterdir()) == [project_dir / "data.txt"]
+    # Workdirs of failed runs are kept for debugging
+    assert not runs["ok"].context.working_dir.exists()
+    broken_dir = runs["broken"].context.working_dir
+    assert (broken_dir / "data.txt").read_text() == "42"
+    assert (broken_dir / "scratch").read_text().strip() == str(broken_dir)
@@ -0,0 +1,255 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.calendar import ReservationCalendar
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import ScriptExecution
+from lab.runtime.model.run import ProjectRun, RunStatus
+from lab.runtime.persistence.artifacts import ArtifactStore
+from lab.runtime.persistence.workspace import ContentStore, WorkspaceProvisioner
+from lab.runtime.persistence.memory import (
+    InMemoryExperimentRunRepository,
+    InMemoryProjectRunRepository,
+)
+from lab.runtime.protocol import ASSIGN, REGISTER, read_message, write_message
+from lab.runtime.runtime import Runtime
+from lab.runtime.service.coordinator import Coordinator
+from lab.runtime.service.metrics import ResourceSampler
+from lab.runtime.service.report import ReportServer
+from lab.runtime.service.run import RunService
+from lab.runtime.service.streams import StreamChannels
+from lab.runtime.service.worker import Worker
+from lab.settings import Settings
+
+SETTINGS = Settings(
+    coordinator_heartbeat_seconds=0.05,
+    coordinator_lease_seconds=0.5,
+    coordinator_locality_wait_seconds=2.0,
+)
+
+MICROSCOPE = InstrumentCapability(
+    name="magnification", unit="x", range=(1, 1000), precision=1
+)
+
+
+def create_runtime(
+    coordinator: Coordinator, registry: InstrumentRegistry, artifacts: Path
+) -> Runtime:
+    bus = InMemoryMessageBus()
+    return Runtime(
+        RunService(
+            InMemoryProjectRunRepository(), InMemoryExperimentRunRepository(), bus
+        ),
+        ResourceSampler(SETTINGS),
+        registry,
+        ReservationCalendar(registry),
+        ReportServer(bus),
+        ArtifactStore(artifacts, ContentStore(artifacts / "store")),
+        StreamChannels(),
+        coordinator,
+        WorkspaceProvisioner(
+            ContentStore(artifacts / "store"), artifacts / "workspaces"
+        ),
+        SETTINGS,
+    )
+
+
+def create_experiment(
+    name: str,
+    directory: Path,
+    seconds: float = 0,
+    requirements: Optional[InstrumentRequirements] = None,
+    **refs: Experiment,
+) -> Experiment:
+    """Records the workers it started on, then those it finished on"""
+    script = (
+        f'echo "$LAB_WORKER" >> {directory}/{name}.started; sleep {seconds}; '
+        f'echo "$LAB_WORKER" >> {directory}/{name}.finished'
+    )
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="sh", args=["-c", script]),
+        requirements=requirements,
+        parameters={
+            key: ValueReference(owner=owner, attribute="output")
+            for key, owner in refs.items()
+        },
+    )
+
+
+def distributed(
+    project: Project,
+    workers: int,
+    during: Callable[[tuple[str, int]], Awaitable[None]],
+    artifacts: Path,
+) -> ProjectRun:
+    """Run a project through a coordinator while `during` starts its workers"""
+    registry = InstrumentRegistry()
+    coordinator = Coordinator(registry, SETTINGS)
+    runtime = create_runtime(coordinator, registry, artifacts)
+    plan = PlanService().create_execution_plan(project)
+
+    async def main() -> ProjectRun:
+        async with coordinator.serve("127.0.0.1", 0) as address:
+            helpers = asyncio.create_task(during(address))
+            await coordinator.wait_for_workers(workers, timeout=10)
+            try:
+                return await runtime.start(plan)
+            finally:
+                helpers.cancel()
+
+    return asyncio.run(main())
+
+
+def test_runs_experiments_on_workers(tmp_path: Path) -> None:
+    first = create_experiment("first", tmp_path)
+    second = create_experiment("second", tmp_path, input=first)
+
+    async def workers(address: tuple[str, int]) -> None:
+        await Worker(*address, name="w1", cpus=2).run()
+
+    project_run = distributed(
+        Project(experiments={first, second}), 1, workers, tmp_path / "artifacts"
+    )
+
+    assert project_run.status == RunStatus.COMPLETED
+    assert (tmp_path / "first.finished").read_text().split() == ["w1"]
+    assert (tmp_path / "second.finished").read_text().split() == ["w1"]
+    assert all(run.metrics for run in project_run.experiment_runs)
+
+
+def test_runs_experiments_where_their_instrument_is(tmp_path: Path) -> None:
+    microscope = Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.PHYSICAL,
+        capabilities={MICROSCOPE},
+        status=InstrumentStatus.AVAILABLE,
+    )
+    imaging = create_experiment(
+        "imaging",
+        tmp_path,
+        requirements=InstrumentRequirements(capabilities={MICROSCOPE}),
+    )
+    # Would go to the worker with more free CPUs, but its input was made on "scope"
+    analysis = create_experiment("analysis", tmp_path, input=imaging)
+
+    async def workers(address: tuple[str, int]) -> None:
+        await asyncio.gather(
+            Worker(*address, name="big", cpus=8).run(),
+            Worker(*address, name="scope", cpus=1, instruments=[microscope]).run(),
+        )
+
+    project_run = distributed(
+        Project(experiments={imaging, analysis}), 2, workers, tmp_path / "artifacts"
+    )
+
+    assert project_run.status == RunStatus.COMPLETED
+    assert (tmp_path / "imaging.finished").read_text().split() == ["scope"]
+    assert (tmp_path / "analysis.finished").read_text().split() == ["scope"]
+
+
+def test_reassigns_experiments_of_workers_that_die(tmp_path: Path) -> None:
+    slow = create_experiment("slow", tmp_path, seconds=0.5)
+    started = tmp_path / "slow.started"
+
+    async def workers(address: tuple[str, int]) -> None:
+        doomed = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import asyncio; from lab.runtime.service.worker import Worker; "
+                f"asyncio.run(Worker('{address[0]}', {address[1]}, 'doomed').run())",
+            ],
+            env={**os.environ, "PYTHONPATH": str(Path(__file__).parents[4])},
+        )
+        try:
+            while not started.exists():
+                await asyncio.sleep(0.01)
+            doomed.kill()
+            await Worker(*address, name="healthy", cpus=1).run()
+        finally:
+            doomed.kill()
+            doomed.wait()
+
+    project_run = distributed(
+        Project(experiments={slow}), 1, workers, tmp_path / "artifacts"
+    )
+
+    assert project_run.status == RunStatus.COMPLETED
+    assert started.read_text().split() == ["doomed", "healthy"]
+
+
+def test_reassigns_expired_leases(tmp_path: Path) -> None:
+    quick = create_experiment("quick", tmp_path)
+
+    async def workers(address: tuple[str, int]) -> None:
+        # Accepts the experiment, then never sends a heartbeat
+        reader, writer = await asyncio.open_connection(*address)
+        write_message(writer, REGISTER, "silent", 4, 2**30, [])
+        await read_message(reader)
+        while (message := await read_message(reader)) is not None:
+            if message[0] == ASSIGN:
+                await Worker(*address, name="healthy", cpus=1).run()
+
+    project_run = distributed(
+        Project(experiments={quick}), 1, workers, tmp_path / "artifacts"
+    )
+
+    assert project_run.status == RunStatus.COMPLETED
+    assert (tmp_path / "quick.finished").read_text().split() == ["healthy"]
+
+
+def test_fails_experiments_once_no_workers_are_left(tmp_path: Path) -> None:
+    quick = create_experiment("quick", tmp_path)
+
+    async def workers(address: tuple[str, int]) -> None:
+        reader, writer = await asyncio.open_connection(*address)
+        write_message(writer, REGISTER, "silent", 1, 2**30, [])
+        while await read_message(reader) is not None:
+            pass
+
+    project_run = distributed(
+        Project(experiments={quick}), 1, workers, tmp_path / "artifacts"
+    )
+
+    (run,) = project_run.experiment_runs
+    assert run.status == RunStatus.FAILED
+    assert "no workers" in (run.error or "")
+
+
+def test_fails_experiments_larger_than_any_worker(tmp_path: Path) -> None:
+    """Three CPUs fit in the workers' total, but never on one of them"""
+    wide = create_experiment(
+        "wide", tmp_path, requirements=InstrumentRequirements(cpus=3)
+    )
+
+    async def workers(address: tuple[str, int]) -> None:
+        await asyncio.gather(
+            Worker(*address, name="w1", cpus=2).run(),
+            Worker(*address, name="w2", cpus=2).run(),
+        )
+
+    project_run = distributed(
+        Project(experiments={wide}), 2, workers, tmp_path / "artifacts"
+    )
+
+    (run,) = project_run.experiment_runs
+    assert run.status == RunStatus.FAILED
+    assert "no machine has more than 2" in (run.error or "")
+    assert not (tmp_path / "wide.started").exists()
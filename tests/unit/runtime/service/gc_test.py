@@ -0,0 +1,205 @@
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from lab.project.model.project import Experiment, Project
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun
+from lab.runtime.persistence.artifacts import FINGERPRINTS
+from lab.runtime.persistence.metrics import RUNS, MetricsStore
+from lab.runtime.persistence.workspace import ContentStore
+from lab.runtime.service import gc as gc_module
+from lab.runtime.service.gc import ARTIFACTS, OBJECT, GarbageCollector
+from lab.settings import Settings
+
+BLOCK = 64 * 1024
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def settings(tmp_path: Path) -> Settings:
+    return Settings(home=tmp_path, gc_keep_runs=1, gc_grace_seconds=60)
+
+
+@pytest.fixture
+def metrics(settings: Settings) -> MetricsStore:
+    store = MetricsStore(settings.data_dir / "metrics")
+    store.append(
+        RUNS,
+        [
+            {"run_id": run, "project_run_id": project_run, "started_at": started}
+            for run, project_run, started in [
+                ("old-run", "old-project-run", datetime(2025, 1, 1)),
+                ("new-run", "new-project-run", datetime(2025, 2, 1)),
+            ]
+        ],
+    )
+    store.flush()
+    return store
+
+
+def create_outputs(settings: Settings, run_id: str, days_ago: float) -> Path:
+    directory = settings.artifacts_dir / run_id
+    directory.mkdir(parents=True)
+    (directory / "output.npy").write_bytes(os.urandom(BLOCK))
+    used = time.time() - days_ago * DAY
+    os.utime(directory / "output.npy", (used, used))
+    os.utime(directory, (used, used))
+    return directory
+
+
+def create_collector(settings: Settings, metrics: MetricsStore) -> GarbageCollector:
+    return GarbageCollector(settings, metrics, ContentStore(settings.store_dir))
+
+
+def test_evicts_least_recently_used_outputs_outside_recent_runs(
+    settings: Settings, metrics: MetricsStore
+) -> None:
+    # The newest project run's outputs are kept, however long ago they were used
+    kept = create_outputs(settings, "new-run", days_ago=30)
+    old = create_outputs(settings, "old-run", days_ago=20)
+    orphan = create_outputs(settings, "orphan", days_ago=10)
+    fresh = create_outputs(settings, "in-progress", days_ago=0)
+    link = settings.artifacts_dir / FINGERPRINTS / "abc"
+    link.parent.mkdir()
+    link.symlink_to(old, target_is_directory=True)
+
+    report = create_collector(settings, metrics).collect(budget_bytes=2 * BLOCK)
+
+    assert report.total_bytes == 4 * BLOCK
+    assert report.freed_bytes == {ARTIFACTS: 2 * BLOCK}
+    assert (kept.exists(), old.exists(), orphan.exists(), fresh.exists()) == (
+        True,
+        False,
+        False,
+        True,
+    )
+    assert not link.is_symlink()
+
+
+def test_keeps_pinned_runs_even_over_budget(
+    settings: Settings, metrics: MetricsStore
+) -> None:
+    old = create_outputs(settings, "old-run", days_ago=20)
+    collector = create_collector(settings, metrics)
+    collector.pin("old-project-run")
+
+    report = collector.collect(budget_bytes=0)
+
+    assert old.exists()
+    assert report.evicted == {}
+    assert report.remaining_bytes == BLOCK
+
+
+def test_only_measures_entries_that_changed(
+    settings: Settings, metrics: MetricsStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create_outputs(settings, "old-run", days_ago=20)
+    create_outputs(settings, "new-run", days_ago=10)
+    create_collector(settings, metrics).collect(budget_bytes=None)
+    create_outputs(settings, "orphan", days_ago=5)
+    measured: list[Path] = []
+    measure = gc_module._unshared_bytes
+    monkeypatch.setattr(
+        gc_module,
+        "_unshared_bytes",
+        lambda directory: measured.append(directory) or measure(directory),
+    )
+
+    # A new collector, so sizes have to come from the index on disk
+    report = create_collector(settings, metrics).collect(budget_bytes=None)
+
+    assert measured == [settings.artifacts_dir / "orphan"]
+    assert report.total_bytes == 3 * BLOCK
+
+
+def test_measures_entries_again_when_nested_files_change(
+    settings: Settings, metrics: MetricsStore
+) -> None:
+    directory = create_outputs(settings, "new-run", days_ago=10)
+    (directory / "checkpoints").mkdir()
+    create_collector(settings, metrics).collect(budget_bytes=None)
+    top_level = directory.stat().st_mtime_ns
+
+    # A file is added in a subdirectory, without the entry's own mtime changing
+    (directory / "checkpoints" / "latest.pt").write_bytes(os.urandom(2 * BLOCK))
+    os.utime(directory, ns=(top_level, top_level))
+
+    report = create_collector(settings, metrics).collect(budget_bytes=None)
+
+    assert report.total_bytes == 3 * BLOCK
+
+
+def test_lists_only_directories_that_changed(
+    settings: Settings, metrics: MetricsStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    directory = create_outputs(settings, "new-run", days_ago=10)
+    (directory / "checkpoints").mkdir()
+    create_outputs(settings, "old-run", days_ago=20)
+    create_collector(settings, metrics).collect(budget_bytes=None)
+    (directory / "checkpoints" / "latest.pt").write_bytes(os.urandom(BLOCK))
+    listed: list[Path] = []
+    children = gc_module._children
+    monkeypatch.setattr(
+        gc_module,
+        "_children",
+        lambda path, *args: listed.append(path) or children(path, *args),
+    )
+
+    report = create_collector(settings, metrics).collect(budget_bytes=None)
+
+    below = [path for path in listed if settings.artifacts_dir in path.parents]
+    assert below == [directory / "checkpoints"]
+    assert report.total_bytes == 3 * BLOCK
+
+
+def test_keeps_stored_files_the_latest_snapshot_uses(
+    settings: Settings, metrics: MetricsStore, tmp_path: Path
+) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    script = project / "train.py"
+    script.write_bytes(os.urandom(BLOCK))
+    store = ContentStore(settings.store_dir)
+    (stale,) = {obj for _, obj in store.snapshot(project).files}
+    script.write_bytes(os.urandom(BLOCK))
+    (current,) = {obj for _, obj in store.snapshot(project).files}
+    for path in (stale, current):
+        os.utime(path, (time.time() - DAY, time.time() - DAY))
+
+    report = GarbageCollector(settings, metrics, store).collect(budget_bytes=0)
+
+    assert report.freed_bytes == {OBJECT: BLOCK}
+    assert not os.path.exists(stale)
+    assert os.path.exists(current)
+
+
+def test_keeps_project_runs_in_progress(
+    settings: Settings, metrics: MetricsStore
+) -> None:
+    experiment = Experiment(
+        id=uuid4(),
+        name="train",
+        execution_method=ScriptExecution(command="true", args=[]),
+        parameters={},
+    )
+    project_run = ProjectRun(project=Project(experiments={experiment}))
+    run = ExperimentRun(
+        experiment=experiment,
+        project_run=project_run,
+        context=ExecutionContext(working_dir=Path(".")),
+    )
+    project_run.experiment_runs.append(run)
+    # Running for days without writing, and not recorded until it finishes
+    outputs = create_outputs(settings, str(run.id), days_ago=2)
+
+    report = create_collector(settings, metrics).collect(
+        budget_bytes=0, active=[project_run]
+    )
+
+    assert outputs.exists()
+    assert report.evicted == {}
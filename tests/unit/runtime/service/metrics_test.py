@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.service.metrics import ResourceSampler
+from lab.settings import Settings
+
+MB = 1024 * 1024
+
+# Holds 64MB while a child holds another 64MB, then burns some CPU
+PARENT_AND_CHILD = """
+import subprocess, sys, time
+data = bytearray(64 * 1024 * 1024)
+child = subprocess.Popen([sys.executable, "-c",
+    "import time; data = bytearray(64 * 1024 * 1024); time.sleep(0.5)"])
+child.wait()
+end = time.process_time() + 0.2
+while time.process_time() < end:
+    pass
+"""
+
+
+@pytest.fixture
+def sampler() -> ResourceSampler:
+    return ResourceSampler(Settings(sample_interval_seconds=0.05))
+
+
+async def measure(
+    sampler: ResourceSampler, execution: ScriptExecution
+) -> ExecutionContext:
+    context = ExecutionContext(working_dir=Path("."))
+    sampler.track(context)
+    try:
+        await execution.run(context)
+    finally:
+        context.metrics = [sampler.finish(context)]
+    return context
+
+
+def test_measures_process_tree(sampler: ResourceSampler) -> None:
+    """Should report OS accounting and sampled peaks for the whole process tree"""
+    execution = ScriptExecution(command=sys.executable, args=["-c", PARENT_AND_CHILD])
+
+    context = asyncio.run(measure(sampler, execution))
+
+    (metrics,) = context.metrics
+    assert context.pid is not None
+    assert metrics.duration_seconds >= 0.5
+    assert metrics.cpu_time_seconds >= 0.2
+    if sys.platform == "linux":
+        # parent and child were alive at the same time
+        assert metrics.memory_peak_bytes >= 128 * MB
+    else:
+        assert metrics.memory_peak_bytes >= 64 * MB
+
+
+def test_fails_on_nonzero_exit(sampler: ResourceSampler) -> None:
+    execution = ScriptExecution(command=sys.executable, args=["-c", "exit(3)"])
+
+    with pytest.raises(RuntimeError, match="exited with status 3"):
+        asyncio.run(measure(sampler, execution))
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.project.model.project import Experiment, Project
+from lab.runtime.messages import ExperimentRunReported
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun
+from lab.runtime.process import run_process
+from lab.runtime.service.report import ReportServer
+from lab.sdk.client import Client
+
+ROOT = Path(__file__).parents[4]
+
+EXPERIMENT = """
+from lab import sdk
+
+for step in range(10000):
+    sdk.log("loss", 1 / (step + 1))
+sdk.log("accuracy", 0.9, step=3)
+sdk.output("best", {"epoch": 7, "loss": 0.01})
+"""
+
+
+def create_run() -> ExperimentRun:
+    experiment = Experiment(
+        id=uuid4(),
+        name="train",
+        execution_method=ScriptExecution(command="python", args=[]),
+        parameters={},
+    )
+    return ExperimentRun(
+        experiment=experiment,
+        project_run=ProjectRun(project=Project(experiments={experiment})),
+        context=ExecutionContext(working_dir=Path(".")),
+    )
+
+
+def test_attaches_reports_from_the_experiment_process() -> None:
+    bus = InMemoryMessageBus()
+    server = ReportServer(bus)
+    run = create_run()
+    reported: list[ExperimentRunReported] = []
+
+    async def on_reported(message: ExperimentRunReported) -> None:
+        reported.append(message)
+
+    bus.subscribe(ExperimentRunReported, on_reported)
+
+    async def main() -> int:
+        async with server.serve():
+            env = {**os.environ, "PYTHONPATH": str(ROOT), **server.attach(run)}
+            result = await run_process([sys.executable, "-c", EXPERIMENT], env=env)
+            await server.detach(run)
+        return result.returncode
+
+    assert asyncio.run(main()) == 0
+
+    assert run.scalars == {"loss": 1 / 10000, "accuracy": 0.9}
+    assert run.outputs == {"best": {"epoch": 7, "loss": 0.01}}
+    scalars = [scalar for message in reported for scalar in message.scalars]
+    assert len(scalars) == 10001
+    assert scalars[-1][:3] == ("accuracy", 3, 0.9)
+    assert [s[1] for s in scalars if s[0] == "loss"] == list(range(10000))
+
+
+def test_does_nothing_outside_a_run() -> None:
+    client = Client(path=None, run_id=None)
+
+    client.log("loss", 1.0)
+    client.flush()
+
+    assert not client.connected
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.instrument.model.instrument import (
+    Instrument,
+    InstrumentCapability,
+    InstrumentKind,
+    InstrumentRequirements,
+    InstrumentStatus,
+)
+from lab.instrument.service.registry import InstrumentRegistry
+from lab.project.model.project import Experiment, Project, ValueReference
+from lab.project.service.estimate import DurationEstimator
+from lab.project.service.plan import PlanService
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun, RunStatus
+from lab.runtime.persistence.metrics import MetricsStore
+from lab.runtime.service.simulation import PlanSimulator
+from lab.runtime.service.stats import StatsService
+
+MAGNIFICATION = InstrumentCapability(
+    name="magnification", unit="x", range=(1, 1000), precision=1
+)
+
+
+@pytest.fixture
+def simulator() -> PlanSimulator:
+    return PlanSimulator(InstrumentRegistry())
+
+
+def create_experiment(
+    name: str,
+    requirements: Optional[InstrumentRequirements] = None,
+    **refs: Experiment,
+) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="python", args=[name]),
+        requirements=requirements,
+        parameters={
+            key: ValueReference(owner=owner, attribute="output")
+            for key, owner in refs.items()
+        },
+    )
+
+
+def test_chain_takes_the_sum_of_its_estimates(simulator: PlanSimulator) -> None:
+    first = create_experiment("first")
+    second = create_experiment("second", input=first)
+    third = create_experiment("third", input=second)
+    project = Project(experiments={first, second, third})
+    plan = PlanService().create_execution_plan(project, DurationEstimator(default=10))
+
+    result = simulator.simulate(plan, jobs=4)
+
+    assert result.makespan == 30
+    assert result.critical_path == ["first", "second", "third"]
+    assert result.peak_cpus == 1
+    assert result.utilisation == pytest.approx(0.25)
+
+
+def test_fan_out_is_limited_by_jobs(simulator: PlanSimulator) -> None:
+    root = create_experiment("root")
+    leaves = {create_experiment(f"leaf{i}", input=root) for i in range(8)}
+    project = Project(experiments={root, *leaves})
+    plan = PlanService().create_execution_plan(project, DurationEstimator(default=10))
+
+    assert simulator.simulate(plan, jobs=2).makespan == 50
+    assert simulator.simulate(plan, jobs=8).makespan == 20
+
+
+def test_sweep_recommends_fewest_jobs_near_the_best(simulator: PlanSimulator) -> None:
+    experiments = {create_experiment(f"exp{i}") for i in range(4)}
+    plan = PlanService().create_execution_plan(
+        Project(experiments=experiments), DurationEstimator(default=10)
+    )
+
+    sweep = simulator.sweep(plan, [3])
+
+    assert [r.jobs for r in sweep.results] == [1, 2, 3, 4, 8]
+    assert [r.makespan for r in sweep.results] == [40, 20, 20, 10, 10]
+    assert sweep.recommended == 4
+
+
+def test_reports_experiments_that_can_never_run(simulator: PlanSimulator) -> None:
+    greedy = create_experiment("greedy", InstrumentRequirements(cpus=8))
+    after = create_experiment("after", input=greedy)
+    other = create_experiment("other")
+    plan = PlanService().create_execution_plan(
+        Project(experiments={greedy, after, other}), DurationEstimator(default=10)
+    )
+
+    result = simulator.simulate(plan, jobs=2)
+
+    assert result.refused == ["greedy"]
+    assert result.makespan == 10
+
+
+def test_experiments_take_turns_on_an_exclusive_instrument() -> None:
+    microscope = Instrument(
+        id=uuid4(),
+        kind=InstrumentKind.PHYSICAL,
+        capabilities={MAGNIFICATION},
+        status=InstrumentStatus.AVAILABLE,
+    )
+    imaging = InstrumentRequirements(capabilities={MAGNIFICATION})
+    experiments = {create_experiment(f"image{i}", imaging) for i in range(2)}
+    other = create_experiment("other")
+    plan = PlanService().create_execution_plan(
+        Project(experiments={*experiments, other}), DurationEstimator(default=10)
+    )
+
+    result = PlanSimulator(InstrumentRegistry([microscope])).simulate(plan, jobs=4)
+
+    assert result.makespan == 20
+    assert result.peak_cpus == 2
+    assert microscope.status == InstrumentStatus.AVAILABLE
+
+
+def create_history(
+    experiment: Experiment, durations: list[float]
+) -> list[ExperimentRun]:
+    project_run = ProjectRun(project=Project(experiments={experiment}))
+    started = datetime(2024, 1, 1)
+    return [
+        ExperimentRun(
+            experiment=experiment,
+            project_run=project_run,
+            context=ExecutionContext(working_dir=Path(".")),
+            status=RunStatus.COMPLETED,
+            started_at=started,
+            completed_at=started + timedelta(seconds=seconds),
+        )
+        for seconds in durations
+    ]
+
+
+def test_trials_draw_durations_from_history(simulator: PlanSimulator) -> None:
+    experiment = create_experiment("exp")
+    project = Project(experiments={experiment})
+    estimator = DurationEstimator(create_history(experiment, [10, 20, 30]))
+    plan = PlanService().create_execution_plan(project, estimator)
+
+    result = simulator.simulate(plan, jobs=1, estimator=estimator, trials=50, seed=1)
+
+    assert len(result.makespans) == 50
+    assert set(result.makespans) == {10, 20, 30}
+    assert simulator.simulate(plan, 1, DurationEstimator(), trials=50).makespans == [20]
+
+
+def test_trials_draw_durations_from_recorded_runs(
+    simulator: PlanSimulator, tmp_path: Path
+) -> None:
+    """What `lab plan --simulate` does, with runs recorded by an earlier `lab run`"""
+    experiment = create_experiment("exp")
+    stats = StatsService(MetricsStore(tmp_path), InMemoryMessageBus())
+    for run in create_history(experiment, [10, 20, 30]):
+        stats.record_run(run)
+    stats.flush()
+
+    estimator = StatsService(MetricsStore(tmp_path), InMemoryMessageBus()).estimator()
+    plan = PlanService().create_execution_plan(
+        Project(experiments={experiment}), estimator
+    )
+    result = simulator.simulate(plan, jobs=1, estimator=estimator, trials=50, seed=1)
+
+    assert result.makespan == 20
+    assert set(result.makespans) == {10, 20, 30}
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from lab.core.messaging.bus import InMemoryMessageBus
+from lab.project.model.project import Experiment, Project
+from lab.runtime.messages import ExperimentRunComplete, ProjectRunComplete
+from lab.runtime.model.execution import ExecutionContext, ScriptExecution
+from lab.runtime.model.run import ExperimentRun, ProjectRun, RunStatus
+from lab.runtime.persistence.metrics import RUNS, MetricsStore
+from lab.runtime.service.stats import StatsService
+
+START = datetime(2025, 1, 1, 9)
+
+
+def create_run(experiment: Experiment, started_at: datetime, seconds: float):
+    project_run = ProjectRun(project=Project(experiments={experiment}))
+    return ExperimentRun(
+        experiment=experiment,
+        project_run=project_run,
+        context=ExecutionContext(working_dir=Path(".")),
+        status=RunStatus.COMPLETED,
+        started_at=started_at,
+        completed_at=started_at + timedelta(seconds=seconds),
+    )
+
+
+def create_experiment(name: str) -> Experiment:
+    return Experiment(
+        id=uuid4(),
+        name=name,
+        execution_method=ScriptExecution(command="true", args=[]),
+        parameters={},
+    )
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> MetricsStore:
+    return MetricsStore(tmp_path, flush_rows=10, compact_files=3)
+
+
+def test_summarises_most_recent_runs(store: MetricsStore) -> None:
+    stats = StatsService(store, InMemoryMessageBus())
+    train, evaluate = create_experiment("train"), create_experiment("evaluate")
+    for i in range(20):
+        stats.record_run(create_run(train, START + timedelta(hours=i), seconds=i))
+    stats.record_run(create_run(evaluate, START, seconds=5))
+    stats.flush()
+
+    summary = stats.summarise(experiments=["train"], last=5)
+
+    assert summary.to_dicts() == [
+        {
+            "experiment": "train",
+            "runs": 5,
+            "mean": 17.0,
+            "p50": 17.0,
+            "p95": pytest.approx(18.8),
+            "max": 19.0,
+            "last_run": START + timedelta(hours=19),
+        }
+    ]
+
+
+def test_buffers_appends_and_compacts_small_files(
+    store: MetricsStore, tmp_path: Path
+) -> None:
+    stats = StatsService(store, InMemoryMessageBus())
+    train = create_experiment("train")
+
+    for i in range(9):
+        stats.record_run(create_run(train, START, seconds=i))
+    assert store.scan(RUNS).collect().is_empty()
+
+    for i in range(21):
+        stats.record_run(create_run(train, START, seconds=i))
+    assert len(list(tmp_path.rglob("*.parquet"))) == 3
+
+    assert store.compact() == 1
+    assert len(list(tmp_path.rglob("*.parquet"))) == 1
+    assert store.scan(RUNS).collect().height == 30
+
+
+def test_records_runs_published_on_the_bus(store: MetricsStore) -> None:
+    bus = InMemoryMessageBus()
+    stats = StatsService(store, bus)
+    run = create_run(create_experiment("train"), START, seconds=3)
+
+    async def publish() -> None:
+        await bus.publish(ExperimentRunComplete(run=run))
+        await bus.publish(ProjectRunComplete(run=run.project_run))
+
+    asyncio.run(publish())
+
+    assert stats.runs().collect()["duration_seconds"].to_list() == [3.0]
+
+
+def test_estimates_durations_from_recorded_runs(store: MetricsStore) -> None:
+    train = create_experiment("train")
+    evaluate = Experiment(
+        id=uuid4(),
+        name="evaluate",
+        execution_method=ScriptExecution(command="python", args=["evaluate.py"]),
+        parameters={},
+    )
+    stats = StatsService(store, InMemoryMessageBus())
+    for seconds in [10, 20, 60]:
+        stats.record_run(create_run(train, START, seconds=seconds))
+    failed = create_run(train, START, seconds=1000)
+    failed.status = RunStatus.FAILED
+    stats.record_run(failed)
+    stats.flush()
+
+    # Read back from disk, as a later `lab run` or `lab plan` would
+    estimator = StatsService(store, InMemoryMessageBus()).estimator(default=5)
+
+    assert estimator.samples(train) == [10, 20, 60]
+    assert estimator.estimate(train) == 20
+    assert estimator.estimate(evaluate) == 5
+
+
+def test_estimates_from_the_latest_runs_of_the_given_experiments(
+    store: MetricsStore,
+) -> None:
+    train, evaluate = create_experiment("train"), create_experiment("evaluate")
+    evaluate.parameters["split"] = "test"
+    stats = StatsService(store, InMemoryMessageBus())
+    for i, seconds in enumerate([10, 20, 60]):
+        stats.record_run(create_run(train, START + timedelta(hours=i), seconds))
+    stats.record_run(create_run(evaluate, START, seconds=30))
+    stats.flush()
+
+    estimator = stats.estimator([train], last=2)
+
+    assert estimator.samples(train) == [20, 60]
+    assert estimator.samples(evaluate) == []